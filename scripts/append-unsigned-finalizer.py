@@ -7,7 +7,6 @@ import argparse
 import importlib.util
 import os
 import re
-import subprocess
 from pathlib import Path
 
 
@@ -63,10 +62,12 @@ def main() -> int:
     finalizer = load_finalizer()
     work_dir = args.work_dir.resolve()
     work_dir.mkdir(parents=True, exist_ok=True)
+    finalizer.GITHUB.ensure_response_cache(work_dir / "github-cache")
+    finalizer.GITHUB.ensure_call_log(work_dir)
     release_path = work_dir / "release.json"
     notes_path = work_dir / "release-notes.md"
     database_id = finalizer.release_id(repo, tag)
-    release = finalizer.fetch_release(repo, database_id, release_path)
+    release = finalizer.fetch_release(repo, database_id, release_path, tag=tag)
     if release.get("draft") is not False:
         fail("append-unsigned-finalizer only handles a published Release")
 
@@ -103,15 +104,14 @@ def main() -> int:
         mode="prerelease" if release.get("prerelease") else "formal",
     )
     notes_path.write_text(notes, encoding="utf-8", newline="\n")
-    subprocess.run(
+    finalizer.run(
         [
             "gh", "release", "edit", tag, "--repo", repo,
             "--notes-file", str(notes_path),
-        ],
-        check=True,
+        ]
     )
 
-    updated = finalizer.fetch_release(repo, database_id, release_path)
+    updated = finalizer.fetch_release(repo, database_id, release_path, tag=tag)
     updated_notes = str(updated.get("body") or "")
     if updated_notes.rstrip() != notes.rstrip():
         fail("GitHub Release body did not preserve the appended unsigned finalizer")
@@ -0,0 +1,202 @@
+"""Content-addressed store for release assets, keyed by GitHub's SHA-256 digest.
+
+Blobs live at ``<root>/sha256/<aa>/<digest>`` so the directory can be handed to
+``actions/cache`` as is. A blob is re-hashed before every use and dropped if it
+no longer matches; its modification time records the last use, and the least
+recently used blobs are evicted once the store grows past ``max_bytes``.
+
+``local_matches`` applies the same digest check to build outputs that are
+still on disk, so an audit can read those instead of downloading them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+
+CACHE_DIR_ENV = "FANQIE_ASSET_CACHE_DIR"
+CACHE_MAX_BYTES_ENV = "FANQIE_ASSET_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+DIGEST_RE = re.compile(r"sha256:([0-9a-f]{64})\Z")
+
+
+def fail(message: str) -> None:
+    raise SystemExit(message)
+
+
+def digest_hex(asset: dict) -> str | None:
+    """Return the hex SHA-256 GitHub reports for ``asset``, if any."""
+    match = DIGEST_RE.fullmatch(str(asset.get("digest") or ""))
+    return match.group(1) if match else None
+
+
+def file_sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as source:
+        while chunk := source.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def local_matches(assets: list[dict], directories: list[Path]) -> dict[str, Path]:
+    """Map asset names to files under ``directories`` with GitHub's digest."""
+    candidates: dict[str, list[Path]] = {}
+    for directory in directories:
+        if not directory.is_dir():
+            fail(f"local artifact directory does not exist: {directory}")
+        for path in sorted(directory.rglob("*")):
+            if path.is_file() and not path.is_symlink():
+                candidates.setdefault(path.name, []).append(path)
+    matches: dict[str, Path] = {}
+    for asset in assets:
+        name = str(asset.get("name") or "")
+        digest = digest_hex(asset)
+        if digest is None:
+            continue
+        for path in candidates.get(name, []):
+            if path.stat().st_size == asset.get("size") and file_sha256(path) == digest:
+                matches[name] = path
+                break
+    return matches
+
+
+class CacheWriter:
+    """Collect streamed bytes and add them to the cache if the digest matches."""
+
+    def __init__(self, cache: AssetCache, digest: str) -> None:
+        self.cache = cache
+        self.digest = digest
+        self.hasher = hashlib.sha256()
+        self.temporary = cache.temporary_path(digest)
+        self.temporary.parent.mkdir(parents=True, exist_ok=True)
+        self.output = self.temporary.open("wb")
+
+    def feed(self, chunk: bytes) -> None:
+        self.hasher.update(chunk)
+        self.output.write(chunk)
+
+    def finish(self) -> bool:
+        self.output.close()
+        if self.hasher.hexdigest() != self.digest:
+            self.temporary.unlink(missing_ok=True)
+            return False
+        self.cache.commit(self.digest, self.temporary)
+        return True
+
+    def abort(self) -> None:
+        self.output.close()
+        self.temporary.unlink(missing_ok=True)
+
+
+class AssetCache:
+    def __init__(self, root: Path, *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / "sha256" / digest[:2] / digest
+
+    def temporary_path(self, digest: str) -> Path:
+        return self.root / "tmp" / f"{digest}.{os.getpid()}.{threading.get_ident()}"
+
+    def lookup(self, digest: str) -> Path | None:
+        """Return the stored blob for ``digest`` after re-checking its hash."""
+        path = self.path_for(digest)
+        try:
+            valid = path.is_file() and file_sha256(path) == digest
+        except OSError:
+            valid = False
+        if not valid:
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def materialize(self, digest: str, destination: Path) -> bool:
+        """Place the cached blob at ``destination``; report whether it was cached."""
+        path = self.lookup(digest)
+        if path is None:
+            return False
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.unlink(missing_ok=True)
+        try:
+            os.link(path, destination)
+        except OSError:
+            shutil.copyfile(path, destination)
+        return True
+
+    def store(self, digest: str, source: Path) -> bool:
+        """Copy ``source`` into the cache if it really has ``digest``."""
+        if self.path_for(digest).is_file():
+            return True
+        temporary = self.temporary_path(digest)
+        temporary.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, temporary)
+        except OSError:
+            shutil.copyfile(source, temporary)
+        if file_sha256(temporary) != digest:
+            temporary.unlink(missing_ok=True)
+            return False
+        self.commit(digest, temporary)
+        return True
+
+    def writer(self, digest: str) -> CacheWriter:
+        return CacheWriter(self, digest)
+
+    def commit(self, digest: str, temporary: Path) -> None:
+        path = self.path_for(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary.replace(path)
+        with self._lock:
+            self.stored += 1
+        self.evict()
+
+    def evict(self) -> list[Path]:
+        """Remove least recently used blobs until the store fits ``max_bytes``."""
+        with self._lock:
+            blobs = []
+            for path in (self.root / "sha256").glob("*/*"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in blobs)
+            removed = []
+            for _, size, path in sorted(blobs, key=lambda item: item[0]):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed.append(path)
+            return removed
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self.stored} stored"
+
+
+def from_environment() -> AssetCache | None:
+    value = os.environ.get(CACHE_DIR_ENV, "").strip()
+    if not value:
+        return None
+    limit = os.environ.get(CACHE_MAX_BYTES_ENV, "").strip()
+    try:
+        max_bytes = int(limit) if limit else DEFAULT_MAX_BYTES
+    except ValueError:
+        fail(f"{CACHE_MAX_BYTES_ENV} must be an integer, got {limit!r}")
+    return AssetCache(Path(value), max_bytes=max_bytes)
@@ -4,11 +4,30 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import importlib.util
 import json
+import lzma
+import mmap
+import os
+import pickle
 import re
+import stat
+import struct
+import sys
 import tarfile
+import threading
+import time
 import zipfile
+import zlib
+from concurrent.futures import (
+    FIRST_EXCEPTION,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable
 
 
 CONTROL_ASSETS = {
@@ -84,7 +103,40 @@ RAW_SECRET_MARKERS = (
     b"private-src\\",
 )
 RAW_TOKEN_RE = re.compile(rb"(?:gh[op]_|github_pat_)[A-Za-z0-9_]{20,}")
+ZIP_SUFFIXES = (".zip", ".apk", ".aab", ".ipa")
+UNSCANNED_SUFFIXES = (".sig", ".txt", ".json")
+DIGEST_RE = re.compile(r"sha256:([0-9a-f]{64})\Z")
 MAX_ARCHIVE_MEMBERS = 250_000
+ZIP_EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP64_EOCD_SIGNATURE = b"PK\x06\x06"
+ZIP_CENTRAL_SIGNATURE = b"PK\x01\x02"
+# The end record is 22 bytes plus a comment of at most 65535 bytes, and a
+# ZIP64 locator sits in the 20 bytes before it.
+ZIP_TAIL_SIZE = 20 + 22 + 0xFFFF
+MAX_CENTRAL_DIRECTORY = 64 * 1024 * 1024
+AR_MAGIC = b"!<arch>\n"
+AR_HEADER = struct.Struct("16s12s6s6s8s10s2s")
+SQUASHFS_SUPERBLOCK = struct.Struct("<4sIIIIHHHHHHQQQQQQQQ")
+SQUASHFS_COMPRESSION = {1: "gzip", 2: "lzma", 3: "lzo", 4: "xz", 5: "lz4", 6: "zstd"}
+SQUASHFS_METADATA_BLOCK = 8192
+# Assets other than ZIPs whose member paths are listed and validated.
+MEMBER_LISTED_SUFFIXES = (".tar.gz", ".deb", ".appimage")
+# Inode and directory tables only; they are a few hundred KiB even for
+# AppImages with thousands of files.
+MAX_SQUASHFS_METADATA = 16 * 1024 * 1024
+LEDGER_ENV = "FANQIE_AUDIT_LEDGER"
+DISK_BUDGET_ENV = "FANQIE_AUDIT_DISK_BUDGET"
+DEEP_SCAN_ENV = "FANQIE_AUDIT_DEEP"
+STRICT_ENV = "FANQIE_AUDIT_STRICT"
+# Decompressed member bytes are scanned a chunk at a time, so a deep scan
+# holds at most one chunk plus the marker overlap per member thread.
+DEEP_SCAN_CHUNK = 1024 * 1024
+DEEP_SCAN_THREADS = os.cpu_count() or 1
+SIZE_SUFFIXES = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+# Bump whenever the scanning logic changes what an asset is judged on, so
+# assets audited by an older auditor are scanned again.
+RULESET_VERSION = 2
 
 
 def fail(message: str) -> None:
@@ -148,6 +200,110 @@ def release_asset_names(path: Path) -> list[str]:
     return names
 
 
+def asset_digest(asset: dict) -> str | None:
+    match = DIGEST_RE.fullmatch(str(asset.get("digest") or ""))
+    return match.group(1) if match else None
+
+
+def ruleset_fingerprint() -> str:
+    """Hash every rule an audit verdict depends on."""
+    rules = {
+        "version": RULESET_VERSION,
+        "control_assets": sorted(CONTROL_ASSETS),
+        "installer_suffixes": list(INSTALLER_SUFFIXES),
+        "updater_archive_suffixes": list(UPDATER_ARCHIVE_SUFFIXES),
+        "cli_asset": CLI_ASSET_RE.pattern,
+        "safe_name": SAFE_NAME_RE.pattern,
+        "sensitive_asset_markers": list(SENSITIVE_ASSET_MARKERS),
+        "forbidden_member_parts": sorted(FORBIDDEN_MEMBER_PARTS),
+        "forbidden_member_names": sorted(FORBIDDEN_MEMBER_NAMES),
+        "forbidden_member_suffixes": list(FORBIDDEN_MEMBER_SUFFIXES),
+        "raw_secret_markers": [marker.decode("latin-1") for marker in RAW_SECRET_MARKERS],
+        "raw_token": RAW_TOKEN_RE.pattern.decode("latin-1"),
+        "zip_suffixes": list(ZIP_SUFFIXES),
+        "member_listed_suffixes": list(MEMBER_LISTED_SUFFIXES),
+        "unscanned_suffixes": list(UNSCANNED_SUFFIXES),
+        "max_archive_members": MAX_ARCHIVE_MEMBERS,
+    }
+    encoded = json.dumps(rules, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class AuditLedger:
+    """Remember assets that passed the audit, keyed by digest and name."""
+
+    def __init__(self, path: Path, *, deep: bool = False) -> None:
+        self.path = path
+        self.deep = deep
+        self.ruleset = ruleset_fingerprint()
+        self.entries: dict[str, dict] = {}
+        self.skipped = 0
+        self._lock = threading.Lock()
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if isinstance(payload, dict) and payload.get("ruleset") == self.ruleset:
+            entries = payload.get("assets")
+            if isinstance(entries, dict):
+                self.entries = entries
+
+    @staticmethod
+    def key(name: str, digest: str) -> str:
+        return f"{digest}  {name}"
+
+    def passed(self, name: str, digest: str | None) -> bool:
+        if digest is None:
+            return False
+        entry = self.entries.get(self.key(name, digest))
+        return isinstance(entry, dict) and (not self.deep or bool(entry.get("deep")))
+
+    def record(self, name: str, digest: str | None) -> None:
+        if digest is None:
+            return
+        entry = {"audited_at": int(time.time())}
+        if self.deep:
+            entry["deep"] = True
+        with self._lock:
+            self.entries[self.key(name, digest)] = entry
+
+    def skip(self, release: dict) -> set[str]:
+        """Names of ``release`` assets that already passed under these rules."""
+        names = {
+            str(asset.get("name") or "")
+            for asset in release.get("assets") or []
+            if isinstance(asset, dict)
+            and self.passed(str(asset.get("name") or ""), asset_digest(asset))
+        }
+        self.skipped = len(names)
+        return names
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f".{self.path.name}.tmp")
+        with self._lock:
+            payload = {"ruleset": self.ruleset, "assets": self.entries}
+        temporary.write_text(
+            json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        temporary.replace(self.path)
+
+
+def release_asset_digests(path: Path) -> dict[str, str]:
+    """Map asset names to the hex SHA-256 GitHub reports for them."""
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    return {
+        str(asset.get("name") or ""): digest
+        for asset in payload.get("assets") or []
+        if (digest := asset_digest(asset)) is not None
+    }
+
+
+def verify_digest(name: str, actual: str, expected: str | None) -> None:
+    if expected is not None and actual != expected:
+        fail(f"release asset does not match its GitHub SHA-256 digest: {name}")
+
+
 def normalize_member_name(value: str, archive: Path) -> PurePosixPath:
     normalized = value.replace("\\", "/")
     path = PurePosixPath(normalized)
@@ -174,56 +330,947 @@ def validate_member_name(value: str, archive: Path) -> None:
         fail(f"archive contains a credential-like file: {archive.name}: {value}")
 
 
+def validate_member_names(names: list[str], archive: Path) -> None:
+    if len(names) > MAX_ARCHIVE_MEMBERS:
+        fail(f"archive has too many members to audit safely: {archive.name}")
+    for name in names:
+        validate_member_name(name, archive)
+
+
 def scan_zip(path: Path) -> None:
     try:
         with zipfile.ZipFile(path) as archive:
-            members = archive.infolist()
-            if len(members) > MAX_ARCHIVE_MEMBERS:
-                fail(f"archive has too many members to audit safely: {path.name}")
-            for member in members:
-                validate_member_name(member.filename, path)
+            validate_member_names(archive.namelist(), path)
     except (OSError, zipfile.BadZipFile) as error:
         fail(f"cannot audit ZIP-compatible release asset {path}: {error}")
 
 
-def scan_tar(path: Path) -> None:
+def deep_scan_zip(path: Path, threads: int | None = None) -> None:
+    """Scan every ZIP member's decompressed bytes for raw markers."""
+    started = time.perf_counter()
     try:
-        with tarfile.open(path, mode="r:*") as archive:
-            members = archive.getmembers()
-            if len(members) > MAX_ARCHIVE_MEMBERS:
-                fail(f"archive has too many members to audit safely: {path.name}")
-            for member in members:
-                validate_member_name(member.name, path)
-                if member.issym() or member.islnk():
-                    normalize_member_name(member.linkname, path)
-    except (OSError, tarfile.TarError) as error:
-        fail(f"cannot audit TAR release asset {path}: {error}")
-
-
-def scan_raw_markers(path: Path) -> None:
-    lowered = path.name.lower()
-    if lowered.endswith((".sig", ".txt", ".json")):
-        return
-    overlap = max(max(len(marker) for marker in RAW_SECRET_MARKERS), 96) - 1
-    tail = b""
+        with zipfile.ZipFile(path) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+
+            def scan(info: zipfile.ZipInfo) -> int:
+                with archive.open(info) as source:
+                    return scan_member(source, f"{path.name}!{info.filename}")
+
+            workers = max(1, min(len(members), threads or DEEP_SCAN_THREADS))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(scan, info) for info in members]
+                try:
+                    scanned = sum(future.result() for future in futures)
+                finally:
+                    pool.shutdown(cancel_futures=True)
+    except (OSError, RuntimeError, NotImplementedError, zipfile.BadZipFile) as error:
+        fail(f"cannot deep-scan ZIP-compatible release asset {path}: {error}")
+    report_deep_scan(path.name, len(members), scanned, started)
+
+
+def scan_member(source, label: str) -> int:
+    """Scan one decompressed archive member; return its size."""
+    scanner = RawMarkerScanner(label)
+    size = 0
+    while chunk := source.read(DEEP_SCAN_CHUNK):
+        size += len(chunk)
+        scanner.feed(chunk)
+    return size
+
+
+def report_deep_scan(name: str, members: int, size: int, started: float) -> None:
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(
+        f"Deep scan {name}: {members} members, {size / 1e6:.1f} MB in "
+        f"{elapsed:.1f}s ({size / 1e6 / elapsed:.0f} MB/s)",
+        flush=True,
+    )
+
+
+def zip_member_names(
+    read: Callable[[int, int], bytes], size: int, name: str
+) -> list[str]:
+    """List a ZIP's members from its end record and central directory alone."""
+
+    def broken(reason: str) -> None:
+        fail(f"cannot audit ZIP-compatible release asset {name}: {reason}")
+
+    tail_start = max(0, size - ZIP_TAIL_SIZE)
+    tail = read(tail_start, size)
+    index = tail.rfind(ZIP_EOCD_SIGNATURE)
+    if index < 0 or index + 22 > len(tail):
+        broken("end of central directory record not found")
+    (_, _, _, _, entries, directory_size, directory_offset, _) = struct.unpack(
+        "<4sHHHHIIH", tail[index : index + 22]
+    )
+    if 0xFFFF == entries or 0xFFFFFFFF in (directory_size, directory_offset):
+        locator = tail[index - 20 : index] if index >= 20 else b""
+        if locator[:4] != ZIP64_LOCATOR_SIGNATURE:
+            broken("ZIP64 end of central directory locator not found")
+        _, _, record_offset, _ = struct.unpack("<4sIQI", locator)
+        record = read(record_offset, record_offset + 56)
+        if len(record) != 56 or record[:4] != ZIP64_EOCD_SIGNATURE:
+            broken("ZIP64 end of central directory record not found")
+        (*_, entries, directory_size, directory_offset) = struct.unpack(
+            "<4sQHHIIQQQQ", record
+        )
+    if entries > MAX_ARCHIVE_MEMBERS:
+        fail(f"archive has too many members to audit safely: {name}")
+    if directory_size > MAX_CENTRAL_DIRECTORY or directory_offset + directory_size > size:
+        broken("central directory lies outside the archive")
+    if directory_offset >= tail_start:
+        start = directory_offset - tail_start
+        directory = tail[start : start + directory_size]
+    else:
+        directory = read(directory_offset, directory_offset + directory_size)
+
+    names = []
+    position = 0
+    for _ in range(entries):
+        header = directory[position : position + 46]
+        if len(header) != 46 or header[:4] != ZIP_CENTRAL_SIGNATURE:
+            broken(f"central directory entry {len(names)} is malformed")
+        (flags,) = struct.unpack_from("<H", header, 8)
+        name_length, extra_length, comment_length = struct.unpack_from("<HHH", header, 28)
+        raw = directory[position + 46 : position + 46 + name_length]
+        # Bit 11 marks UTF-8 names; everything else is CP437, as in zipfile.
+        names.append(raw.decode("utf-8" if flags & 0x800 else "cp437", errors="replace"))
+        position += 46 + name_length + extra_length + comment_length
+    return names
+
+
+def validate_tar_member(
+    member: tarfile.TarInfo, path: Path, *, check_links: bool = True
+) -> None:
+    validate_member_name(member.name, path)
+    if check_links and (member.issym() or member.islnk()):
+        normalize_member_name(member.linkname, path)
+
+
+def validate_tar_stream(
+    archive: tarfile.TarFile,
+    path: Path,
+    *,
+    deep: bool = False,
+    check_links: bool = True,
+) -> tuple[int, int]:
+    """Validate members as they are read, stopping at the first bad one."""
+    count = scanned = 0
+    while (member := archive.next()) is not None:
+        count += 1
+        if count > MAX_ARCHIVE_MEMBERS:
+            fail(f"archive has too many members to audit safely: {path.name}")
+        validate_tar_member(member, path, check_links=check_links)
+        if deep and member.isfile():
+            source = archive.extractfile(member)
+            if source is not None:
+                scanned += scan_member(source, f"{path.name}!{member.name}")
+        archive.members.clear()
+    return count, scanned
+
+
+def list_tar_members(source: BinaryIO, path: Path, deep: bool) -> tuple[int, int]:
+    with tarfile.open(fileobj=source, mode="r|*") as archive:
+        return validate_tar_stream(archive, path, deep=deep)
+
+
+class ArchiveReader:
+    """Forward-only reads from a file or a pipe, tracking the offset."""
+
+    def __init__(self, source: BinaryIO, path: Path, kind: str) -> None:
+        self.source = source
+        self.path = path
+        self.kind = kind
+        self.position = 0
+
+    def broken(self, reason: str) -> None:
+        fail(f"cannot audit {self.kind} release asset {self.path.name}: {reason}")
+
+    def read(self, size: int) -> bytes:
+        """Read ``size`` bytes, or fewer only at the end of the input."""
+        chunks = []
+        while size > 0 and (chunk := self.source.read(size)):
+            chunks.append(chunk)
+            size -= len(chunk)
+        data = b"".join(chunks)
+        self.position += len(data)
+        return data
+
+    def read_exact(self, size: int, what: str) -> bytes:
+        data = self.read(size)
+        if len(data) != size:
+            self.broken(f"truncated {what}")
+        return data
+
+    def skip_to(self, offset: int, what: str) -> None:
+        if offset < self.position:
+            self.broken(f"{what} lies before data already read")
+        if self.source.seekable():
+            if offset > self.source.seek(0, os.SEEK_END):
+                self.broken(f"truncated before {what}")
+            self.source.seek(offset)
+            self.position = offset
+            return
+        while self.position < offset:
+            if not self.read(min(1024 * 1024, offset - self.position)):
+                self.broken(f"truncated before {what}")
+
+
+class LimitedReader:
+    """Expose the next ``size`` bytes of an ``ArchiveReader`` as a file."""
+
+    def __init__(self, reader: ArchiveReader, size: int) -> None:
+        self.reader = reader
+        self.remaining = size
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.reader.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def list_deb_members(source: BinaryIO, path: Path, deep: bool) -> tuple[int, int]:
+    """Validate the paths a Debian package installs, from its ``data.tar``."""
+    reader = ArchiveReader(source, path, "Debian package")
+    if reader.read_exact(len(AR_MAGIC), "ar signature") != AR_MAGIC:
+        reader.broken("not an ar archive")
+    result = None
+    while header := reader.read(AR_HEADER.size):
+        if len(header) != AR_HEADER.size:
+            reader.broken("truncated ar member header")
+        raw_name, _, _, _, _, raw_size, magic = AR_HEADER.unpack(header)
+        if magic != b"`\n" or not raw_size.strip().isdigit():
+            reader.broken("malformed ar member header")
+        name = raw_name.decode("ascii", errors="replace").strip().rstrip("/")
+        size = int(raw_size)
+        end = reader.position + size + size % 2
+        if name.startswith("data.tar"):
+            if result is not None:
+                reader.broken("more than one data.tar member")
+            payload = LimitedReader(reader, size)
+            with tarfile.open(fileobj=payload, mode="r|*") as archive:
+                result = validate_tar_stream(archive, path, deep=deep, check_links=False)
+        reader.skip_to(end, "next ar member")
+    if result is None:
+        reader.broken("no data.tar member")
+    return result
+
+
+def squashfs_decompressor(compression: int) -> Callable[[bytes], bytes] | None:
+    if compression == 1:
+        return zlib.decompress
+    if compression == 2:
+        return lambda data: lzma.decompress(data, format=lzma.FORMAT_ALONE)
+    if compression == 4:
+        return lambda data: lzma.decompress(data, format=lzma.FORMAT_XZ)
+    if compression == 6:
+        try:
+            from compression.zstd import decompress  # Python 3.14+
+
+            return decompress
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            return None
+        return lambda data: zstandard.ZstdDecompressor().decompress(
+            data, max_output_size=SQUASHFS_METADATA_BLOCK
+        )
+    return None
+
+
+class SquashfsTables:
+    """Squashfs metadata blocks, decompressed on first use."""
+
+    def __init__(
+        self,
+        data: bytes,
+        base: int,
+        decompress: Callable[[bytes], bytes],
+        broken: Callable[[str], None],
+    ) -> None:
+        self.data = data
+        self.base = base
+        self.decompress = decompress
+        self.broken = broken
+        self.blocks: dict[int, tuple[bytes, int]] = {}
+
+    def block(self, offset: int) -> tuple[bytes, int]:
+        cached = self.blocks.get(offset)
+        if cached is not None:
+            return cached
+        position = offset - self.base
+        header = self.data[position : position + 2] if position >= 0 else b""
+        if len(header) != 2:
+            self.broken("squashfs metadata reference lies outside its tables")
+        (word,) = struct.unpack("<H", header)
+        length = word & 0x7FFF
+        payload = self.data[position + 2 : position + 2 + length]
+        if len(payload) != length:
+            self.broken("truncated squashfs metadata block")
+        if not word & 0x8000:
+            payload = self.decompress(payload)
+        if len(payload) > SQUASHFS_METADATA_BLOCK:
+            self.broken("oversized squashfs metadata block")
+        self.blocks[offset] = (payload, offset + 2 + length)
+        return self.blocks[offset]
+
+    def read(self, offset: int, within: int, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            data, offset = self.block(offset)
+            piece = data[within : within + size]
+            if not piece:
+                self.broken("squashfs metadata runs past its table")
+            chunks.append(piece)
+            size -= len(piece)
+            within = 0
+        return b"".join(chunks)
+
+
+class UnlistedArchive(Exception):
+    """An archive whose members this auditor cannot list."""
+
+
+def report_unlisted(name: str, reason: str, strict: bool) -> None:
+    """Fail in strict mode; otherwise flag an asset audited without its members."""
+    if strict:
+        fail(f"cannot list the members of release asset {name}: {reason}")
+    print(
+        f"::warning::member listing skipped for {name}: {reason}; its member "
+        "paths were not audited and it is not recorded in the audit ledger",
+        flush=True,
+    )
+
+
+def list_appimage_members(
+    source: BinaryIO, path: Path, deep: bool
+) -> tuple[int, int]:
+    """Validate the paths in an AppImage's squashfs image."""
+    reader = ArchiveReader(source, path, "AppImage")
+    elf = reader.read_exact(64, "ELF header")
+    if elf[:4] != b"\x7fELF":
+        reader.broken("not an ELF executable")
+    order = "<" if elf[5] == 1 else ">"
+    if elf[4] == 2:
+        (section_headers,) = struct.unpack_from(order + "Q", elf, 0x28)
+        entry_size, entries = struct.unpack_from(order + "HH", elf, 0x3A)
+    else:
+        (section_headers,) = struct.unpack_from(order + "I", elf, 0x20)
+        entry_size, entries = struct.unpack_from(order + "HH", elf, 0x2E)
+    start = section_headers + entry_size * entries
+    reader.skip_to(start, "squashfs superblock")
+    (
+        magic,
+        _,
+        _,
+        _,
+        _,
+        compression,
+        _,
+        _,
+        _,
+        major,
+        _,
+        root,
+        bytes_used,
+        id_table,
+        xattr_table,
+        inode_table,
+        directory_table,
+        fragment_table,
+        export_table,
+    ) = SQUASHFS_SUPERBLOCK.unpack(
+        reader.read_exact(SQUASHFS_SUPERBLOCK.size, "squashfs superblock")
+    )
+    if magic != b"hsqs" or major != 4:
+        reader.broken("no squashfs 4.0 image follows the ELF runtime")
+    decompress = squashfs_decompressor(compression)
+    if decompress is None:
+        method = SQUASHFS_COMPRESSION.get(compression, str(compression))
+        raise UnlistedArchive(
+            f"squashfs {method} compression is not supported by this Python"
+        )
+    # The directory table runs up to whichever table squashfs wrote next.
+    end = min(
+        (
+            offset
+            for offset in (fragment_table, export_table, id_table, xattr_table, bytes_used)
+            if directory_table < offset <= bytes_used
+        ),
+        default=0,
+    )
+    if not inode_table < directory_table < end:
+        reader.broken("squashfs tables are out of order")
+    if end - inode_table > MAX_SQUASHFS_METADATA:
+        reader.broken("squashfs metadata is too large to audit safely")
+    reader.skip_to(start + inode_table, "squashfs inode table")
+    tables = SquashfsTables(
+        reader.read_exact(end - inode_table, "squashfs metadata"),
+        inode_table,
+        decompress,
+        reader.broken,
+    )
+
+    count = 0
+    pending = [("", root)]
+    seen = set()
+    while pending:
+        parent, reference = pending.pop()
+        if reference in seen:
+            reader.broken("squashfs directory loop")
+        seen.add(reference)
+        block, within = inode_table + (reference >> 16), reference & 0xFFFF
+        (kind,) = struct.unpack("<H", tables.read(block, within, 2))
+        if kind == 1:
+            listing_block, _, size, offset, _ = struct.unpack(
+                "<IIHHI", tables.read(block, within, 32)[16:]
+            )
+        elif kind == 8:
+            _, size, listing_block, _, _, offset, _ = struct.unpack(
+                "<IIIIHHI", tables.read(block, within, 40)[16:]
+            )
+        else:
+            reader.broken("squashfs directory entry is not a directory inode")
+        # Listing sizes count the implicit "." and ".." entries as 3 bytes.
+        listing = b""
+        if size > 3:
+            listing = tables.read(directory_table + listing_block, offset, size - 3)
+        position = 0
+        while position < len(listing):
+            entries, inode_block, _ = struct.unpack_from("<IIi", listing, position)
+            position += 12
+            for _ in range(entries + 1):
+                inode_offset, _, entry_type, name_size = struct.unpack_from(
+                    "<HhHH", listing, position
+                )
+                name = listing[position + 8 : position + 9 + name_size]
+                position += 9 + name_size
+                if len(name) != name_size + 1:
+                    reader.broken("truncated squashfs directory listing")
+                member = parent + name.decode("utf-8", errors="replace")
+                count += 1
+                if count > MAX_ARCHIVE_MEMBERS:
+                    fail(f"archive has too many members to audit safely: {path.name}")
+                validate_member_name(member, path)
+                if entry_type == 1:
+                    pending.append((member + "/", inode_block << 16 | inode_offset))
+    return count, 0
+
+
+ARCHIVE_ERRORS = (
+    EOFError,
+    OSError,
+    lzma.LZMAError,
+    struct.error,
+    tarfile.TarError,
+    zlib.error,
+)
+
+
+def archive_lister(
+    name: str,
+) -> tuple[str, Callable[[BinaryIO, Path, bool], tuple[int, int]]] | None:
+    """Return the kind and member lister for assets whose paths are audited."""
+    lowered = name.lower()
+    if not lowered.endswith(MEMBER_LISTED_SUFFIXES):
+        return None
+    if lowered.endswith(".tar.gz"):
+        return "TAR", list_tar_members
+    if lowered.endswith(".deb"):
+        return "Debian package", list_deb_members
+    if lowered.endswith(".appimage"):
+        return "AppImage", list_appimage_members
+    return None
+
+
+def scan_archive(path: Path, *, deep: bool = False, strict: bool = False) -> bool:
+    """Validate the member paths of a TAR, Debian package or AppImage asset."""
+    lister = archive_lister(path.name)
+    if lister is None:
+        return True
+    kind, list_members = lister
+    started = time.perf_counter()
+    try:
+        with path.open("rb") as source:
+            count, scanned = list_members(source, path, deep)
+    except UnlistedArchive as error:
+        report_unlisted(path.name, str(error), strict)
+        return False
+    except ARCHIVE_ERRORS as error:
+        fail(f"cannot audit {kind} release asset {path}: {error}")
+    if deep and scanned:
+        report_deep_scan(path.name, count, scanned, started)
+    return True
+
+
+def anchor_groups(
+    markers: tuple[bytes, ...],
+) -> list[tuple[bytes, list[tuple[bytes, int]]]]:
+    """Group ``markers`` under substrings they share."""
+    remaining = list(dict.fromkeys(markers))
+    groups = []
+    while remaining:
+        best = (0, 0, b"")
+        for marker in remaining:
+            for start in range(len(marker)):
+                for end in range(start + min(6, len(marker)), len(marker) + 1):
+                    anchor = marker[start:end]
+                    count = sum(anchor in other for other in remaining)
+                    best = max(best, (count, len(anchor), anchor))
+        anchor = best[2]
+        members = [marker for marker in remaining if anchor in marker]
+        groups.append((anchor, [(marker, marker.index(anchor)) for marker in members]))
+        remaining = [marker for marker in remaining if marker not in members]
+    return groups
+
+
+# Mapped files are hashed and scanned a window at a time; scanned windows are
+# dropped from the process again so resident memory stays flat.
+MAP_WINDOW = 64 * 1024 * 1024
+# Anchor hits verified one by one before a group falls back to direct finds.
+DENSE_ANCHOR_HITS = 8
+
+
+class MarkerMatcher:
+    """Find any raw marker or token-like value in a buffer."""
+
+    def __init__(self, markers: tuple[bytes, ...], token: re.Pattern[bytes]) -> None:
+        self.groups = anchor_groups(markers)
+        self.token = token
+        self.overlap = max(max(len(marker) for marker in markers), 96) - 1
+
+    def search(
+        self, buffer: bytes, start: int = 0, end: int | None = None
+    ) -> bytes | None:
+        """Return the first literal marker found, ``b""`` for a token, else None."""
+        end = len(buffer) if end is None else end
+        for anchor, members in self.groups:
+            hit = buffer.find(anchor, start, end)
+            verified = 0
+            while hit >= 0:
+                if verified == DENSE_ANCHOR_HITS:
+                    # A common anchor: finish with one pass per marker from here.
+                    for marker, offset in members:
+                        if buffer.find(marker, max(start, hit - offset), end) >= 0:
+                            return marker
+                    break
+                for marker, offset in members:
+                    begin = hit - offset
+                    stop = begin + len(marker)
+                    # find() rather than startswith(): mmap objects lack the latter.
+                    if (
+                        begin >= start
+                        and stop <= end
+                        and buffer.find(marker, begin, stop) == begin
+                    ):
+                        return marker
+                verified += 1
+                hit = buffer.find(anchor, hit + 1, end)
+        if self.token.search(buffer, start, end):
+            return b""
+        return None
+
+
+RAW_MATCHER = MarkerMatcher(RAW_SECRET_MARKERS, RAW_TOKEN_RE)
+
+
+class RawMarkerScanner:
+    """Search a byte stream for credential markers across chunk boundaries."""
+
+    def __init__(self, name: str, matcher: MarkerMatcher = RAW_MATCHER) -> None:
+        self.name = name
+        self.matcher = matcher
+        self.tail = b""
+
+    def feed(self, chunk: bytes) -> None:
+        overlap = self.matcher.overlap
+        if self.tail:
+            self.check(self.tail + chunk[:overlap])
+        self.check(chunk)
+        if len(chunk) >= overlap:
+            self.tail = chunk[-overlap:]
+        else:
+            self.tail = (self.tail + chunk)[-overlap:]
+
+    def check(self, buffer: bytes) -> None:
+        report_marker(self.name, self.matcher.search(buffer))
+
+
+def report_marker(name: str, found: bytes | None) -> None:
+    if found:
+        fail(
+            f"release asset contains a credential/private-path marker: "
+            f"{name}: {found.decode('ascii', errors='replace')}"
+        )
+    if found is not None:
+        fail(f"release asset contains a GitHub token-like value: {name}")
+
+
+def scan_mapped(source, size: int, name: str, matcher: MarkerMatcher | None) -> str:
+    """Hash and scan a regular file through one read-only mapping."""
+    hasher = hashlib.sha256()
+    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        with memoryview(mapping) as view:
+            for start in range(0, size, MAP_WINDOW):
+                end = min(size, start + MAP_WINDOW)
+                hasher.update(view[start:end])
+                if matcher is not None:
+                    stop = min(size, end + matcher.overlap)
+                    report_marker(name, matcher.search(mapping, start, stop))
+                if hasattr(mmap, "MADV_DONTNEED"):
+                    mapping.madvise(mmap.MADV_DONTNEED, start, end - start)
+    return hasher.hexdigest()
+
+
+def scan_raw_markers(path: Path, *, digest: str | None = None) -> str:
+    """Scan ``path`` for raw markers and return its checked SHA-256."""
+    unscanned = path.name.lower().endswith(UNSCANNED_SUFFIXES)
     try:
         with path.open("rb") as source:
-            while chunk := source.read(1024 * 1024):
-                sample = tail + chunk
-                for marker in RAW_SECRET_MARKERS:
-                    if marker in sample:
-                        fail(
-                            f"release asset contains a credential/private-path marker: "
-                            f"{path.name}: {marker.decode('ascii', errors='replace')}"
-                        )
-                if RAW_TOKEN_RE.search(sample):
-                    fail(f"release asset contains a GitHub token-like value: {path.name}")
-                tail = sample[-overlap:] if overlap else b""
-    except OSError as error:
+            status = os.fstat(source.fileno())
+            if stat.S_ISREG(status.st_mode) and status.st_size > 0:
+                matcher = None if unscanned else RAW_MATCHER
+                actual = scan_mapped(source, status.st_size, path.name, matcher)
+            else:
+                scanner = None if unscanned else RawMarkerScanner(path.name)
+                hasher = hashlib.sha256()
+                while chunk := source.read(1024 * 1024):
+                    hasher.update(chunk)
+                    if scanner is not None:
+                        scanner.feed(chunk)
+                actual = hasher.hexdigest()
+    except (OSError, ValueError) as error:
         fail(f"cannot scan release asset {path}: {error}")
+    verify_digest(path.name, actual, digest)
+    return actual
+
+
+class ArchiveStreamScanner:
+    """Validate TAR, Debian package or AppImage members from pushed bytes."""
+
+    def __init__(self, name: str, *, deep: bool = False, strict: bool = False) -> None:
+        self.path = Path(name)
+        lister = archive_lister(name)
+        if lister is None:
+            fail(f"release asset has no member listing: {name}")
+        self.kind, self.list_members = lister
+        self.deep = deep
+        self.strict = strict
+        self.started = time.perf_counter()
+        read_fd, write_fd = os.pipe()
+        self.reader = os.fdopen(read_fd, "rb")
+        self.writer = os.fdopen(write_fd, "wb")
+        self.error: BaseException | None = None
+        self.unlisted: str | None = None
+        self.thread = threading.Thread(target=self._scan, daemon=True)
+        self.thread.start()
+
+    def _scan(self) -> None:
+        try:
+            count, scanned = self.list_members(self.reader, self.path, self.deep)
+            if self.deep and scanned:
+                report_deep_scan(self.path.name, count, scanned, self.started)
+        except UnlistedArchive as error:
+            self.unlisted = str(error)
+        except BaseException as error:  # noqa: BLE001 - re-raised by finish()
+            self.error = error
+        finally:
+            while self.reader.read(1024 * 1024):
+                pass
+            self.reader.close()
+
+    def feed(self, chunk: bytes) -> None:
+        self.writer.write(chunk)
+
+    def finish(self) -> bool:
+        """Raise the lister's failure; return False if it could not list."""
+        self.writer.close()
+        self.thread.join()
+        if isinstance(self.error, ARCHIVE_ERRORS):
+            fail(f"cannot audit {self.kind} release asset {self.path}: {self.error}")
+        if self.error is not None:
+            raise self.error
+        if self.unlisted is not None:
+            report_unlisted(self.path.name, self.unlisted, self.strict)
+            return False
+        return True
+
+    def abort(self) -> None:
+        """Stop the lister after a failed download and discard its result."""
+        self.writer.close()
+        self.thread.join()
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte count such as ``1500000000``, ``512M`` or ``4G``."""
+    match = re.fullmatch(r"\s*([0-9]+)\s*([KMG]?)(?:i?B)?\s*", value, re.IGNORECASE)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"invalid byte size: {value!r}")
+    return int(match.group(1)) * SIZE_SUFFIXES[match.group(2).upper()]
 
 
-def audit_downloaded_assets(root: Path, expected_names: set[str]) -> int:
+def disk_budget_from_environment() -> int | None:
+    value = os.environ.get(DISK_BUDGET_ENV, "").strip()
+    if not value:
+        return None
+    try:
+        return parse_size(value)
+    except argparse.ArgumentTypeError as error:
+        fail(f"{DISK_BUDGET_ENV}: {error}")
+
+
+class DiskBudget:
+    """Bound the bytes the streaming audit keeps on disk at once."""
+
+    def __init__(self, limit: int | None = None) -> None:
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, name: str, size: int) -> None:
+        if self.limit is not None and size > self.limit:
+            fail(
+                f"release asset {name} ({size} bytes) does not fit the audit disk "
+                f"budget of {self.limit} bytes"
+            )
+        with self._condition:
+            while self.limit is not None and self.used + size > self.limit:
+                self._condition.wait()
+            self.used += size
+            self.peak = max(self.peak, self.used)
+
+    def release(self, size: int) -> None:
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+    def summary(self) -> str:
+        limit = "unbounded" if self.limit is None else f"budget {self.limit} bytes"
+        return f"peak {self.peak} bytes on disk ({limit})"
+
+
+class StreamingAssetAudit:
+    """Audit one release asset from its bytes as they arrive."""
+
+    def __init__(
+        self,
+        asset: dict,
+        spool_dir: Path,
+        ledger: AuditLedger | None = None,
+        budget: DiskBudget | None = None,
+        zip_names: Callable[[dict], list[str]] | None = None,
+        *,
+        deep: bool = False,
+        strict: bool = False,
+    ) -> None:
+        self.ledger = ledger
+        self.deep = deep
+        self.name = str(asset.get("name") or "")
+        validate_asset_name(self.name)
+        self.budget = budget
+        self.reserved = 0
+        self.expected_digest = asset_digest(asset)
+        self.hasher = hashlib.sha256()
+        lowered = self.name.lower()
+        self.markers = (
+            None if lowered.endswith(UNSCANNED_SUFFIXES) else RawMarkerScanner(self.name)
+        )
+        self.archive = None
+        if archive_lister(self.name) is not None:
+            self.archive = ArchiveStreamScanner(self.name, deep=deep, strict=strict)
+        self.spool_path = None
+        if lowered.endswith(ZIP_SUFFIXES):
+            if zip_names is not None and not deep:
+                validate_member_names(zip_names(asset), Path(self.name))
+            else:
+                self.spool_path = spool_dir / self.name
+        if self.spool_path is not None and self.budget is not None:
+            self.reserved = int(asset.get("size") or 0)
+            self.budget.acquire(self.name, self.reserved)
+        self.spool = self.spool_path.open("wb") if self.spool_path is not None else None
+
+    def feed(self, chunk: bytes) -> None:
+        self.hasher.update(chunk)
+        if self.markers is not None:
+            self.markers.feed(chunk)
+        if self.archive is not None:
+            self.archive.feed(chunk)
+        if self.spool is not None:
+            self.spool.write(chunk)
+
+    def finish(self) -> None:
+        listed = self.archive.finish() if self.archive is not None else True
+        if self.spool is not None and self.spool_path is not None:
+            self.spool.close()
+            try:
+                scan_zip(self.spool_path)
+                if self.deep:
+                    deep_scan_zip(self.spool_path)
+            finally:
+                self._drop_spool()
+        verify_digest(self.name, self.hasher.hexdigest(), self.expected_digest)
+        if self.ledger is not None and listed:
+            self.ledger.record(self.name, self.expected_digest)
+
+    def abort(self) -> None:
+        """Release the lister, spool and budget after a failed download."""
+        if self.archive is not None:
+            self.archive.abort()
+        self._drop_spool()
+
+    def _drop_spool(self) -> None:
+        if self.spool is not None and self.spool_path is not None:
+            self.spool.close()
+            self.spool_path.unlink(missing_ok=True)
+        self.spool = None
+        if self.budget is not None and self.reserved:
+            self.budget.release(self.reserved)
+        self.reserved = 0
+
+
+def load_release_downloader():
+    module = sys.modules.get("fanqie_release_downloader")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("release-downloader.py")
+    spec = importlib.util.spec_from_file_location("fanqie_release_downloader", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load release downloader: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def audit_local_assets(
+    release: dict,
+    local_dirs: list[Path],
+    ledger: AuditLedger | None = None,
+    jobs: int | None = None,
+    *,
+    deep: bool = False,
+    strict: bool = False,
+) -> set[str]:
+    """Audit assets whose local build output matches GitHub's digest."""
+    if not local_dirs:
+        return set()
+    downloader = load_release_downloader()
+    matches = downloader.CACHE.local_matches(release.get("assets") or [], local_dirs)
+    digests = {
+        str(asset.get("name") or ""): asset_digest(asset)
+        for asset in release.get("assets") or []
+    }
+    audit_files(
+        [(path, name, None) for name, path in matches.items()],
+        jobs,
+        ledger,
+        digests,
+        deep=deep,
+        strict=strict,
+    )
+    if matches:
+        print(f"Audited {len(matches)} assets from local artifacts", flush=True)
+    return set(matches)
+
+
+def audit_streamed_assets(
+    release_json: Path,
+    spool_dir: Path,
+    local_dirs: list[Path],
+    ledger: AuditLedger | None = None,
+    budget: DiskBudget | None = None,
+    *,
+    remote_zip: bool = False,
+    zip_raw_scan: bool = True,
+    jobs: int | None = None,
+    deep: bool = False,
+    strict: bool = False,
+) -> int:
+    """Download and audit every asset without keeping the release on disk."""
+    release = json.loads(release_json.read_text(encoding="utf-8"))
+    done = ledger.skip(release) if ledger is not None else set()
+    pending = {
+        **release,
+        "assets": [asset for asset in release["assets"] if asset.get("name") not in done],
+    }
+    local = audit_local_assets(
+        pending, local_dirs, ledger, jobs, deep=deep, strict=strict
+    )
+    remote = {
+        **release,
+        "assets": [asset for asset in pending["assets"] if asset.get("name") not in local],
+    }
+    downloader = load_release_downloader()
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    client = downloader.GITHUB.default_client()
+    cache = downloader.CACHE.from_environment()
+    # Cache writes stage whole assets on disk, outside any spool reservation;
+    # with a budget in force the cache is only read.
+    bounded = budget is not None and budget.limit is not None
+    fetcher = downloader.Downloader(
+        token=client.token,
+        jobs=downloader.download_jobs(),
+        cache=cache,
+        store=not bounded,
+    )
+
+    def remote_zip_names(asset: dict) -> list[str]:
+        url = str(asset["url"])
+        return zip_member_names(
+            lambda start, end: fetcher.read_range(url, start, end),
+            int(asset["size"]),
+            str(asset["name"]),
+        )
+
+    zip_names = remote_zip_names if remote_zip else None
+    if remote_zip:
+        if not zip_raw_scan:
+            archives = [
+                asset
+                for asset in remote["assets"]
+                if str(asset.get("name") or "").lower().endswith(ZIP_SUFFIXES)
+            ]
+            remote = {
+                **remote,
+                "assets": [asset for asset in remote["assets"] if asset not in archives],
+            }
+            with ThreadPoolExecutor(max_workers=fetcher.jobs) as pool:
+                for asset, names in zip(archives, pool.map(remote_zip_names, archives)):
+                    validate_asset_name(str(asset["name"]))
+                    validate_member_names(names, Path(str(asset["name"])))
+            print(
+                f"Audited {len(archives)} ZIP central directories without a raw scan",
+                flush=True,
+            )
+    fetcher.stream(
+        remote,
+        lambda asset: StreamingAssetAudit(
+            asset, spool_dir, ledger, budget, zip_names, deep=deep, strict=strict
+        ),
+    )
+    if cache is not None:
+        mode = " (read-only under the disk budget)" if bounded else ""
+        print(f"Asset cache: {cache.summary()}{mode}", flush=True)
+    if budget is not None:
+        print(f"Audit disk usage: {budget.summary()}", flush=True)
+    return len(release["assets"])
+
+
+def audit_downloaded_assets(
+    root: Path,
+    expected_names: set[str],
+    digests: dict[str, str] | None = None,
+    ledger: AuditLedger | None = None,
+    jobs: int | None = None,
+    *,
+    deep: bool = False,
+    strict: bool = False,
+) -> int:
     if not root.is_dir():
         fail(f"downloaded release asset directory does not exist: {root}")
     entries = sorted(root.iterdir())
@@ -236,32 +1283,233 @@ def audit_downloaded_assets(root: Path, expected_names: set[str]) -> int:
             f"missing={sorted(expected_names - actual_names)}, "
             f"unexpected={sorted(actual_names - expected_names)}"
         )
-    for path in entries:
-        validate_asset_name(path.name)
-        lowered = path.name.lower()
-        if lowered.endswith((".zip", ".apk", ".aab", ".ipa")):
-            scan_zip(path)
-        elif lowered.endswith(".tar.gz"):
-            scan_tar(path)
-        scan_raw_markers(path)
-    return len(entries)
+    digests = digests or {}
+    if ledger is not None:
+        entries = [
+            path
+            for path in entries
+            if not ledger.passed(path.name, digests.get(path.name))
+        ]
+        ledger.skipped = len(actual_names) - len(entries)
+
+    audit_files(
+        [(path, path.name, digests.get(path.name)) for path in entries],
+        jobs,
+        ledger,
+        digests,
+        deep=deep,
+        strict=strict,
+    )
+    return len(actual_names)
+
+
+def audit_files(
+    files: list[tuple[Path, str, str | None]],
+    jobs: int | None = None,
+    ledger: AuditLedger | None = None,
+    digests: dict[str, str | None] | None = None,
+    *,
+    deep: bool = False,
+    strict: bool = False,
+) -> None:
+    """Audit ``(path, name, digest)`` entries on up to ``jobs`` worker processes."""
+    files = sorted(files, key=lambda entry: entry[1])
+    workers = max(1, min(len(files), jobs or os.cpu_count() or 1))
+    digests = digests or {}
+
+    def record(name: str) -> None:
+        if ledger is not None:
+            ledger.record(name, digests.get(name))
+
+    if workers == 1:
+        for path, name, digest in files:
+            if audit_asset_file(path, name, digest, deep=deep, strict=strict):
+                record(name)
+        return
+    # Each worker deep-scans with its share of the CPUs, not all of them.
+    options = {
+        "deep": deep,
+        "strict": strict,
+        "deep_threads": max(1, DEEP_SCAN_THREADS // workers),
+    }
+    # Workers import the audit by module name; a copy loaded under a name that
+    # is not in sys.modules cannot be sent to them and audits on threads.
+    try:
+        pickle.dumps(audit_asset_file)
+        executor: type = ProcessPoolExecutor
+    except (AttributeError, pickle.PicklingError):
+        executor = ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(audit_asset_file, *entry, **options) for entry in files
+        ]
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_EXCEPTION)
+            if any(future.exception() is not None for future in done):
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                break
+        for future, (_, name, _) in zip(futures, files):
+            if future.cancelled():
+                continue
+            if future.result():
+                record(name)
+
+
+def audit_asset_file(
+    path: Path,
+    name: str,
+    digest: str | None = None,
+    *,
+    deep: bool = False,
+    strict: bool = False,
+    deep_threads: int | None = None,
+) -> bool:
+    """Audit one asset on disk; False when it passed without its members listed."""
+    validate_asset_name(name)
+    lowered = name.lower()
+    if lowered.endswith(ZIP_SUFFIXES):
+        scan_zip(path)
+        if deep:
+            deep_scan_zip(path, deep_threads)
+        listed = True
+    else:
+        listed = scan_archive(path, deep=deep, strict=strict)
+    scan_raw_markers(path, digest=digest)
+    return listed
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--release-json", type=Path, required=True)
     parser.add_argument("--root", type=Path)
+    parser.add_argument(
+        "--stream",
+        type=Path,
+        metavar="SPOOL_DIR",
+        help="download and audit assets in one pass, spooling only ZIP assets here",
+    )
+    parser.add_argument(
+        "--local-dir",
+        type=Path,
+        action="append",
+        default=[],
+        help="build output to audit instead of downloading assets with the same digest",
+    )
+    parser.add_argument(
+        "--remote-zip",
+        action="store_true",
+        help="with --stream, read ZIP member names over range requests, not a spool",
+    )
+    parser.add_argument(
+        "--skip-zip-raw-scan",
+        action="store_true",
+        help="with --remote-zip, do not download ZIP assets for hashing and raw markers",
+    )
+    parser.add_argument(
+        "--disk-budget",
+        type=parse_size,
+        help=(
+            "with --stream, the most bytes to keep on disk at once, e.g. 2G "
+            f"(default: ${DISK_BUDGET_ENV}, unbounded)"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="assets to audit at once in worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--deep",
+        action="store_true",
+        default=os.environ.get(DEEP_SCAN_ENV, "").strip() not in ("", "0"),
+        help=(
+            "also scan the decompressed members of ZIP and TAR assets for raw "
+            f"markers (default: ${DEEP_SCAN_ENV})"
+        ),
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        default=os.environ.get(STRICT_ENV, "").strip() not in ("", "0"),
+        help=(
+            "fail on assets whose members cannot be listed instead of warning; "
+            f"implied by --deep (default: ${STRICT_ENV})"
+        ),
+    )
+    parser.add_argument(
+        "--ledger",
+        type=Path,
+        default=Path(os.environ[LEDGER_ENV]) if os.environ.get(LEDGER_ENV) else None,
+        help=f"audit ledger of assets that already passed (default: ${LEDGER_ENV})",
+    )
     return parser.parse_args()
 
 
 def main() -> int:
     args = parse_args()
+    if args.stream is None and (args.disk_budget is not None or args.remote_zip):
+        fail("--disk-budget and --remote-zip need the streaming audit (--stream)")
+    if args.skip_zip_raw_scan and not args.remote_zip:
+        fail("--skip-zip-raw-scan requires --remote-zip")
+    if args.deep and args.skip_zip_raw_scan:
+        fail("--deep needs ZIP assets downloaded; drop --skip-zip-raw-scan")
+    if args.jobs < 1:
+        fail("--jobs must be at least 1")
+    strict = args.strict or args.deep
     names = release_asset_names(args.release_json)
-    if args.root is not None:
-        count = audit_downloaded_assets(args.root, set(names))
-        print(f"Release asset allowlist and archive audit passed: {count} files")
-    else:
-        print(f"Release asset allowlist passed: {len(names)} files")
+    ledger = (
+        AuditLedger(args.ledger, deep=args.deep) if args.ledger is not None else None
+    )
+    try:
+        if args.stream is not None:
+            budget = DiskBudget(args.disk_budget or disk_budget_from_environment())
+            count = audit_streamed_assets(
+                args.release_json,
+                args.stream,
+                args.local_dir,
+                ledger,
+                budget,
+                remote_zip=args.remote_zip,
+                zip_raw_scan=not args.skip_zip_raw_scan,
+                jobs=args.jobs,
+                deep=args.deep,
+                strict=strict,
+            )
+            print(
+                f"Release asset allowlist and streaming archive audit passed: {count} files"
+            )
+        elif args.root is not None:
+            release = json.loads(args.release_json.read_text(encoding="utf-8"))
+            local = audit_local_assets(
+                release,
+                args.local_dir,
+                ledger,
+                args.jobs,
+                deep=args.deep,
+                strict=strict,
+            )
+            count = len(local) + audit_downloaded_assets(
+                args.root,
+                set(names) - local,
+                release_asset_digests(args.release_json),
+                ledger,
+                args.jobs,
+                deep=args.deep,
+                strict=strict,
+            )
+            print(f"Release asset allowlist and archive audit passed: {count} files")
+        else:
+            print(f"Release asset allowlist passed: {len(names)} files")
+    finally:
+        # Assets that passed stay recorded even when a later one fails.
+        if ledger is not None:
+            ledger.save()
+    if ledger is not None and ledger.skipped:
+        print(f"Audit ledger: {ledger.skipped} assets already passed these rules")
     return 0
 
 
@@ -0,0 +1,274 @@
+"""Release reads and the asset audit shared by the release finalizers."""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+
+AUDITOR = Path(__file__).with_name("audit-release-assets.py")
+ASSET_DIGEST_RE = re.compile(r"sha256:[0-9a-f]{64}\Z")
+
+
+def fail(message: str) -> None:
+    raise SystemExit(message)
+
+
+def load_github_client():
+    module = sys.modules.get("fanqie_github_client")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("github-client.py")
+    spec = importlib.util.spec_from_file_location("fanqie_github_client", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load GitHub client: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+GITHUB = load_github_client()
+# Digests of large assets can take minutes to appear after an upload.
+DIGEST_WAIT = GITHUB.WaitPolicy(attempts=8, initial_delay=2, max_delay=20, deadline=180)
+
+
+def load_release_downloader():
+    module = sys.modules.get("fanqie_release_downloader")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("release-downloader.py")
+    spec = importlib.util.spec_from_file_location("fanqie_release_downloader", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load release downloader: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+DOWNLOADER = load_release_downloader()
+
+
+def run(command: list[str], *, capture: bool = False) -> str:
+    return GITHUB.run(command, capture=capture)
+
+
+def gh_json(arguments: list[str], *, fresh: bool = False) -> object:
+    return GITHUB.gh_json(arguments, fresh=fresh)
+
+
+def release_id(repo: str, tag: str) -> int:
+    payload = gh_json(
+        [
+            "release",
+            "view",
+            tag,
+            "--repo",
+            repo,
+            "--json",
+            "databaseId,tagName",
+        ]
+    )
+    if not isinstance(payload, dict) or payload.get("tagName") != tag:
+        fail(f"cannot resolve release tag {tag!r}")
+    value = payload.get("databaseId")
+    if not isinstance(value, int) or value < 1:
+        fail(f"release {tag!r} has no numeric database ID")
+    return value
+
+
+def fetch_release_assets(
+    repo: str, database_id: int, *, fresh: bool = False
+) -> tuple[dict, list[dict]]:
+    release = gh_json(["api", f"repos/{repo}/releases/{database_id}"], fresh=fresh)
+    pages = gh_json(
+        [
+            "api",
+            "--paginate",
+            "--slurp",
+            f"repos/{repo}/releases/{database_id}/assets?per_page=100",
+        ],
+        fresh=fresh,
+    )
+    if not isinstance(release, dict) or not isinstance(pages, list):
+        fail("GitHub release API returned an unexpected payload")
+    assets: list[dict] = []
+    for page in pages:
+        if not isinstance(page, list) or not all(
+            isinstance(asset, dict) for asset in page
+        ):
+            fail("GitHub release asset API returned an unexpected page")
+        assets.extend(page)
+    return release, assets
+
+
+def fetch_release_assets_graphql(
+    repo: str,
+    database_id: int,
+    tag: str,
+    aliases: tuple[str, ...],
+    found_aliases: dict[str, dict | None],
+    *,
+    fresh: bool = False,
+) -> tuple[dict, list[dict]] | None:
+    """Read the release, its digests and any aliases in one GraphQL query.
+
+    Alias releases the query returned are stored in ``found_aliases``.
+    """
+    release, found = GITHUB.fetch_release_graphql(
+        repo, tag, aliases=aliases, fresh=fresh
+    )
+    found_aliases.update(found)
+    if release is None or release.get("id") != database_id:
+        # Drafts without a pushed tag are not always reachable by tag name.
+        print("GitHub GraphQL cannot see this release; using REST", flush=True)
+        return None
+    return release, release.pop("assets")
+
+
+def pending_digests(assets: list[dict]) -> list[str]:
+    return [
+        str(asset.get("name") or "<unnamed>")
+        for asset in assets
+        if ASSET_DIGEST_RE.fullmatch(str(asset.get("digest") or "")) is None
+    ]
+
+
+def fetch_release(
+    repo: str,
+    database_id: int,
+    path: Path,
+    *,
+    tag: str = "",
+    aliases: tuple[str, ...] = (),
+    found_aliases: dict[str, dict | None] | None = None,
+) -> dict:
+    found_aliases = {} if found_aliases is None else found_aliases
+    use_graphql = bool(tag) and GITHUB.graphql_enabled()
+    previous: tuple[object, list[dict], list[str]] | None = None
+
+    def check(attempt: int, _remaining: float) -> tuple[object, list[dict], list[str]]:
+        nonlocal use_graphql, aliases, previous
+        if previous is not None:
+            # Only the assets still missing a digest are worth another read.
+            assets = GITHUB.refresh_assets(repo, previous[1], previous[2])
+            if assets is not None:
+                previous = (previous[0], assets, pending_digests(assets))
+                return previous
+        snapshot = None
+        if use_graphql:
+            snapshot = fetch_release_assets_graphql(
+                repo, database_id, tag, aliases, found_aliases, fresh=attempt > 1
+            )
+            use_graphql = snapshot is not None
+            aliases = ()
+        release, assets = snapshot or fetch_release_assets(
+            repo, database_id, fresh=attempt > 1
+        )
+        previous = (release, assets, pending_digests(assets))
+        return previous
+
+    waited = GITHUB.wait_for(
+        "GitHub asset digests",
+        check,
+        policy=DIGEST_WAIT,
+        ready=lambda state: not state[2],
+        describe=lambda state: "waiting for " + ", ".join(state[2]),
+    )
+    release, assets, pending = waited.value
+    if not isinstance(release, dict):
+        fail("GitHub release API did not return a release")
+    if pending:
+        fail("GitHub did not provide SHA-256 digests for: " + ", ".join(pending))
+    release["assets"] = assets
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(release, ensure_ascii=False, indent=2) + "\n",
+        encoding="utf-8",
+    )
+    return release
+
+
+
+def audit_release_assets(
+    *,
+    repo: str,
+    tag: str,
+    release: Path,
+    work_dir: Path,
+    local_dirs: list[Path] | None = None,
+) -> None:
+    audit_dir = work_dir / "asset-audit"
+    if audit_dir.exists():
+        shutil.rmtree(audit_dir)
+    audit_dir.mkdir(parents=True)
+    local_dirs = local_dirs or []
+    release_json = json.loads(release.read_text(encoding="utf-8"))
+    # Assets that already passed under the same rules are not audited again.
+    ledger = os.environ.get("FANQIE_AUDIT_LEDGER", "").strip() or str(
+        work_dir / "audit-ledger.json"
+    )
+    # A disk budget needs the streaming audit even on the gh backend.
+    budget = os.environ.get("FANQIE_AUDIT_DISK_BUDGET", "").strip()
+    streaming = GITHUB.default_client().backend == "http" or bool(budget)
+    downloadable = DOWNLOADER.downloadable(release_json)
+    if budget and not downloadable:
+        print(
+            f"::warning::FANQIE_AUDIT_DISK_BUDGET={budget} is not enforced: the "
+            "release JSON has no REST asset URLs to stream, so the audit "
+            "downloads every asset with gh release download",
+            file=sys.stderr,
+            flush=True,
+        )
+    if streaming and downloadable:
+        # Scan assets as they arrive; ZIP member names come from range reads.
+        command = [
+            sys.executable,
+            str(AUDITOR),
+            "--release-json",
+            str(release),
+            "--stream",
+            str(audit_dir),
+            "--remote-zip",
+            "--ledger",
+            ledger,
+        ]
+        for directory in local_dirs:
+            command.extend(["--local-dir", str(directory)])
+        run(command)
+        return
+    # Build outputs that still match GitHub's digest need no download.
+    local = DOWNLOADER.CACHE.local_matches(release_json.get("assets") or [], local_dirs)
+    DOWNLOADER.DownloadPlan.link_into(local.values(), audit_dir)
+    missing = [
+        str(asset.get("name") or "")
+        for asset in release_json.get("assets") or []
+        if isinstance(asset, dict) and asset.get("name") not in local
+    ]
+    if missing:
+        command = ["gh", "release", "download", tag, "--repo", repo]
+        if local:
+            for name in missing:
+                command.extend(["--pattern", name])
+        command.extend(["--dir", str(audit_dir), "--clobber"])
+        run(command)
+    run(
+        [
+            sys.executable,
+            str(AUDITOR),
+            "--release-json",
+            str(release),
+            "--root",
+            str(audit_dir),
+            "--ledger",
+            ledger,
+        ]
+    )
+
+
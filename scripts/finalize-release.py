@@ -4,13 +4,11 @@
 from __future__ import annotations
 
 import argparse
-import json
+import importlib.util
 import os
 import re
 import shutil
-import subprocess
 import sys
-import time
 from pathlib import Path
 from urllib.parse import quote
 
@@ -19,125 +17,64 @@ ROOT = Path(__file__).resolve().parents[1]
 NORMALIZER = ROOT / "scripts" / "normalize-updater-metadata.py"
 PREPARER = ROOT / "scripts" / "prepare-release-artifacts.py"
 STABLE_PUBLISHER = ROOT / "scripts" / "publish-stable-channel.py"
-AUDITOR = ROOT / "scripts" / "audit-release-assets.py"
 MANIFEST_NAME = "SHA256SUMS-release.txt"
-ASSET_DIGEST_RE = re.compile(r"sha256:[0-9a-f]{64}\Z")
 
 
 def fail(message: str) -> None:
     raise SystemExit(message)
 
 
+def load_finalize_common():
+    module = sys.modules.get("fanqie_finalize_common")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("finalize-common.py")
+    spec = importlib.util.spec_from_file_location("fanqie_finalize_common", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load finalizer helpers: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+COMMON = load_finalize_common()
+GITHUB = COMMON.GITHUB
+DOWNLOADER = COMMON.DOWNLOADER
+
+
 def run(command: list[str], *, capture: bool = False) -> str:
-    print("+", " ".join(command), flush=True)
-    result = subprocess.run(
-        command,
-        check=True,
-        text=True,
-        stdout=subprocess.PIPE if capture else None,
-    )
-    return result.stdout.strip() if result.stdout is not None else ""
+    return GITHUB.run(command, capture=capture)
 
 
-def gh_json(arguments: list[str]) -> object:
-    output = run(["gh", *arguments], capture=True)
-    try:
-        return json.loads(output)
-    except json.JSONDecodeError as error:
-        fail(f"GitHub CLI returned invalid JSON: {error}")
+def gh_json(arguments: list[str], *, fresh: bool = False) -> object:
+    return GITHUB.gh_json(arguments, fresh=fresh)
 
 
 def release_id(repo: str, tag: str) -> int:
-    payload = gh_json(
-        [
-            "release",
-            "view",
-            tag,
-            "--repo",
-            repo,
-            "--json",
-            "databaseId,tagName",
-        ]
-    )
-    if not isinstance(payload, dict) or payload.get("tagName") != tag:
-        fail(f"cannot resolve release tag {tag!r}")
-    value = payload.get("databaseId")
-    if not isinstance(value, int):
-        fail(f"release {tag!r} has no numeric database ID")
-    return value
-
-
-def fetch_release(repo: str, database_id: int, path: Path) -> dict:
-    release: object = None
-    assets: list[dict] = []
-    pending: list[str] = []
-    for attempt in range(5):
-        release = gh_json(["api", f"repos/{repo}/releases/{database_id}"])
-        pages = gh_json(
-            [
-                "api",
-                "--paginate",
-                "--slurp",
-                f"repos/{repo}/releases/{database_id}/assets?per_page=100",
-            ]
-        )
-        if not isinstance(release, dict) or not isinstance(pages, list):
-            fail("GitHub release API returned an unexpected payload")
-        assets = []
-        for page in pages:
-            if not isinstance(page, list) or not all(
-                isinstance(asset, dict) for asset in page
-            ):
-                fail("GitHub release asset API returned an unexpected page")
-            assets.extend(page)
-        pending = [
-            str(asset.get("name") or "<unnamed>")
-            for asset in assets
-            if ASSET_DIGEST_RE.fullmatch(str(asset.get("digest") or "")) is None
-        ]
-        if not pending:
-            break
-        if attempt < 4:
-            print(
-                "Waiting for GitHub asset digests: " + ", ".join(pending),
-                flush=True,
-            )
-            time.sleep(2)
-    if not isinstance(release, dict):
-        fail("GitHub release API did not return a release")
-    if pending:
-        fail("GitHub did not provide SHA-256 digests for: " + ", ".join(pending))
-    release["assets"] = assets
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(
-        json.dumps(release, ensure_ascii=False, indent=2) + "\n",
-        encoding="utf-8",
-    )
-    return release
+    return COMMON.release_id(repo, tag)
 
 
-def download_updater_signatures(repo: str, tag: str, directory: Path) -> None:
-    directory.mkdir(parents=True, exist_ok=True)
-    for child in directory.iterdir():
-        if child.is_file() or child.is_symlink():
-            child.unlink()
-        elif child.is_dir():
-            shutil.rmtree(child)
-    run(
-        [
-            "gh",
-            "release",
-            "download",
-            tag,
-            "--repo",
-            repo,
-            "--pattern",
-            "*.sig",
-            "--dir",
-            str(directory),
-            "--clobber",
-        ]
-    )
+def fetch_release(repo: str, database_id: int, path: Path, *, tag: str = "") -> dict:
+    return COMMON.fetch_release(repo, database_id, path, tag=tag)
+
+
+def fetch_updater_assets(
+    plan, release: dict, metadata: Path, signatures: Path
+) -> None:
+    """Fetch latest.json and every signature in one batch for the normalizer."""
+    if signatures.exists():
+        shutil.rmtree(signatures)
+    signature_names = [
+        str(asset.get("name") or "")
+        for asset in release.get("assets", [])
+        if isinstance(asset, dict)
+        and str(asset.get("name") or "").lower().endswith(".sig")
+    ]
+    files = plan.fetch(release, ["latest.json", *signature_names])
+    # The normalizer rewrites latest.json, so it gets its own copy.
+    shutil.copyfile(files.pop("latest.json"), metadata)
+    plan.link_into(files.values(), signatures)
 
 
 def run_normalizer(
@@ -236,36 +173,6 @@ def refresh_stable_channel(
     )
 
 
-def audit_release_assets(*, repo: str, tag: str, release: Path, work_dir: Path) -> None:
-    audit_dir = work_dir / "asset-audit"
-    if audit_dir.exists():
-        shutil.rmtree(audit_dir)
-    audit_dir.mkdir(parents=True)
-    run(
-        [
-            "gh",
-            "release",
-            "download",
-            tag,
-            "--repo",
-            repo,
-            "--dir",
-            str(audit_dir),
-            "--clobber",
-        ]
-    )
-    run(
-        [
-            sys.executable,
-            str(AUDITOR),
-            "--release-json",
-            str(release),
-            "--root",
-            str(audit_dir),
-        ]
-    )
-
-
 def validate_release_identity(release: dict, tag: str, *, draft: bool) -> None:
     if release.get("tag_name") != tag:
         fail(
@@ -307,6 +214,9 @@ def append_summary(
             f"- Source commit: `{source_commit}`\n"
             f"- Assets: `{len(assets)}`\n"
             f"- Prerelease: `{str(bool(release.get('prerelease'))).lower()}`\n"
+            f"- GitHub response cache: `{GITHUB.response_cache_summary()}`\n"
+            f"- GitHub rate limit: `{GITHUB.rate_limit_summary()}`\n"
+            f"- Propagation waits: {GITHUB.wait_summary()}\n"
         )
 
 
@@ -319,6 +229,13 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--source-commit", default="")
     parser.add_argument("--platforms", default="")
     parser.add_argument("--highlights-file", type=Path)
+    parser.add_argument(
+        "--local-artifacts",
+        type=Path,
+        action="append",
+        default=[],
+        help="build output directory to audit instead of re-downloading matching assets",
+    )
     parser.add_argument("--work-dir", type=Path, default=Path("release-check"))
     return parser.parse_args()
 
@@ -336,6 +253,8 @@ def main() -> int:
 
     work_dir = args.work_dir.resolve()
     work_dir.mkdir(parents=True, exist_ok=True)
+    GITHUB.ensure_response_cache(work_dir / "github-cache")
+    GITHUB.ensure_call_log(work_dir)
     release_path = work_dir / "release.json"
     metadata_path = work_dir / "latest.json"
     signatures_path = work_dir / "updater-signatures"
@@ -343,8 +262,11 @@ def main() -> int:
     notes_path = work_dir / "release-notes.md"
 
     database_id = release_id(repo, tag)
-    release = fetch_release(repo, database_id, release_path)
+    release = fetch_release(repo, database_id, release_path, tag=tag)
     validate_release_identity(release, tag, draft=True)
+    plan = DOWNLOADER.DownloadPlan(
+        repo=repo, tag=tag, directory=work_dir / "assets", run_gh=run
+    )
     prerelease = bool(release.get("prerelease"))
     asset_names = {
         str(asset.get("name") or "")
@@ -357,22 +279,7 @@ def main() -> int:
         fail("release has signed updater assets but no latest.json")
 
     if "latest.json" in asset_names:
-        run(
-            [
-                "gh",
-                "release",
-                "download",
-                tag,
-                "--repo",
-                repo,
-                "--pattern",
-                "latest.json",
-                "--dir",
-                str(work_dir),
-                "--clobber",
-            ]
-        )
-        download_updater_signatures(repo, tag, signatures_path)
+        fetch_updater_assets(plan, release, metadata_path, signatures_path)
         run_normalizer(metadata_path, release_path, signatures_path, repo, tag)
         run(
             [
@@ -386,7 +293,8 @@ def main() -> int:
                 "--clobber",
             ]
         )
-        release = fetch_release(repo, database_id, release_path)
+        plan.adopt(metadata_path)
+        release = fetch_release(repo, database_id, release_path, tag=tag)
 
     run_preparer(
         release=release_path,
@@ -413,10 +321,18 @@ def main() -> int:
             "--clobber",
         ]
     )
+    plan.adopt(manifest_path)
 
-    release = fetch_release(repo, database_id, release_path)
+    release = fetch_release(repo, database_id, release_path, tag=tag)
     validate_release_identity(release, tag, draft=True)
-    audit_release_assets(repo=repo, tag=tag, release=release_path, work_dir=work_dir)
+    COMMON.audit_release_assets(
+        repo=repo,
+        tag=tag,
+        release=release_path,
+        work_dir=work_dir,
+        local_dirs=[*args.local_artifacts, plan.directory],
+    )
+    print(f"Release downloads: {plan.summary()}", flush=True)
     run_preparer(
         release=release_path,
         repo=repo,
@@ -444,7 +360,7 @@ def main() -> int:
         publish.append("--latest")
     run(publish)
 
-    published = fetch_release(repo, database_id, release_path)
+    published = fetch_release(repo, database_id, release_path, tag=tag)
     validate_release_identity(published, tag, draft=False)
     if bool(published.get("prerelease")) != prerelease:
         fail("release prerelease state changed during finalization")
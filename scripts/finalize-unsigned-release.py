@@ -10,9 +10,7 @@ import json
 import os
 import re
 import shutil
-import subprocess
 import sys
-import time
 from pathlib import Path
 from urllib.parse import quote
 
@@ -45,12 +43,32 @@ INSTALLER_SUFFIXES = (
 )
 CLI_ASSET_RE = re.compile(r"(?:^|[-_. ])cli(?:[-_. ]|$)", re.IGNORECASE)
 _ASSET_AUDITOR = None
+PREFETCHED_ALIASES: dict[str, dict | None] = {}
 
 
 def fail(message: str) -> None:
     raise SystemExit(message)
 
 
+def load_finalize_common():
+    module = sys.modules.get("fanqie_finalize_common")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("finalize-common.py")
+    spec = importlib.util.spec_from_file_location("fanqie_finalize_common", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load finalizer helpers: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+COMMON = load_finalize_common()
+GITHUB = COMMON.GITHUB
+DOWNLOADER = COMMON.DOWNLOADER
+
+
 def validate_release_asset_name(name: str) -> None:
     global _ASSET_AUDITOR
     if _ASSET_AUDITOR is None:
@@ -72,59 +90,26 @@ def run(
     capture: bool = False,
     input_text: str | None = None,
 ) -> str:
-    print("+", " ".join(command), flush=True)
-    result = subprocess.run(
-        command,
-        check=True,
-        text=True,
-        input=input_text,
-        stdout=subprocess.PIPE if capture else None,
-    )
-    return result.stdout.strip() if result.stdout is not None else ""
+    return GITHUB.run(command, capture=capture, input_text=input_text)
 
 
-def gh_json(arguments: list[str], *, input_text: str | None = None) -> object:
-    output = run(["gh", *arguments], capture=True, input_text=input_text)
-    try:
-        return json.loads(output)
-    except json.JSONDecodeError as error:
-        fail(f"GitHub CLI returned invalid JSON: {error}")
+def gh_json(
+    arguments: list[str],
+    *,
+    input_text: str | None = None,
+    fresh: bool = False,
+) -> object:
+    return GITHUB.gh_json(arguments, input_text=input_text, fresh=fresh)
 
 
 def release_id(repo: str, tag: str) -> int:
-    payload = gh_json(
-        [
-            "release",
-            "view",
-            tag,
-            "--repo",
-            repo,
-            "--json",
-            "databaseId,tagName",
-        ]
-    )
-    if not isinstance(payload, dict) or payload.get("tagName") != tag:
-        fail(f"cannot resolve release tag {tag!r}")
-    value = payload.get("databaseId")
-    if not isinstance(value, int) or value < 1:
-        fail(f"release {tag!r} has no numeric database ID")
-    return value
+    return COMMON.release_id(repo, tag)
 
 
-def latest_tag(repo: str) -> str:
-    result = subprocess.run(
-        ["gh", "api", f"repos/{repo}/releases/latest"],
-        check=False,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
+def latest_tag(repo: str, *, fresh: bool = False) -> str:
+    payload = GITHUB.try_gh_json(
+        ["api", f"repos/{repo}/releases/latest"], fresh=fresh
     )
-    if result.returncode != 0:
-        return ""
-    try:
-        payload = json.loads(result.stdout)
-    except json.JSONDecodeError as error:
-        fail(f"GitHub latest release API returned invalid JSON: {error}")
     return str(payload.get("tag_name") or "") if isinstance(payload, dict) else ""
 
 
@@ -138,39 +123,33 @@ def wait_for_latest_tag(
     """Allow GitHub's latest-release projection a bounded propagation window."""
     if attempts < 1:
         fail("GitHub Latest verification needs at least one attempt")
-    observed = ""
-    for attempt in range(1, attempts + 1):
-        observed = latest_tag(repo)
-        if observed == expected_tag:
-            return observed
-        if attempt < attempts:
-            print(
-                f"GitHub Latest is still {observed or '<none>'}; "
-                f"waiting before retry {attempt + 1}/{attempts}",
-                flush=True,
-            )
-            time.sleep(delay_seconds)
+    waited = GITHUB.wait_for(
+        "GitHub Latest",
+        lambda attempt, _remaining: latest_tag(repo, fresh=attempt > 1),
+        policy=GITHUB.WaitPolicy(
+            attempts=attempts, initial_delay=delay_seconds, max_delay=10, deadline=60
+        ),
+        ready=lambda observed: observed == expected_tag,
+        describe=lambda observed: f"still {observed or '<none>'}",
+    )
+    if waited.ready:
+        return expected_tag
     fail(
         "formal unsigned release did not become GitHub Latest: "
-        f"expected {expected_tag!r}, got {observed!r}"
+        f"expected {expected_tag!r}, got {waited.value!r}"
     )
 
 
 def stable_source_tag(repo: str, alias_tag: str = "stable") -> str:
     """Return the signed source named by the managed stable alias."""
-    result = subprocess.run(
-        ["gh", "api", f"repos/{repo}/releases/tags/{alias_tag}"],
-        check=False,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
-    )
-    if result.returncode != 0:
-        return ""
-    try:
-        payload = json.loads(result.stdout)
-    except json.JSONDecodeError as error:
-        fail(f"GitHub stable alias API returned invalid JSON: {error}")
+    if alias_tag in PREFETCHED_ALIASES:
+        # A GraphQL release read already returned this alias; use it once so
+        # later checks observe the alias again after any publication.
+        payload = PREFETCHED_ALIASES.pop(alias_tag)
+    else:
+        payload = GITHUB.try_gh_json(
+            ["api", f"repos/{repo}/releases/tags/{alias_tag}"]
+        )
     if not isinstance(payload, dict):
         return ""
     if payload.get("draft") is not False or payload.get("prerelease") is not True:
@@ -191,53 +170,22 @@ def stable_source_tag(repo: str, alias_tag: str = "stable") -> str:
     return source_tag
 
 
-def fetch_release(repo: str, database_id: int, path: Path) -> dict:
-    release: object = None
-    assets: list[dict] = []
-    pending: list[str] = []
-    for attempt in range(5):
-        release = gh_json(["api", f"repos/{repo}/releases/{database_id}"])
-        pages = gh_json(
-            [
-                "api",
-                "--paginate",
-                "--slurp",
-                f"repos/{repo}/releases/{database_id}/assets?per_page=100",
-            ]
-        )
-        if not isinstance(release, dict) or not isinstance(pages, list):
-            fail("GitHub release API returned an unexpected payload")
-        assets = []
-        for page in pages:
-            if not isinstance(page, list) or not all(
-                isinstance(asset, dict) for asset in page
-            ):
-                fail("GitHub release asset API returned an unexpected page")
-            assets.extend(page)
-        pending = [
-            str(asset.get("name") or "<unnamed>")
-            for asset in assets
-            if DIGEST_RE.fullmatch(str(asset.get("digest") or "")) is None
-        ]
-        if not pending:
-            break
-        if attempt < 4:
-            print(
-                "Waiting for GitHub asset digests: " + ", ".join(pending),
-                flush=True,
-            )
-            time.sleep(2)
-    if not isinstance(release, dict):
-        fail("GitHub release API did not return a release")
-    if pending:
-        fail("GitHub did not provide SHA-256 digests for: " + ", ".join(pending))
-    release["assets"] = assets
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(
-        json.dumps(release, ensure_ascii=False, indent=2) + "\n",
-        encoding="utf-8",
+def fetch_release(
+    repo: str,
+    database_id: int,
+    path: Path,
+    *,
+    tag: str = "",
+    aliases: tuple[str, ...] = (),
+) -> dict:
+    return COMMON.fetch_release(
+        repo,
+        database_id,
+        path,
+        tag=tag,
+        aliases=aliases,
+        found_aliases=PREFETCHED_ALIASES,
     )
-    return release
 
 
 def previous_field(release: dict, label: str) -> str:
@@ -527,7 +475,7 @@ def existing_manifest_is_current(release: dict, assets: list[dict]) -> bool:
 
 
 def normalize_unsigned_updater_metadata(
-    *, repo: str, tag: str, release: dict, work_dir: Path
+    *, repo: str, tag: str, release: dict, work_dir: Path, plan
 ) -> bool:
     """Normalize Tauri's draft URLs before the manifest is generated."""
     if not has_updater_metadata(release):
@@ -536,37 +484,16 @@ def normalize_unsigned_updater_metadata(
     signatures_dir = work_dir / "updater-signatures"
     if signatures_dir.exists():
         shutil.rmtree(signatures_dir)
-    signatures_dir.mkdir(parents=True)
-    run(
-        [
-            "gh",
-            "release",
-            "download",
-            tag,
-            "--repo",
-            repo,
-            "--pattern",
-            "latest.json",
-            "--dir",
-            str(work_dir),
-            "--clobber",
-        ]
-    )
-    run(
-        [
-            "gh",
-            "release",
-            "download",
-            tag,
-            "--repo",
-            repo,
-            "--pattern",
-            "*.sig",
-            "--dir",
-            str(signatures_dir),
-            "--clobber",
-        ]
-    )
+    signature_names = [
+        str(asset.get("name") or "")
+        for asset in release.get("assets", [])
+        if isinstance(asset, dict)
+        and str(asset.get("name") or "").lower().endswith(".sig")
+    ]
+    files = plan.fetch(release, ["latest.json", *signature_names])
+    # The normalizer rewrites latest.json, so it gets its own copy.
+    shutil.copyfile(files.pop("latest.json"), metadata_path)
+    plan.link_into(files.values(), signatures_dir)
     normalizer = Path(__file__).with_name("normalize-updater-metadata.py")
     normalizer_command = [
         sys.executable,
@@ -596,40 +523,10 @@ def normalize_unsigned_updater_metadata(
             "--clobber",
         ]
     )
+    plan.adopt(metadata_path)
     return True
 
 
-def audit_release_assets(*, repo: str, tag: str, release: Path, work_dir: Path) -> None:
-    audit_dir = work_dir / "asset-audit"
-    if audit_dir.exists():
-        shutil.rmtree(audit_dir)
-    audit_dir.mkdir(parents=True)
-    run(
-        [
-            "gh",
-            "release",
-            "download",
-            tag,
-            "--repo",
-            repo,
-            "--dir",
-            str(audit_dir),
-            "--clobber",
-        ]
-    )
-    auditor = Path(__file__).with_name("audit-release-assets.py")
-    run(
-        [
-            sys.executable,
-            str(auditor),
-            "--release-json",
-            str(release),
-            "--root",
-            str(audit_dir),
-        ]
-    )
-
-
 def verify_device_guide(
     notes: str,
     *,
@@ -1073,6 +970,9 @@ def append_summary(
             f"- Prerelease: `{str(bool(release.get('prerelease'))).lower()}`\n"
             f"- Updater metadata: `{str(has_updater_metadata(release)).lower()}`\n"
             f"- Stable source preserved: `{stable_tag or 'none'}`\n"
+            f"- GitHub response cache: `{GITHUB.response_cache_summary()}`\n"
+            f"- GitHub rate limit: `{GITHUB.rate_limit_summary()}`\n"
+            f"- Propagation waits: {GITHUB.wait_summary()}\n"
         )
 
 
@@ -1086,6 +986,13 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--source-commit", default="")
     parser.add_argument("--platforms", default="")
     parser.add_argument("--highlights-file", type=Path)
+    parser.add_argument(
+        "--local-artifacts",
+        type=Path,
+        action="append",
+        default=[],
+        help="build output directory to audit instead of re-downloading matching assets",
+    )
     parser.add_argument("--allow-legacy-draft", action="store_true")
     parser.add_argument(
         "--work-dir", type=Path, default=Path("unsigned-release-check")
@@ -1106,11 +1013,15 @@ def main() -> int:
 
     work_dir = args.work_dir.resolve()
     work_dir.mkdir(parents=True, exist_ok=True)
+    GITHUB.ensure_response_cache(work_dir / "github-cache")
+    GITHUB.ensure_call_log(work_dir)
     release_path = work_dir / "release.json"
     manifest_path = work_dir / MANIFEST_NAME
 
     database_id = release_id(repo, tag)
-    release = fetch_release(repo, database_id, release_path)
+    release = fetch_release(
+        repo, database_id, release_path, tag=tag, aliases=("stable",)
+    )
     if release.get("tag_name") != tag:
         fail(f"unexpected release tag: {release.get('tag_name')!r}")
     resume_published = release.get("draft") is False
@@ -1167,18 +1078,29 @@ def main() -> int:
     source_ref = release_field(args.source_ref, release, "源码引用")
     source_commit = release_field(args.source_commit, release, "源码提交")
     platforms = release_field(args.platforms, release, "计划平台")
+    plan = DOWNLOADER.DownloadPlan(
+        repo=repo, tag=tag, directory=work_dir / "assets", run_gh=run
+    )
     updater_available = normalize_unsigned_updater_metadata(
         repo=repo,
         tag=tag,
         release=release,
         work_dir=work_dir,
+        plan=plan,
     )
     if updater_available:
-        release = fetch_release(repo, database_id, release_path)
+        release = fetch_release(repo, database_id, release_path, tag=tag)
     assets, installers = validate_assets(
         release, platforms, allow_updater=updater_available
     )
-    audit_release_assets(repo=repo, tag=tag, release=release_path, work_dir=work_dir)
+    COMMON.audit_release_assets(
+        repo=repo,
+        tag=tag,
+        release=release_path,
+        work_dir=work_dir,
+        local_dirs=[*args.local_artifacts, plan.directory],
+    )
+    print(f"Release downloads: {plan.summary()}", flush=True)
     if already_finalized:
         if not existing_manifest_is_current(release, assets):
             fail("published unsigned manifest no longer matches release assets")
@@ -1263,7 +1185,7 @@ def main() -> int:
             "--clobber",
         ]
     )
-    release = fetch_release(repo, database_id, release_path)
+    release = fetch_release(repo, database_id, release_path, tag=tag)
     validate_assets(release, platforms, allow_updater=updater_available)
     title = (
         f"番茄小说下载器 未签名版 {version}"
@@ -1279,7 +1201,7 @@ def main() -> int:
         mode=args.mode,
     )
 
-    published = fetch_release(repo, database_id, release_path)
+    published = fetch_release(repo, database_id, release_path, tag=tag)
     if published.get("draft") is not False:
         fail("unsigned release is still a draft after publication")
     if bool(published.get("prerelease")) != expected_prerelease:
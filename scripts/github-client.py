@@ -0,0 +1,1253 @@
+#!/usr/bin/env python3
+"""Shared GitHub API access for the release scripts.
+
+``FANQIE_GITHUB_CLIENT=gh`` (the default) keeps one ``gh`` process per call.
+``FANQIE_GITHUB_CLIENT=http`` answers ``gh api`` reads and writes in-process
+over kept-alive HTTPS connections; other ``gh`` commands still use the CLI.
+With ``FANQIE_GITHUB_CACHE_DIR`` set, in-process GET responses are revalidated
+with ``If-None-Match`` so unchanged payloads come back as cheap 304s.
+``FANQIE_GITHUB_GRAPHQL=1`` lets the finalizers read a release, all of its
+asset digests and the channel aliases in one GraphQL round-trip.
+
+Every read is memoized for the rest of the run and every write (``gh release
+upload``/``edit``, non-GET ``gh api`` calls, child release scripts) drops the
+memo, so repeated reads disappear without acting on state older than the
+last mutation. Polling loops pass ``fresh=True`` to bypass the memo.
+
+Propagation waits go through ``wait_for``: exponential backoff with jitter,
+bounded by an attempt count and a total deadline per ``WaitPolicy``. Each
+wait's outcome is kept for the step summary.
+
+In-process requests also pass through a ``RateGovernor`` that follows the
+``x-ratelimit-*`` headers per resource, spaces requests out once a budget runs
+low and sleeps through secondary-limit ``retry-after`` responses.
+
+Every GitHub call (API requests on either backend and ``gh release``
+commands) is recorded with its endpoint template, status, latency and bytes.
+``ensure_call_log`` shares one log with child release scripts and, at exit,
+writes a per-endpoint table to the step summary and ``github-calls.json``.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import hashlib
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Generic, Iterable, Iterator, TypeVar
+from urllib.parse import urljoin, urlsplit
+
+
+CLIENT_ENV = "FANQIE_GITHUB_CLIENT"
+API_URL_ENV = "FANQIE_GITHUB_API_URL"
+CACHE_DIR_ENV = "FANQIE_GITHUB_CACHE_DIR"
+GRAPHQL_ENV = "FANQIE_GITHUB_GRAPHQL"
+RUN_READS_ENV = "FANQIE_GITHUB_RUN_READS"
+CALL_LOG_ENV = "FANQIE_GITHUB_CALL_LOG"
+READ_ONLY_GH_COMMANDS = (
+    ["release", "download"],
+    ["release", "view"],
+    ["release", "list"],
+)
+# Child scripts that never change anything on GitHub, so memoized reads stay valid.
+LOCAL_SCRIPTS = {
+    "audit-release-assets.py",
+    "normalize-updater-metadata.py",
+    "prepare-release-artifacts.py",
+}
+DEFAULT_API_URL = "https://api.github.com"
+API_VERSION = "2022-11-28"
+USER_AGENT = "fanqie-release-tooling"
+BACKENDS = ("gh", "http")
+LINK_NEXT_RE = re.compile(r'<([^>]+)>\s*;\s*rel="next"')
+# Secondary-limit responses are retried this many times before failing.
+RATE_LIMIT_RETRIES = 3
+T = TypeVar("T")
+RELEASE_GRAPHQL_FIELDS = """
+    databaseId id tagName name description isDraft isPrerelease
+    createdAt publishedAt url
+    tagCommit { oid }
+    releaseAssets(first: 100%s) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        databaseId id name size contentType digest downloadUrl downloadCount
+        createdAt updatedAt
+      }
+    }
+"""
+_CLIENT: GitHubClient | None = None
+
+
+def fail(message: str) -> None:
+    raise SystemExit(message)
+
+
+def run_command(
+    command: list[str],
+    *,
+    capture: bool = False,
+    input_text: str | None = None,
+) -> str:
+    print("+", " ".join(command), flush=True)
+    result = subprocess.run(
+        command,
+        check=True,
+        text=True,
+        input=input_text,
+        stdout=subprocess.PIPE if capture else None,
+    )
+    return result.stdout.strip() if result.stdout is not None else ""
+
+
+@dataclass(frozen=True)
+class ApiCall:
+    method: str
+    path: str
+    paginate: bool = False
+    slurp: bool = False
+    has_input: bool = False
+
+
+@dataclass(frozen=True)
+class Response:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self) -> object:
+        try:
+            return json.loads(self.body.decode("utf-8") or "null")
+        except (UnicodeDecodeError, json.JSONDecodeError) as error:
+            fail(f"GitHub API returned invalid JSON: {error}")
+
+
+def parse_api_arguments(arguments: list[str]) -> ApiCall | None:
+    """Translate the ``gh api`` flags used by the release scripts.
+
+    Returns ``None`` for anything else so the caller can fall back to ``gh``.
+    """
+    if arguments[:1] != ["api"]:
+        return None
+    method = "GET"
+    path = ""
+    paginate = slurp = has_input = False
+    remaining = list(arguments[1:])
+    while remaining:
+        item = remaining.pop(0)
+        if item in ("--method", "-X") and remaining:
+            method = remaining.pop(0).upper()
+        elif item == "--paginate":
+            paginate = True
+        elif item == "--slurp":
+            slurp = True
+        elif item == "--input" and remaining and remaining[0] == "-":
+            remaining.pop(0)
+            has_input = True
+            # gh switches to POST once a request body is supplied.
+            method = "POST" if method == "GET" else method
+        elif item.startswith("-") or path:
+            return None
+        else:
+            path = item
+    if not path:
+        return None
+    return ApiCall(method, path, paginate, slurp, has_input)
+
+
+def read_key(arguments: list[str], input_text: str | None = None) -> str | None:
+    """Return the memo key for a read-only ``gh`` call, or ``None`` for writes."""
+    call = parse_api_arguments(arguments)
+    if call is None:
+        if arguments[:2] in (["release", "view"], ["release", "list"]):
+            return json.dumps([arguments, input_text])
+        return None
+    if call.method == "GET" and not call.has_input:
+        return json.dumps([arguments, input_text])
+    if call.path == "graphql" and input_text:
+        try:
+            query = str(json.loads(input_text).get("query") or "")
+        except (json.JSONDecodeError, AttributeError):
+            return None
+        if query.lstrip().startswith(("query", "{")):
+            return json.dumps([arguments, input_text])
+    return None
+
+
+def is_read_only_command(command: list[str]) -> bool:
+    if command[:1] == ["gh"]:
+        arguments = command[1:]
+        return arguments[:2] in READ_ONLY_GH_COMMANDS or (
+            parse_api_arguments(arguments) is not None
+            and read_key(arguments) is not None
+        )
+    if command[:1] == [sys.executable] and len(command) > 1:
+        return Path(command[1]).name in LOCAL_SCRIPTS
+    return False
+
+
+def endpoint_template(path: str) -> str:
+    """Collapse ids, tags and the repository in an API path to placeholders."""
+    segments = [segment for segment in urlsplit(path).path.split("/") if segment]
+    if segments[:1] == ["repos"] and len(segments) >= 3:
+        segments[1:3] = ["{owner}", "{repo}"]
+    template = []
+    for index, segment in enumerate(segments):
+        if index and segments[index - 1] == "tags":
+            template.append("{tag}")
+        elif segment.isdigit():
+            template.append("{id}")
+        else:
+            template.append(segment)
+    return "/".join(template)
+
+
+def describe_command(command: list[str]) -> tuple[str, str] | None:
+    """Return the (method, endpoint) a ``gh`` command is accounted under."""
+    if command[:1] != ["gh"] or len(command) < 2:
+        return None
+    if command[1] == "api":
+        call = parse_api_arguments(command[1:])
+        if call is not None:
+            return call.method, endpoint_template(call.path)
+        return "GH", "api"
+    if command[1] == "release" and len(command) >= 3:
+        return "GH", f"release {command[2]}"
+    return "GH", command[1]
+
+
+def option_value(command: list[str], option: str) -> str | None:
+    if option in command[:-1]:
+        return command[command.index(option) + 1]
+    return None
+
+
+def file_states(directory: Path) -> dict[Path, tuple[int, int]]:
+    if not directory.is_dir():
+        return {}
+    return {
+        path: (stat.st_mtime_ns, stat.st_size)
+        for path in directory.rglob("*")
+        if path.is_file() and (stat := path.stat())
+    }
+
+
+def transfer_bytes(
+    command: list[str], before: dict[Path, tuple[int, int]]
+) -> int:
+    """Size the payload a ``gh release`` upload sent or download wrote."""
+    if command[1:3] == ["release", "upload"]:
+        return sum(
+            Path(argument.split("#", 1)[0]).stat().st_size
+            for argument in command[4:]
+            if not argument.startswith("-")
+            and Path(argument.split("#", 1)[0]).is_file()
+        )
+    if command[1:3] == ["release", "download"]:
+        output = option_value(command, "--output")
+        if output:
+            path = Path(output)
+            return path.stat().st_size if path.is_file() else 0
+        directory = option_value(command, "--dir")
+        if directory is None:
+            return 0
+        after = file_states(Path(directory))
+        return sum(
+            state[1] for path, state in after.items() if before.get(path) != state
+        )
+    return 0
+
+
+@dataclass(frozen=True)
+class CallRecord:
+    endpoint: str
+    method: str
+    status: int
+    seconds: float
+    bytes: int
+
+    @property
+    def failed(self) -> bool:
+        # CLI records carry the exit code, HTTP records the response status.
+        return self.status >= 400 or 0 < self.status < 100
+
+
+def summarize_calls(records: list[CallRecord]) -> list[dict]:
+    totals: dict[tuple[str, str], dict] = {}
+    for record in records:
+        entry = totals.setdefault(
+            (record.endpoint, record.method),
+            {
+                "endpoint": record.endpoint,
+                "method": record.method,
+                "calls": 0,
+                "failed": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+                "bytes": 0,
+            },
+        )
+        entry["calls"] += 1
+        entry["failed"] += int(record.failed)
+        entry["seconds"] += record.seconds
+        entry["max_seconds"] = max(entry["max_seconds"], record.seconds)
+        entry["bytes"] += record.bytes
+    return sorted(totals.values(), key=lambda entry: -entry["seconds"])
+
+
+def calls_markdown(summary: list[dict]) -> str:
+    lines = [
+        "### GitHub calls",
+        "",
+        "| Endpoint | Method | Calls | Failed | Total s | Max s | Bytes |",
+        "| --- | --- | ---: | ---: | ---: | ---: | ---: |",
+    ]
+    for entry in summary:
+        lines.append(
+            f"| `{entry['endpoint']}` | {entry['method']} | {entry['calls']} | "
+            f"{entry['failed']} | {entry['seconds']:.2f} | "
+            f"{entry['max_seconds']:.2f} | {entry['bytes']} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RateBudget:
+    limit: int
+    remaining: int
+    reset: float
+    used: int
+    spent: int = 0
+
+
+class RateGovernor:
+    """Track GitHub's per-resource request budget from response headers.
+
+    Below ``low_water`` of the limit, requests are spread evenly over the time
+    left until the reset. An exhausted budget is waited out when the reset is
+    at most ``max_wait`` seconds away and fails fast otherwise, before a
+    publication is left half done.
+    """
+
+    def __init__(
+        self, *, low_water: float = 0.1, max_pace: float = 10, max_wait: float = 900
+    ) -> None:
+        self.low_water = low_water
+        self.max_pace = max_pace
+        self.max_wait = max_wait
+        self.budgets: dict[str, RateBudget] = {}
+
+    def before(self, resource: str) -> None:
+        budget = self.budgets.get(resource)
+        if budget is None:
+            return
+        left = budget.reset - time.time()
+        if left <= 0:
+            return
+        if budget.remaining <= 0:
+            if left > self.max_wait:
+                fail(
+                    f"GitHub {resource} rate limit is exhausted for another "
+                    f"{left:.0f}s; retry after the reset"
+                )
+            print(f"GitHub {resource} rate limit exhausted; waiting {left:.0f}s", flush=True)
+            time.sleep(left)
+        elif budget.remaining < budget.limit * self.low_water:
+            time.sleep(min(self.max_pace, left / budget.remaining))
+
+    def observe(self, response: Response) -> None:
+        headers = response.headers
+        try:
+            limit = int(headers["x-ratelimit-limit"])
+            remaining = int(headers["x-ratelimit-remaining"])
+            reset = float(headers["x-ratelimit-reset"])
+            used = int(headers.get("x-ratelimit-used", limit - remaining))
+        except (KeyError, ValueError):
+            return
+        resource = headers.get("x-ratelimit-resource", "core")
+        budget = self.budgets.get(resource)
+        if budget is None:
+            spent = 0 if response.status == 304 else 1
+        elif budget.reset != reset:
+            spent = budget.spent + used
+        else:
+            spent = budget.spent + max(0, used - budget.used)
+        self.budgets[resource] = RateBudget(limit, remaining, reset, used, spent)
+
+    def retry_delay(self, response: Response) -> float | None:
+        """Return how long to wait before retrying a rate-limited response."""
+        if response.status not in (403, 429):
+            return None
+        retry_after = response.headers.get("retry-after", "")
+        if retry_after.strip().isdigit():
+            return float(retry_after)
+        if response.headers.get("x-ratelimit-remaining") == "0":
+            try:
+                reset = float(response.headers["x-ratelimit-reset"])
+            except (KeyError, ValueError):
+                return None
+            return max(0.0, reset - time.time())
+        return None
+
+    def summary(self) -> str:
+        if not self.budgets:
+            return "not observed"
+        return "; ".join(
+            f"{resource} {budget.spent} used, {budget.remaining}/{budget.limit} left"
+            for resource, budget in sorted(self.budgets.items())
+        )
+
+
+class GitHubClient:
+    """Answer ``gh``-shaped requests through the configured backend."""
+
+    def __init__(
+        self,
+        *,
+        backend: str = "gh",
+        api_url: str = DEFAULT_API_URL,
+        token: str = "",
+        timeout: float = 30,
+        cache_dir: Path | None = None,
+    ) -> None:
+        if backend not in BACKENDS:
+            fail(f"unsupported GitHub client backend: {backend!r}")
+        self.backend = backend
+        self.api_url = api_url.rstrip("/") + "/"
+        self.token = token
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.read_hits = 0
+        self._reads: dict[str, object] = {}
+        self._connections: dict[tuple[str, str], http.client.HTTPConnection] = {}
+        self.governor = RateGovernor()
+        self.calls: list[CallRecord] = []
+        self.call_log: Path | None = None
+
+    @classmethod
+    def from_environment(cls) -> GitHubClient:
+        client = cls(
+            backend=os.environ.get(CLIENT_ENV, "").strip().lower() or "gh",
+            api_url=(
+                os.environ.get(API_URL_ENV, "").strip()
+                or os.environ.get("GITHUB_API_URL", "").strip()
+                or DEFAULT_API_URL
+            ),
+            token=(
+                os.environ.get("GH_TOKEN", "").strip()
+                or os.environ.get("GITHUB_TOKEN", "").strip()
+            ),
+            cache_dir=(
+                Path(os.environ[CACHE_DIR_ENV])
+                if os.environ.get(CACHE_DIR_ENV, "").strip()
+                else None
+            ),
+        )
+        client.load_run_reads()
+        inherited_log = os.environ.get(CALL_LOG_ENV, "").strip()
+        if inherited_log:
+            client.call_log = Path(inherited_log)
+        return client
+
+    def load_run_reads(self) -> None:
+        """Start from the reads a parent release script shared with this run."""
+        path = os.environ.get(RUN_READS_ENV, "").strip()
+        if not path:
+            return
+        try:
+            reads = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if isinstance(reads, dict):
+            self._reads = reads
+
+    def share_run_reads(self) -> None:
+        """Export the memo to child release scripts through the cache dir."""
+        if self.cache_dir is None:
+            os.environ.pop(RUN_READS_ENV, None)
+            return
+        path = self.cache_dir / "run-reads.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self._reads, ensure_ascii=False), encoding="utf-8")
+        os.environ[RUN_READS_ENV] = str(path)
+
+    def record_call(
+        self, endpoint: str, method: str, status: int, started: float, size: int
+    ) -> None:
+        record = CallRecord(
+            endpoint, method, status, round(time.monotonic() - started, 4), size
+        )
+        self.calls.append(record)
+        if self.call_log is not None:
+            self.call_log.parent.mkdir(parents=True, exist_ok=True)
+            with self.call_log.open("a", encoding="utf-8") as output:
+                output.write(json.dumps(asdict(record)) + "\n")
+
+    def logged_calls(self) -> list[CallRecord]:
+        """Return this run's calls, including those of child release scripts."""
+        if self.call_log is None or not self.call_log.is_file():
+            return list(self.calls)
+        records = []
+        for line in self.call_log.read_text(encoding="utf-8").splitlines():
+            try:
+                records.append(CallRecord(**json.loads(line)))
+            except (TypeError, ValueError):
+                continue
+        return records
+
+    def invalidate_reads(self) -> None:
+        self._reads.clear()
+
+    def close(self) -> None:
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        key = (scheme, netloc)
+        connection = self._connections.get(key)
+        if connection is None:
+            factory = (
+                http.client.HTTPSConnection
+                if scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = factory(netloc, timeout=self.timeout)
+            self._connections[key] = connection
+        return connection
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        """Send one request over a pooled connection and read the whole body.
+
+        Rate-limited responses are retried after the wait GitHub asks for.
+        """
+        target = urljoin(self.api_url, url)
+        parts = urlsplit(target)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            fail(f"unsupported GitHub API URL: {target!r}")
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request_headers = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": USER_AGENT,
+            "X-GitHub-Api-Version": API_VERSION,
+        }
+        if self.token:
+            request_headers["Authorization"] = f"Bearer {self.token}"
+        if body is not None:
+            request_headers["Content-Type"] = "application/json"
+        request_headers.update(headers or {})
+        resource = "graphql" if parts.path.rstrip("/").endswith("/graphql") else "core"
+        endpoint = endpoint_template(
+            target[len(self.api_url) - 1 :]
+            if target.startswith(self.api_url)
+            else parts.path
+        )
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.governor.before(resource)
+            started = time.monotonic()
+            response = self._exchange(
+                parts.scheme, parts.netloc, method, path, body, request_headers
+            )
+            self.record_call(
+                endpoint, method, response.status, started, len(response.body)
+            )
+            self.governor.observe(response)
+            delay = self.governor.retry_delay(response)
+            if (
+                delay is None
+                or attempt == RATE_LIMIT_RETRIES
+                or delay > self.governor.max_wait
+            ):
+                return response
+            print(
+                f"GitHub rate limit hit on {method} {path}; retrying in {delay:.0f}s",
+                flush=True,
+            )
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def _exchange(
+        self,
+        scheme: str,
+        netloc: str,
+        method: str,
+        path: str,
+        body: bytes | None,
+        headers: dict[str, str],
+    ) -> Response:
+        for attempt in range(2):
+            connection = self._connection(scheme, netloc)
+            reused = connection.sock is not None
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+            except (
+                http.client.RemoteDisconnected,
+                BrokenPipeError,
+                ConnectionResetError,
+            ):
+                # A kept-alive socket may have been closed by the server while
+                # idle; retry once on a fresh connection, never twice.
+                connection.close()
+                if attempt or not reused:
+                    raise
+                continue
+            if response.will_close:
+                connection.close()
+            return Response(
+                response.status,
+                {key.lower(): value for key, value in response.getheaders()},
+                payload,
+            )
+        raise AssertionError("unreachable")
+
+    def _cache_path(self, url: str) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256(urljoin(self.api_url, url).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, url: str) -> Response:
+        """GET ``url``, revalidating a stored ETag when the cache is enabled."""
+        path = self._cache_path(url)
+        entry: dict = {}
+        if path is not None and path.is_file():
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                entry = {}
+        etag = str(entry.get("etag") or "") if isinstance(entry, dict) else ""
+        headers = {"If-None-Match": etag} if etag else None
+        response = self.request("GET", url, headers=headers)
+        if path is None:
+            return response
+        if response.status == 304 and etag:
+            self.cache_hits += 1
+            return Response(
+                200,
+                {**dict(entry.get("headers") or {}), **response.headers},
+                str(entry.get("body") or "").encode("utf-8"),
+            )
+        self.cache_misses += 1
+        etag = response.headers.get("etag", "")
+        if response.status == 200 and etag:
+            try:
+                text = response.body.decode("utf-8")
+            except UnicodeDecodeError:
+                return response
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix(".tmp")
+            temporary.write_text(
+                json.dumps(
+                    {
+                        "url": urljoin(self.api_url, url),
+                        "etag": etag,
+                        "headers": {
+                            key: value
+                            for key, value in response.headers.items()
+                            if key == "link"
+                        },
+                        "body": text,
+                    },
+                    ensure_ascii=False,
+                ),
+                encoding="utf-8",
+            )
+            temporary.replace(path)
+        return response
+
+    def send(self, method: str, url: str, *, body: bytes | None = None) -> Response:
+        if method == "GET" and body is None:
+            return self.get(url)
+        return self.request(method, url, body=body)
+
+    def _api(self, call: ApiCall, input_text: str | None, *, optional: bool) -> object:
+        body = input_text.encode("utf-8") if call.has_input and input_text else None
+        if not call.paginate:
+            print("+", call.method, call.path, flush=True)
+            response = self.send(call.method, call.path, body=body)
+            if optional and response.status >= 400:
+                return None
+            if response.status >= 400:
+                fail(
+                    f"GitHub API {call.method} {call.path} failed: "
+                    f"HTTP {response.status}: {response.body[:200]!r}"
+                )
+            return response.json()
+        pages: list[object] = []
+        url: str | None = call.path
+        while url:
+            print("+", call.method, url, flush=True)
+            response = self.send(call.method, url, body=body)
+            if response.status >= 400:
+                if optional:
+                    return None
+                fail(
+                    f"GitHub API {call.method} {url} failed: "
+                    f"HTTP {response.status}: {response.body[:200]!r}"
+                )
+            pages.append(response.json())
+            match = LINK_NEXT_RE.search(response.headers.get("link", ""))
+            url = match.group(1) if match else None
+        if call.slurp:
+            return pages
+        if all(isinstance(page, list) for page in pages):
+            return [item for page in pages for item in page]
+        return pages[-1] if pages else None
+
+    def _memoized(self, key: str | None, fresh: bool, read):
+        if key is None:
+            try:
+                return read()
+            finally:
+                self.invalidate_reads()
+        if not fresh and key in self._reads:
+            self.read_hits += 1
+            return copy.deepcopy(self._reads[key])
+        value = read()
+        self._reads[key] = copy.deepcopy(value)
+        return value
+
+    def gh_json(
+        self,
+        arguments: list[str],
+        *,
+        input_text: str | None = None,
+        fresh: bool = False,
+    ) -> object:
+        def read() -> object:
+            call = parse_api_arguments(arguments)
+            if self.backend == "http" and call is not None:
+                return self._api(call, input_text, optional=False)
+            output = self.run_gh(
+                ["gh", *arguments], capture=True, input_text=input_text
+            )
+            try:
+                return json.loads(output)
+            except json.JSONDecodeError as error:
+                fail(f"GitHub CLI returned invalid JSON: {error}")
+
+        return self._memoized(read_key(arguments, input_text), fresh, read)
+
+    def try_gh_json(self, arguments: list[str], *, fresh: bool = False) -> object | None:
+        """Return ``None`` instead of failing when GitHub rejects the read."""
+
+        def read() -> object | None:
+            call = parse_api_arguments(arguments)
+            if self.backend == "http" and call is not None:
+                return self._api(call, None, optional=True)
+            method, endpoint = describe_command(["gh", *arguments]) or ("GH", "")
+            started = time.monotonic()
+            result = subprocess.run(
+                ["gh", *arguments],
+                check=False,
+                text=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            self.record_call(
+                endpoint,
+                method,
+                result.returncode,
+                started,
+                len(result.stdout.encode("utf-8")),
+            )
+            if result.returncode != 0:
+                return None
+            try:
+                return json.loads(result.stdout)
+            except json.JSONDecodeError as error:
+                fail(f"GitHub CLI returned invalid JSON: {error}")
+
+        key = read_key(arguments)
+        # Missing releases are memoized as None, which must not answer the
+        # failing gh_json() form of the same read.
+        return self._memoized(None if key is None else "optional:" + key, fresh, read)
+
+    def run(
+        self,
+        command: list[str],
+        *,
+        capture: bool = False,
+        input_text: str | None = None,
+    ) -> str:
+        """Run a command, dropping memoized reads unless it is read-only."""
+        if is_read_only_command(command):
+            return self.run_gh(command, capture=capture, input_text=input_text)
+        if command[:1] == [sys.executable]:
+            self.share_run_reads()
+        try:
+            return self.run_gh(command, capture=capture, input_text=input_text)
+        finally:
+            self.invalidate_reads()
+
+    def run_gh(
+        self,
+        command: list[str],
+        *,
+        capture: bool = False,
+        input_text: str | None = None,
+    ) -> str:
+        """Run ``command``, accounting for it when it is a ``gh`` call."""
+        described = describe_command(command)
+        if described is None:
+            return run_command(command, capture=capture, input_text=input_text)
+        download_dir = (
+            option_value(command, "--dir")
+            if command[1:3] == ["release", "download"]
+            else None
+        )
+        before = file_states(Path(download_dir)) if download_dir else {}
+        started = time.monotonic()
+        status = 0
+        output = ""
+        try:
+            output = run_command(command, capture=capture, input_text=input_text)
+        except subprocess.CalledProcessError as error:
+            status = error.returncode or 1
+            raise
+        finally:
+            try:
+                size = (
+                    len(output.encode("utf-8"))
+                    if capture
+                    else transfer_bytes(command, before)
+                )
+            except OSError:
+                size = 0
+            self.record_call(described[1], described[0], status, started, size)
+        return output
+
+
+def default_client() -> GitHubClient:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = GitHubClient.from_environment()
+    return _CLIENT
+
+
+def reset_client(client: GitHubClient | None = None) -> None:
+    """Replace the process-wide client; tests use this to inject a stand-in."""
+    global _CLIENT
+    if _CLIENT is not None and _CLIENT is not client:
+        _CLIENT.close()
+    _CLIENT = client
+
+
+def iter_pages(
+    path: str, *, per_page: int = 100, fresh: bool = False
+) -> Iterator[list]:
+    """Yield one REST list page at a time, in GitHub's order.
+
+    Unlike ``gh api --paginate --slurp`` nothing past the page the caller is
+    reading is requested, so consumers can stop early.
+    """
+    separator = "&" if "?" in path else "?"
+    page_number = 1
+    while True:
+        page = gh_json(
+            ["api", f"{path}{separator}per_page={per_page}&page={page_number}"],
+            fresh=fresh,
+        )
+        if not isinstance(page, list):
+            fail(f"GitHub list page is malformed: {path} page {page_number}")
+        yield page
+        if len(page) < per_page:
+            return
+        page_number += 1
+
+
+def newest_release(
+    releases: Iterable[dict], eligible: Callable[[dict], bool]
+) -> dict | None:
+    """Return the eligible release with the latest ``published_at``.
+
+    Releases arrive newest-created first, but a draft created before the
+    best candidate can still be published after it, so every release is read.
+    """
+    best: dict | None = None
+    best_key: tuple[str, int] | None = None
+    for release in releases:
+        if not eligible(release):
+            continue
+        key = (str(release.get("published_at") or ""), int(release.get("id") or 0))
+        if best_key is None or key > best_key:
+            best, best_key = release, key
+    return best
+
+
+@dataclass(frozen=True)
+class WaitPolicy:
+    attempts: int = 5
+    initial_delay: float = 2.0
+    factor: float = 2.0
+    max_delay: float = 30.0
+    deadline: float = 120.0
+    jitter: float = 0.2
+
+    def delay(self, step: int) -> float:
+        """Return the pause after failed attempt ``step`` (1-based).
+
+        The first pause is exactly ``initial_delay``; later ones grow by
+        ``factor`` up to ``max_delay`` and are spread by ``jitter``.
+        """
+        base = min(self.max_delay, self.initial_delay * self.factor ** (step - 1))
+        if step == 1 or self.jitter <= 0:
+            return base
+        return base * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+@dataclass(frozen=True)
+class WaitResult(Generic[T]):
+    label: str
+    ready: bool
+    value: T | None
+    error: Exception | None
+    attempts: int
+    elapsed: float
+
+
+WAIT_RESULTS: list[WaitResult] = []
+
+
+def wait_for(
+    label: str,
+    check: Callable[[int, float], T],
+    *,
+    policy: WaitPolicy,
+    ready: Callable[[T], bool] = bool,
+    describe: Callable[[T], str] = str,
+    retry_on: tuple[type[Exception], ...] = (),
+) -> WaitResult[T]:
+    """Call ``check(attempt, remaining_seconds)`` until ``ready`` accepts it.
+
+    Exceptions listed in ``retry_on`` count as a not-ready attempt. The wait
+    ends early when the next pause would overrun ``policy.deadline``; the
+    caller decides how to report a wait that never became ready.
+    """
+    if policy.attempts < 1:
+        fail(f"{label} needs at least one attempt")
+    started = time.monotonic()
+    value: T | None = None
+    error: Exception | None = None
+    attempt = 0
+    done = False
+    while not done:
+        attempt += 1
+        remaining = max(0.0, policy.deadline - (time.monotonic() - started))
+        try:
+            value = check(attempt, remaining)
+            error = None
+            done = ready(value)
+            detail = "" if done else describe(value)
+        except retry_on as caught:
+            value, error = None, caught
+            detail = str(caught)
+        if done or attempt >= policy.attempts:
+            break
+        pause = policy.delay(attempt)
+        if time.monotonic() - started + pause > policy.deadline:
+            break
+        print(
+            f"{label}: {detail}; retry {attempt + 1}/{policy.attempts} in {pause:.1f}s",
+            flush=True,
+        )
+        time.sleep(pause)
+    result = WaitResult(
+        label=label,
+        ready=done,
+        value=value,
+        error=error,
+        attempts=attempt,
+        elapsed=time.monotonic() - started,
+    )
+    WAIT_RESULTS.append(result)
+    print(
+        f"{label}: {'ready' if done else 'gave up'} after {attempt} "
+        f"attempt(s) in {result.elapsed:.1f}s",
+        flush=True,
+    )
+    return result
+
+
+def wait_summary() -> str:
+    if not WAIT_RESULTS:
+        return "none"
+    return "; ".join(
+        f"{result.label} {'ready' if result.ready else 'gave up'} "
+        f"after {result.attempts} attempt(s) in {result.elapsed:.1f}s"
+        for result in WAIT_RESULTS
+    )
+
+
+def refresh_assets(
+    repo: str, assets: list[dict], names: Iterable[str]
+) -> list[dict] | None:
+    """Re-read only the named assets and merge them back into ``assets``.
+
+    Returns ``None`` when one of them has no REST id or is gone, in which
+    case the caller must relist the whole release.
+    """
+    wanted = set(names)
+    merged = []
+    for asset in assets:
+        if str(asset.get("name") or "<unnamed>") not in wanted:
+            merged.append(asset)
+            continue
+        asset_id = asset.get("id")
+        if not isinstance(asset_id, int) or isinstance(asset_id, bool):
+            return None
+        current = try_gh_json(
+            ["api", f"repos/{repo}/releases/assets/{asset_id}"], fresh=True
+        )
+        if not isinstance(current, dict) or current.get("id") != asset_id:
+            return None
+        merged.append(current)
+    return merged
+
+
+def graphql_enabled() -> bool:
+    return os.environ.get(GRAPHQL_ENV, "").strip().lower() in ("1", "true", "yes")
+
+
+def graphql(query: str, variables: dict, *, fresh: bool = False) -> dict:
+    payload = gh_json(
+        ["api", "--method", "POST", "graphql", "--input", "-"],
+        input_text=json.dumps({"query": query, "variables": variables}),
+        fresh=fresh,
+    )
+    if not isinstance(payload, dict):
+        fail("GitHub GraphQL API returned an unexpected payload")
+    if payload.get("errors"):
+        messages = [
+            str(error.get("message") or error)
+            for error in payload["errors"]
+            if isinstance(error, dict)
+        ]
+        fail("GitHub GraphQL API failed: " + "; ".join(messages or ["unknown error"]))
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        fail("GitHub GraphQL API returned no data")
+    return data
+
+
+def rest_release_from_graphql(node: dict, repo: str) -> dict:
+    """Map a GraphQL ``Release`` onto the REST fields ``release.json`` carries.
+
+    Asset ``id`` and ``url`` are rebuilt from ``databaseId`` so snapshots can
+    be streamed and refreshed like REST listings of ``repo``.
+    """
+    api_url = default_client().api_url
+    release = {
+        "id": node.get("databaseId"),
+        "node_id": node.get("id"),
+        "tag_name": node.get("tagName"),
+        "name": node.get("name"),
+        "body": node.get("description") or "",
+        "draft": node.get("isDraft"),
+        "prerelease": node.get("isPrerelease"),
+        "created_at": node.get("createdAt"),
+        "published_at": node.get("publishedAt"),
+        "html_url": node.get("url"),
+    }
+    commit = node.get("tagCommit")
+    if isinstance(commit, dict) and commit.get("oid"):
+        release["target_commitish"] = commit["oid"]
+    connection = node.get("releaseAssets") or {}
+    release["assets"] = []
+    for asset in connection.get("nodes") or []:
+        if not isinstance(asset, dict):
+            continue
+        mapped = {
+            "id": asset.get("databaseId"),
+            "node_id": asset.get("id"),
+            "name": asset.get("name"),
+            "size": asset.get("size"),
+            "content_type": asset.get("contentType"),
+            "digest": asset.get("digest"),
+            "browser_download_url": asset.get("downloadUrl"),
+            "download_count": asset.get("downloadCount"),
+            "created_at": asset.get("createdAt"),
+            "updated_at": asset.get("updatedAt"),
+            "state": "uploaded",
+        }
+        if isinstance(mapped["id"], int):
+            path = f"repos/{repo}/releases/assets/{mapped['id']}"
+            mapped["url"] = urljoin(api_url, path)
+        release["assets"].append(mapped)
+    return release
+
+
+def fetch_release_graphql(
+    repo: str, tag: str, *, aliases: tuple[str, ...] = (), fresh: bool = False
+) -> tuple[dict | None, dict[str, dict | None]]:
+    """Read ``tag`` with every asset digest, plus each alias release, at once.
+
+    Missing releases map to ``None``. Asset pages beyond the first hundred are
+    read with follow-up queries for the target release only.
+    """
+    owner, name = repo.split("/", 1)
+    fields = RELEASE_GRAPHQL_FIELDS % ""
+    target_fields = RELEASE_GRAPHQL_FIELDS % ", after: $after"
+    selections = [f"target: release(tagName: $tag) {{{target_fields}}}"]
+    declarations = [
+        "$owner: String!",
+        "$name: String!",
+        "$tag: String!",
+        "$after: String",
+    ]
+    variables: dict = {"owner": owner, "name": name, "tag": tag, "after": None}
+    for index, alias in enumerate(aliases):
+        selections.append(f"alias{index}: release(tagName: $alias{index}) {{{fields}}}")
+        declarations.append(f"$alias{index}: String!")
+        variables[f"alias{index}"] = alias
+    query = (
+        f"query({', '.join(declarations)}) {{\n"
+        "  repository(owner: $owner, name: $name) {\n    "
+        + "\n    ".join(selections)
+        + "\n  }\n}"
+    )
+    repository = graphql(query, variables, fresh=fresh).get("repository")
+    if not isinstance(repository, dict):
+        fail(f"GitHub GraphQL API cannot read repository {repo!r}")
+    found = {
+        alias: (
+            rest_release_from_graphql(repository[f"alias{index}"], repo)
+            if isinstance(repository.get(f"alias{index}"), dict)
+            else None
+        )
+        for index, alias in enumerate(aliases)
+    }
+    target = repository.get("target")
+    if not isinstance(target, dict):
+        return None, found
+    release = rest_release_from_graphql(target, repo)
+    page_info = (target.get("releaseAssets") or {}).get("pageInfo") or {}
+    while page_info.get("hasNextPage"):
+        variables = {
+            "owner": owner,
+            "name": name,
+            "tag": tag,
+            "after": page_info.get("endCursor"),
+        }
+        query = (
+            "query($owner: String!, $name: String!, $tag: String!, $after: String) {\n"
+            "  repository(owner: $owner, name: $name) {\n    "
+            + selections[0]
+            + "\n  }\n}"
+        )
+        repository = graphql(query, variables, fresh=fresh).get("repository") or {}
+        page = repository.get("target")
+        if not isinstance(page, dict):
+            fail(f"GitHub GraphQL API lost release {tag!r} while paging assets")
+        release["assets"].extend(rest_release_from_graphql(page, repo)["assets"])
+        page_info = (page.get("releaseAssets") or {}).get("pageInfo") or {}
+    return release, found
+
+
+def ensure_response_cache(directory: Path) -> None:
+    """Cache GET responses in ``directory`` unless a parent run already chose one.
+
+    The choice is exported so child release scripts share the same cache.
+    """
+    client = default_client()
+    if client.cache_dir is None:
+        client.cache_dir = directory
+        os.environ[CACHE_DIR_ENV] = str(directory)
+
+
+def ensure_call_log(work_dir: Path) -> None:
+    """Log GitHub calls under ``work_dir`` unless a parent run already does.
+
+    The run that starts the log also reports it at exit, including the calls
+    of child release scripts, so a failed run still shows where time went.
+    """
+    client = default_client()
+    if client.call_log is not None:
+        return
+    inherited = os.environ.get(CALL_LOG_ENV, "").strip()
+    if inherited:
+        client.call_log = Path(inherited)
+        return
+    client.call_log = work_dir / "github-calls.jsonl"
+    client.call_log.parent.mkdir(parents=True, exist_ok=True)
+    client.call_log.write_text(
+        "".join(json.dumps(asdict(record)) + "\n" for record in client.calls),
+        encoding="utf-8",
+    )
+    os.environ[CALL_LOG_ENV] = str(client.call_log)
+    atexit.register(report_calls, work_dir / "github-calls.json")
+
+
+def report_calls(path: Path) -> list[dict]:
+    """Write the per-endpoint call table to ``path`` and the step summary."""
+    summary = summarize_calls(default_client().logged_calls())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps({"endpoints": summary}, ensure_ascii=False, indent=2) + "\n",
+        encoding="utf-8",
+    )
+    step_summary = os.environ.get("GITHUB_STEP_SUMMARY", "").strip()
+    if step_summary and summary:
+        with Path(step_summary).open("a", encoding="utf-8", newline="\n") as output:
+            output.write("\n" + calls_markdown(summary))
+    return summary
+
+
+def rate_limit_summary() -> str:
+    client = default_client()
+    if client.backend != "http":
+        return "not tracked by the gh backend"
+    return client.governor.summary()
+
+
+def response_cache_summary() -> str:
+    client = default_client()
+    if client.cache_dir is None or client.backend != "http":
+        return f"disabled; {client.read_hits} memoized reads"
+    return (
+        f"{client.cache_hits} hits / {client.cache_misses} misses; "
+        f"{client.read_hits} memoized reads"
+    )
+
+
+def run(
+    command: list[str],
+    *,
+    capture: bool = False,
+    input_text: str | None = None,
+) -> str:
+    return default_client().run(command, capture=capture, input_text=input_text)
+
+
+def gh_json(
+    arguments: list[str],
+    *,
+    input_text: str | None = None,
+    fresh: bool = False,
+) -> object:
+    return default_client().gh_json(arguments, input_text=input_text, fresh=fresh)
+
+
+def try_gh_json(arguments: list[str], *, fresh: bool = False) -> object | None:
+    return default_client().try_gh_json(arguments, fresh=fresh)
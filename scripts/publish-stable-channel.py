@@ -4,13 +4,14 @@
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import json
 import os
 import re
-import subprocess
-import time
+import sys
 import urllib.request
 from pathlib import Path
+from typing import Iterable, Iterator
 from urllib.parse import quote, unquote, urlsplit
 
 
@@ -35,29 +36,51 @@ def fail(message: str) -> None:
     raise SystemExit(message)
 
 
+def load_github_client():
+    module = sys.modules.get("fanqie_github_client")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("github-client.py")
+    spec = importlib.util.spec_from_file_location("fanqie_github_client", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load GitHub client: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+GITHUB = load_github_client()
+
+
+def load_release_index():
+    module = sys.modules.get("fanqie_release_index")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("release-index.py")
+    spec = importlib.util.spec_from_file_location("fanqie_release_index", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load release index: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+RELEASE_INDEX = load_release_index()
+
+
 def run(
     command: list[str],
     *,
     capture: bool = False,
     input_text: str | None = None,
 ) -> str:
-    print("+", " ".join(command), flush=True)
-    result = subprocess.run(
-        command,
-        check=True,
-        text=True,
-        input=input_text,
-        stdout=subprocess.PIPE if capture else None,
-    )
-    return result.stdout.strip() if result.stdout is not None else ""
+    return GITHUB.run(command, capture=capture, input_text=input_text)
 
 
 def gh_json(arguments: list[str], *, input_text: str | None = None) -> object:
-    output = run(["gh", *arguments], capture=True, input_text=input_text)
-    try:
-        return json.loads(output)
-    except json.JSONDecodeError as error:
-        fail(f"GitHub CLI returned invalid JSON: {error}")
+    return GITHUB.gh_json(arguments, input_text=input_text)
 
 
 def validate_repo(repo: str) -> str:
@@ -67,23 +90,8 @@ def validate_repo(repo: str) -> str:
     return value
 
 
-def list_releases(repo: str) -> list[dict]:
-    payload = gh_json(
-        [
-            "api",
-            "--paginate",
-            "--slurp",
-            f"repos/{repo}/releases?per_page=100",
-        ]
-    )
-    if not isinstance(payload, list):
-        fail("GitHub release list returned an unexpected payload")
-    releases: list[dict] = []
-    for page in payload:
-        if not isinstance(page, list):
-            fail("GitHub release list page is malformed")
-        releases.extend(item for item in page if isinstance(item, dict))
-    return releases
+def iter_releases(repo: str, *, full: bool = False) -> Iterator[dict]:
+    return RELEASE_INDEX.iter_releases(repo, full=full)
 
 
 def asset_names(release: dict) -> set[str]:
@@ -115,51 +123,57 @@ def is_signed_release(release: dict) -> bool:
 
 
 def select_signed_release(
-    releases: list[dict], requested_tag: str = ""
+    releases: Iterable[dict], requested_tag: str = ""
 ) -> dict:
     requested = requested_tag.strip()
     if requested:
-        matches = [
-            release
-            for release in releases
-            if release.get("tag_name") == requested
-        ]
-        if len(matches) != 1:
+        # Tags are unique, so the first match ends the listing.
+        match = next(
+            (
+                release
+                for release in releases
+                if release.get("tag_name") == requested
+            ),
+            None,
+        )
+        if match is None:
             fail(f"signed source release not found: {requested!r}")
-        if not is_signed_release(matches[0]):
+        if not is_signed_release(match):
             fail(f"source release is not a published signed release: {requested!r}")
-        return matches[0]
+        return match
 
-    candidates = [release for release in releases if is_signed_release(release)]
-    candidates.sort(
-        key=lambda release: (
-            str(release.get("published_at") or ""),
-            int(release.get("id") or 0),
-        ),
-        reverse=True,
-    )
-    if not candidates:
+    candidate = GITHUB.newest_release(releases, is_signed_release)
+    if candidate is None:
         fail("no published signed release with updater metadata is available")
-    return candidates[0]
+    return candidate
 
 
-def release_by_tag(repo: str, tag: str) -> dict | None:
-    result = subprocess.run(
-        ["gh", "api", f"repos/{repo}/releases/tags/{quote(tag, safe='')}"],
-        check=False,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
+def release_by_tag(repo: str, tag: str, *, fresh: bool = False) -> dict | None:
+    payload = GITHUB.try_gh_json(
+        ["api", f"repos/{repo}/releases/tags/{quote(tag, safe='')}"], fresh=fresh
     )
-    if result.returncode != 0:
-        return None
-    try:
-        payload = json.loads(result.stdout)
-    except json.JSONDecodeError as error:
-        fail(f"GitHub release API returned invalid JSON for {tag!r}: {error}")
     return payload if isinstance(payload, dict) else None
 
 
+def find_signed_release(repo: str, requested_tag: str = "") -> dict:
+    """Return GitHub's current copy of the signed source release.
+
+    Index rows past the first page can be a day old, so a requested tag is
+    read directly and an indexed pick is re-read, resyncing fully once if it
+    no longer qualifies.
+    """
+    requested = requested_tag.strip()
+    if requested:
+        current = release_by_tag(repo, requested, fresh=True)
+        return select_signed_release([current] if current else [], requested)
+    for full in (False, True):
+        tag = str(select_signed_release(iter_releases(repo, full=full))["tag_name"])
+        current = release_by_tag(repo, tag, fresh=True)
+        if current is not None and is_signed_release(current):
+            return current
+    fail(f"signed source release changed while it was selected: {tag!r}")
+
+
 def source_metadata_url(repo: str, source_tag: str) -> str:
     return (
         f"https://github.com/{repo}/releases/download/"
@@ -388,26 +402,33 @@ def download_public_metadata(
 ) -> dict:
     if attempts < 1:
         fail("stable metadata verification needs at least one attempt")
-    last_error: Exception | None = None
-    for attempt in range(1, attempts + 1):
-        try:
-            with urllib.request.urlopen(url, timeout=20) as response:
-                status = getattr(response, "status", None)
-                if status is not None and status != 200:
-                    raise RuntimeError(f"HTTP {status}")
-                downloaded = json.loads(response.read().decode("utf-8"))
-            if not isinstance(downloaded, dict):
-                raise ValueError("endpoint returned a non-object JSON value")
-            if downloaded != expected:
-                raise ValueError("endpoint still serves different metadata")
-            return downloaded
-        except Exception as error:  # noqa: BLE001 - bounded public endpoint verification
-            last_error = error
-            if attempt < attempts:
-                time.sleep(delay_seconds)
+
+    def check(_attempt: int, remaining: float) -> dict:
+        with urllib.request.urlopen(url, timeout=min(20, max(1, remaining))) as response:
+            status = getattr(response, "status", None)
+            if status is not None and status != 200:
+                raise RuntimeError(f"HTTP {status}")
+            downloaded = json.loads(response.read().decode("utf-8"))
+        if not isinstance(downloaded, dict):
+            raise ValueError("endpoint returned a non-object JSON value")
+        if downloaded != expected:
+            raise ValueError("endpoint still serves different metadata")
+        return downloaded
+
+    waited = GITHUB.wait_for(
+        "stable metadata endpoint",
+        check,
+        policy=GITHUB.WaitPolicy(
+            attempts=attempts, initial_delay=delay_seconds, max_delay=15, deadline=90
+        ),
+        # Bounded public endpoint verification: any failure is worth a retry.
+        retry_on=(Exception,),
+    )
+    if waited.ready:
+        return waited.value
     fail(
         "stable metadata endpoint is not readable after "
-        f"{attempts} attempts: {last_error}"
+        f"{waited.attempts} attempts: {waited.error}"
     )
 
 
@@ -460,8 +481,9 @@ def refresh_stable_channel(
     repo = validate_repo(repo)
     if not re.fullmatch(r"[^/]+", alias_tag.strip()) or not alias_tag.strip():
         fail(f"invalid stable alias tag: {alias_tag!r}")
-    releases = list_releases(repo)
-    source_release = select_signed_release(releases, source_tag)
+    GITHUB.ensure_response_cache(work_dir / "github-cache")
+    GITHUB.ensure_call_log(work_dir)
+    source_release = find_signed_release(repo, source_tag)
     source_tag = str(source_release.get("tag_name") or "")
     metadata = download_source_metadata(
         repo=repo,
@@ -4,13 +4,14 @@
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import json
 import os
 import re
-import subprocess
-import time
+import sys
 import urllib.request
 from pathlib import Path
+from typing import Iterable, Iterator
 from urllib.parse import quote, unquote, urlsplit
 
 
@@ -35,38 +36,50 @@ def fail(message: str) -> None:
     raise SystemExit(message)
 
 
+def load_github_client():
+    module = sys.modules.get("fanqie_github_client")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("github-client.py")
+    spec = importlib.util.spec_from_file_location("fanqie_github_client", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load GitHub client: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+GITHUB = load_github_client()
+
+
+def load_release_index():
+    module = sys.modules.get("fanqie_release_index")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("release-index.py")
+    spec = importlib.util.spec_from_file_location("fanqie_release_index", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load release index: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+RELEASE_INDEX = load_release_index()
+
+
 def run(command: list[str], *, capture: bool = False, input_text: str | None = None) -> str:
-    print("+", " ".join(command), flush=True)
-    result = subprocess.run(
-        command,
-        check=True,
-        text=True,
-        input=input_text,
-        stdout=subprocess.PIPE if capture else None,
-    )
-    return result.stdout.strip() if result.stdout is not None else ""
+    return GITHUB.run(command, capture=capture, input_text=input_text)
 
 
 def gh_json(arguments: list[str], *, input_text: str | None = None) -> object:
-    try:
-        return json.loads(run(["gh", *arguments], capture=True, input_text=input_text))
-    except json.JSONDecodeError as error:
-        fail(f"GitHub CLI returned invalid JSON: {error}")
+    return GITHUB.gh_json(arguments, input_text=input_text)
 
 
-def list_releases(repo: str) -> list[dict]:
-    payload = gh_json(
-        ["api", "--paginate", "--slurp", f"repos/{repo}/releases?per_page=100"]
-    )
-    if not isinstance(payload, list):
-        fail("GitHub release list is malformed")
-    return [
-        item
-        for page in payload
-        if isinstance(page, list)
-        for item in page
-        if isinstance(item, dict)
-    ]
+def iter_releases(repo: str, *, full: bool = False) -> Iterator[dict]:
+    return RELEASE_INDEX.iter_releases(repo, full=full)
 
 
 def names(release: dict) -> set[str]:
@@ -82,50 +95,61 @@ def has_updater(release: dict) -> bool:
     return METADATA_NAME in values and any(name.endswith(".sig") for name in values)
 
 
-def select_source(releases: list[dict], requested: str = "") -> dict:
-    requested = requested.strip()
-    candidates = (
-        [item for item in releases if item.get("tag_name") == requested]
-        if requested
-        else [
-            item
-            for item in releases
-            if UNSIGNED_TAG_RE.fullmatch(str(item.get("tag_name") or ""))
-        ]
-    )
-    candidates = [
-        item
-        for item in candidates
-        if item.get("draft") is False
+def is_source_candidate(item: dict) -> bool:
+    return (
+        item.get("draft") is False
         and item.get("prerelease") is False
         and has_updater(item)
-    ]
-    candidates.sort(
-        key=lambda item: (str(item.get("published_at") or ""), int(item.get("id") or 0)),
-        reverse=True,
     )
-    if not candidates:
+
+
+def select_source(releases: Iterable[dict], requested: str = "") -> dict:
+    requested = requested.strip()
+    if requested:
+        # Tags are unique, so the first match ends the listing.
+        match = next(
+            (item for item in releases if item.get("tag_name") == requested), None
+        )
+        candidate = match if match is not None and is_source_candidate(match) else None
+    else:
+        candidate = GITHUB.newest_release(
+            releases,
+            lambda item: bool(
+                UNSIGNED_TAG_RE.fullmatch(str(item.get("tag_name") or ""))
+            )
+            and is_source_candidate(item),
+        )
+    if candidate is None:
         fail("no published unsigned release with updater metadata is available")
-    return candidates[0]
+    return candidate
 
 
-def release_by_tag(repo: str, tag: str) -> dict | None:
-    result = subprocess.run(
-        ["gh", "api", f"repos/{repo}/releases/tags/{quote(tag, safe='')}"],
-        check=False,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
+def release_by_tag(repo: str, tag: str, *, fresh: bool = False) -> dict | None:
+    value = GITHUB.try_gh_json(
+        ["api", f"repos/{repo}/releases/tags/{quote(tag, safe='')}"], fresh=fresh
     )
-    if result.returncode != 0:
-        return None
-    try:
-        value = json.loads(result.stdout)
-    except json.JSONDecodeError as error:
-        fail(f"GitHub release API returned invalid JSON: {error}")
     return value if isinstance(value, dict) else None
 
 
+def find_source(repo: str, requested: str = "") -> dict:
+    """Return GitHub's current copy of the unsigned source release.
+
+    Index rows past the first page can be a day old, so a requested tag is
+    read directly and an indexed pick is re-read, resyncing fully once if it
+    no longer qualifies.
+    """
+    requested = requested.strip()
+    if requested:
+        current = release_by_tag(repo, requested, fresh=True)
+        return select_source([current] if current else [], requested)
+    for full in (False, True):
+        tag = str(select_source(iter_releases(repo, full=full))["tag_name"])
+        current = release_by_tag(repo, tag, fresh=True)
+        if current is not None and is_source_candidate(current):
+            return current
+    fail(f"unsigned source release changed while it was selected: {tag!r}")
+
+
 def validate_metadata(repo: str, source: dict, metadata: dict) -> None:
     source_tag = str(source.get("tag_name") or "")
     source_assets = {
@@ -274,22 +298,28 @@ def remove_extra_assets(repo: str, alias: dict) -> None:
 
 def verify_public(repo: str, alias_tag: str, expected: dict, source_tag: str) -> None:
     url = f"https://github.com/{repo}/releases/download/{quote(alias_tag, safe='')}/{METADATA_NAME}"
-    for attempt in range(1, 6):
-        try:
-            with urllib.request.urlopen(url, timeout=20) as response:
-                if getattr(response, "status", 200) != 200:
-                    raise RuntimeError(f"HTTP {response.status}")
-                actual = json.loads(response.read().decode("utf-8"))
-            if actual != expected:
-                raise RuntimeError("endpoint returned different metadata")
-            for entry in actual.get("platforms", {}).values():
-                if f"/download/{quote(source_tag, safe='')}/" not in str(entry.get("url") or ""):
-                    raise RuntimeError("endpoint rewrote the source tag")
-            return
-        except Exception as error:  # noqa: BLE001 - bounded public endpoint retry
-            if attempt == 5:
-                fail(f"unsigned metadata endpoint verification failed: {error}")
-            time.sleep(2)
+
+    def check(_attempt: int, remaining: float) -> bool:
+        with urllib.request.urlopen(url, timeout=min(20, max(1, remaining))) as response:
+            if getattr(response, "status", 200) != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            actual = json.loads(response.read().decode("utf-8"))
+        if actual != expected:
+            raise RuntimeError("endpoint returned different metadata")
+        for entry in actual.get("platforms", {}).values():
+            if f"/download/{quote(source_tag, safe='')}/" not in str(entry.get("url") or ""):
+                raise RuntimeError("endpoint rewrote the source tag")
+        return True
+
+    waited = GITHUB.wait_for(
+        "unsigned metadata endpoint",
+        check,
+        policy=GITHUB.WaitPolicy(initial_delay=2, max_delay=15, deadline=90, attempts=5),
+        # Bounded public endpoint retry: any failure is worth another look.
+        retry_on=(Exception,),
+    )
+    if not waited.ready:
+        fail(f"unsigned metadata endpoint verification failed: {waited.error}")
 
 
 def refresh_unsigned_channel(
@@ -297,7 +327,9 @@ def refresh_unsigned_channel(
 ) -> str:
     if not os.environ.get("GH_TOKEN"):
         fail("GH_TOKEN is required")
-    source = select_source(list_releases(repo), source_tag)
+    GITHUB.ensure_response_cache(work_dir / "github-cache")
+    GITHUB.ensure_call_log(work_dir)
+    source = find_source(repo, source_tag)
     source_tag = str(source.get("tag_name") or "")
     metadata_path, metadata = download_metadata(repo, source_tag, work_dir)
     validate_metadata(repo, source, metadata)
@@ -0,0 +1,667 @@
+#!/usr/bin/env python3
+"""Download every asset of a release over parallel, resumable HTTP ranges.
+
+Each asset is requested through its REST ``url`` with
+``Accept: application/octet-stream``. GitHub redirects that to signed storage,
+which is then fetched without the API token. The first range of an asset
+doubles as the probe: a ``206`` answer splits the rest of the file into
+``part_size`` ranges shared by the worker pool, a ``200`` answer is streamed
+whole. Interrupted ranges resume from the last written byte. Files are
+written as ``.<name>.part`` and renamed only once every asset is complete, so
+the directory ends up holding exactly the release's asset names.
+
+``stream`` instead hands each asset's bytes, in order, to a sink (such as the
+streaming asset audit) without writing them anywhere; assets run in parallel
+and an interrupted body resumes from the byte the sink last received.
+
+With ``FANQIE_ASSET_CACHE_DIR`` set, assets whose GitHub digest is already in
+the content-addressed asset cache are served from disk instead, and freshly
+fetched assets are added to it.
+
+``DownloadPlan`` keeps one finalize run from fetching an asset twice: every
+phase asks it for the assets it needs and receives shared read-only paths.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Protocol
+from urllib.parse import urljoin, urlsplit
+
+
+JOBS_ENV = "FANQIE_DOWNLOAD_JOBS"
+DEFAULT_JOBS = 4
+PART_SIZE = 32 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+ATTEMPTS = 4
+MAX_REDIRECTS = 5
+USER_AGENT = "fanqie-release-tooling"
+
+
+def fail(message: str) -> None:
+    raise SystemExit(message)
+
+
+def load_github_client():
+    module = sys.modules.get("fanqie_github_client")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("github-client.py")
+    spec = importlib.util.spec_from_file_location("fanqie_github_client", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load GitHub client: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+GITHUB = load_github_client()
+
+
+def load_asset_cache():
+    module = sys.modules.get("fanqie_asset_cache")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("asset-cache.py")
+    spec = importlib.util.spec_from_file_location("fanqie_asset_cache", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load asset cache: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+CACHE = load_asset_cache()
+
+
+class RangeError(Exception):
+    """A range request failed in a way another attempt may fix."""
+
+    def __init__(self, message: str, offset: int | None = None) -> None:
+        super().__init__(message)
+        self.offset = offset
+
+
+@dataclass
+class Asset:
+    name: str
+    url: str
+    size: int
+    temporary: Path
+    started: float = 0.0
+    digest: str | None = None
+
+
+@dataclass(frozen=True)
+class Part:
+    asset: Asset
+    start: int
+    end: int  # exclusive
+    probe: bool = False
+
+
+class Sink(Protocol):
+    """Consumer of one streamed asset.
+
+    A sink may also define ``abort()``; it is called instead of ``finish()``
+    when the download fails, so the sink can release what it holds.
+    """
+
+    def feed(self, chunk: bytes) -> None: ...
+
+    def finish(self) -> None: ...
+
+
+def download_jobs() -> int:
+    value = os.environ.get(JOBS_ENV, "").strip()
+    try:
+        return max(1, int(value)) if value else DEFAULT_JOBS
+    except ValueError:
+        fail(f"{JOBS_ENV} must be an integer, got {value!r}")
+
+
+def downloadable(release: dict) -> bool:
+    """Whether every asset carries the REST ``url`` this downloader needs."""
+    assets = release.get("assets")
+    return isinstance(assets, list) and all(
+        isinstance(asset, dict)
+        and str(asset.get("url") or "").startswith(("http://", "https://"))
+        and isinstance(asset.get("size"), int)
+        for asset in assets
+    )
+
+
+class Downloader:
+    def __init__(
+        self,
+        *,
+        token: str = "",
+        jobs: int = DEFAULT_JOBS,
+        part_size: int = PART_SIZE,
+        timeout: float = 60,
+        cache: CACHE.AssetCache | None = None,
+        store: bool = True,
+    ) -> None:
+        self.token = token
+        self.cache = cache
+        # Without ``store`` streamed assets are served from the cache but not
+        # written to it, so a disk-budgeted caller keeps control of the disk.
+        self.store = store
+        self.jobs = max(1, jobs)
+        self.part_size = max(1, part_size)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._opened: list[http.client.HTTPConnection] = []
+        self._opened_lock = threading.Lock()
+        self._resolved: dict[str, str] = {}
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        pool = getattr(self._local, "connections", None)
+        if pool is None:
+            pool = self._local.connections = {}
+        connection = pool.get((scheme, netloc))
+        if connection is None:
+            factory = (
+                http.client.HTTPSConnection
+                if scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = pool[(scheme, netloc)] = factory(netloc, timeout=self.timeout)
+            with self._opened_lock:
+                self._opened.append(connection)
+        return connection
+
+    def _drop(self, response: http.client.HTTPResponse, url: str) -> None:
+        """Close ``response`` and the pooled connection it leaves mid-body."""
+        response.close()
+        parts = urlsplit(url)
+        self._connection(parts.scheme, parts.netloc).close()
+
+    def close(self) -> None:
+        with self._opened_lock:
+            for connection in self._opened:
+                connection.close()
+            self._opened.clear()
+
+    def _open(
+        self, url: str, start: int, end: int, *, api_netloc: str
+    ) -> tuple[http.client.HTTPResponse, str]:
+        """GET ``[start, end)`` of ``url``, following redirects by hand.
+
+        Returns the response and the URL that served it. The API token is
+        only sent to the API host, never to the signed storage URL it
+        redirects to.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            headers = {
+                "Accept": "application/octet-stream",
+                "User-Agent": USER_AGENT,
+                "Range": f"bytes={start}-{end - 1}",
+            }
+            if self.token and parts.netloc == api_netloc:
+                headers["Authorization"] = f"Bearer {self.token}"
+            connection = self._connection(parts.scheme, parts.netloc)
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                raise RangeError(str(error)) from error
+            if response.status in (301, 302, 303, 307, 308):
+                response.read()
+                location = response.getheader("Location") or ""
+                if not location:
+                    raise RangeError(f"redirect without Location from {url}")
+                url = urljoin(url, location)
+                continue
+            if response.status not in (200, 206):
+                response.read()
+                raise RangeError(f"HTTP {response.status} for {url}")
+            return response, url
+        raise RangeError(f"too many redirects for {url}")
+
+    def _write(
+        self, asset: Asset, response: http.client.HTTPResponse, offset: int, end: int
+    ) -> int:
+        """Copy the body into ``[offset, end)`` of the part file; return the new offset."""
+        with asset.temporary.open("r+b") as output:
+            output.seek(offset)
+            try:
+                while offset < end:
+                    chunk = response.read(min(CHUNK_SIZE, end - offset))
+                    if not chunk:
+                        break
+                    output.write(chunk)
+                    offset += len(chunk)
+                if response.read(1):
+                    response.close()
+                    raise RangeError(f"{asset.name}: server sent more than {end} bytes")
+            except (OSError, http.client.HTTPException) as error:
+                response.close()
+                raise RangeError(str(error), offset) from error
+        return offset
+
+    def fetch(self, part: Part) -> list[Part]:
+        """Fetch one range, resuming after failures; return follow-up ranges."""
+        asset = part.asset
+        offset = part.start
+        last_error: Exception | None = None
+        for attempt in range(1, ATTEMPTS + 1):
+            if attempt > 1:
+                time.sleep(min(8, 2 ** (attempt - 2)))
+            try:
+                # Later ranges skip the API redirect until the signed URL fails.
+                source = self._resolved.get(asset.url, asset.url)
+                response, served_by = self._open(
+                    source, offset, part.end, api_netloc=urlsplit(asset.url).netloc
+                )
+                if served_by != asset.url:
+                    self._resolved[asset.url] = served_by
+                if response.status == 200:
+                    if not part.probe:
+                        self._drop(response, served_by)
+                        raise RangeError(f"{asset.name}: server ignored Range")
+                    # No range support: the body is the whole file.
+                    offset = self._write(asset, response, 0, asset.size)
+                    if offset != asset.size:
+                        raise RangeError(f"{asset.name}: body ended at byte {offset}")
+                    return []
+                content_range = response.getheader("Content-Range") or ""
+                if not content_range.startswith(f"bytes {offset}-"):
+                    self._drop(response, served_by)
+                    raise RangeError(
+                        f"{asset.name}: unexpected Content-Range {content_range!r}"
+                    )
+                offset = self._write(asset, response, offset, part.end)
+                if offset < part.end:
+                    raise RangeError(f"{asset.name}: range ended early at byte {offset}")
+                break
+            except RangeError as error:
+                last_error = error
+                self._resolved.pop(asset.url, None)
+                if error.offset is not None:
+                    offset = error.offset
+                print(
+                    f"Asset download retry {attempt}/{ATTEMPTS} for {asset.name}: {error}",
+                    flush=True,
+                )
+        else:
+            fail(f"cannot download release asset {asset.name}: {last_error}")
+        if not part.probe:
+            return []
+        return [
+            Part(asset, start, min(start + self.part_size, asset.size))
+            for start in range(part.end, asset.size, self.part_size)
+        ]
+
+    def download(self, release: dict, directory: Path) -> int:
+        """Download every asset of ``release`` into ``directory``."""
+        if not downloadable(release):
+            fail("release JSON lacks REST asset URLs or sizes for parallel download")
+        directory.mkdir(parents=True, exist_ok=True)
+        assets = [
+            Asset(
+                name=str(item.get("name") or ""),
+                url=str(item["url"]),
+                size=int(item["size"]),
+                temporary=directory / f".{item.get('name')}.part",
+                digest=CACHE.digest_hex(item),
+            )
+            for item in release["assets"]
+        ]
+        for asset in assets:
+            if not asset.name or Path(asset.name).name != asset.name:
+                fail(f"unsafe release asset name: {asset.name!r}")
+        try:
+            fetched = [asset for asset in assets if not self._from_cache(asset)]
+            self._download_all(fetched)
+            for asset in assets:
+                size = asset.temporary.stat().st_size
+                if size != asset.size:
+                    fail(f"{asset.name}: expected {asset.size} bytes, wrote {size}")
+            if self.cache is not None:
+                for asset in fetched:
+                    if asset.digest is not None:
+                        self.cache.store(asset.digest, asset.temporary)
+            for asset in assets:
+                asset.temporary.replace(directory / asset.name)
+        finally:
+            self.close()
+            for asset in assets:
+                asset.temporary.unlink(missing_ok=True)
+        return sum(asset.size for asset in assets)
+
+    def read_range(self, url: str, start: int, end: int) -> bytes:
+        """Return bytes ``[start, end)`` of the asset behind ``url``."""
+        if end <= start:
+            return b""
+        started = time.monotonic()
+        last_error: Exception | None = None
+        for attempt in range(1, ATTEMPTS + 1):
+            if attempt > 1:
+                time.sleep(min(8, 2 ** (attempt - 2)))
+            try:
+                source = self._resolved.get(url, url)
+                response, served_by = self._open(
+                    source, start, end, api_netloc=urlsplit(url).netloc
+                )
+                if served_by != url:
+                    self._resolved[url] = served_by
+                content_range = response.getheader("Content-Range") or ""
+                if response.status != 206 or not content_range.startswith(
+                    f"bytes {start}-"
+                ):
+                    self._drop(response, served_by)
+                    raise RangeError(f"server ignored Range for {url}")
+                try:
+                    body = response.read(end - start)
+                except (OSError, http.client.HTTPException) as error:
+                    response.close()
+                    raise RangeError(str(error)) from error
+                if len(body) != end - start:
+                    raise RangeError(f"range of {url} ended early at {start + len(body)}")
+                GITHUB.default_client().record_call(
+                    "release asset range", "GET", 206, started, len(body)
+                )
+                return body
+            except RangeError as error:
+                last_error = error
+                self._resolved.pop(url, None)
+        fail(f"cannot read bytes {start}-{end - 1} of {url}: {last_error}")
+
+    def _from_cache(self, asset: Asset) -> bool:
+        if self.cache is None or asset.digest is None:
+            return False
+        return self.cache.materialize(asset.digest, asset.temporary)
+
+    def stream(self, release: dict, open_sink: Callable[[dict], Sink]) -> int:
+        """Feed every asset of ``release`` through ``open_sink(asset)`` in order."""
+        if not downloadable(release):
+            fail("release JSON lacks REST asset URLs or sizes for streaming")
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                futures = [
+                    pool.submit(self._stream_asset, item, open_sink)
+                    for item in release["assets"]
+                ]
+                return sum(future.result() for future in futures)
+        finally:
+            self.close()
+
+    def _stream_asset(self, item: dict, open_sink: Callable[[dict], Sink]) -> int:
+        name = str(item.get("name") or "")
+        url = str(item["url"])
+        size = int(item["size"])
+        sink = open_sink(item)
+        digest = CACHE.digest_hex(item)
+        writer = None
+        try:
+            if self.cache is not None and digest is not None:
+                cached = self.cache.lookup(digest)
+                if cached is not None:
+                    with cached.open("rb") as source:
+                        while chunk := source.read(CHUNK_SIZE):
+                            sink.feed(chunk)
+                    sink.finish()
+                    return size
+            if self.cache is not None and digest is not None and self.store:
+                writer = self.cache.writer(digest)
+            self._stream_body(name, url, size, sink, writer)
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            abort = getattr(sink, "abort", None)
+            if abort is not None:
+                abort()
+            raise
+        if writer is not None:
+            writer.finish()
+        return size
+
+    def _stream_body(
+        self, name: str, url: str, size: int, sink: Sink, writer: CACHE.CacheWriter | None
+    ) -> None:
+        started = time.monotonic()
+        offset = 0
+        last_error: Exception | None = None
+        attempt = 0
+        while offset < size:
+            attempt += 1
+            if attempt > ATTEMPTS:
+                fail(f"cannot download release asset {name}: {last_error}")
+            if attempt > 1:
+                time.sleep(min(8, 2 ** (attempt - 2)))
+            try:
+                source = self._resolved.get(url, url)
+                response, served_by = self._open(
+                    source, offset, size, api_netloc=urlsplit(url).netloc
+                )
+                if served_by != url:
+                    self._resolved[url] = served_by
+                # A server that ignores Range restarts at byte zero.
+                skip = offset if response.status == 200 else 0
+                content_range = response.getheader("Content-Range") or ""
+                if response.status == 206 and not content_range.startswith(
+                    f"bytes {offset}-"
+                ):
+                    self._drop(response, served_by)
+                    raise RangeError(
+                        f"{name}: unexpected Content-Range {content_range!r}"
+                    )
+                try:
+                    while offset < size:
+                        chunk = response.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        if skip:
+                            dropped = min(skip, len(chunk))
+                            chunk, skip = chunk[dropped:], skip - dropped
+                        if len(chunk) > size - offset:
+                            fail(f"{name}: server sent more than {size} bytes")
+                        if chunk:
+                            sink.feed(chunk)
+                            if writer is not None:
+                                writer.feed(chunk)
+                            offset += len(chunk)
+                except (OSError, http.client.HTTPException) as error:
+                    response.close()
+                    raise RangeError(str(error)) from error
+                if response.will_close:
+                    response.close()
+                if offset < size:
+                    raise RangeError(f"{name}: body ended at byte {offset}")
+            except RangeError as error:
+                last_error = error
+                self._resolved.pop(url, None)
+                print(
+                    f"Asset stream retry {attempt}/{ATTEMPTS} for {name}: {error}",
+                    flush=True,
+                )
+        sink.finish()
+        GITHUB.default_client().record_call(
+            "release asset download", "GET", 200, started, size
+        )
+
+    def _download_all(self, assets: list[Asset]) -> None:
+        client = GITHUB.default_client()
+        remaining: dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            pending: set[Future] = set()
+            owners: dict[Future, Part] = {}
+
+            def submit(part: Part) -> None:
+                future = pool.submit(self.fetch, part)
+                owners[future] = part
+                pending.add(future)
+                remaining[part.asset.name] = remaining.get(part.asset.name, 0) + 1
+
+            for asset in assets:
+                with asset.temporary.open("wb") as output:
+                    output.truncate(asset.size)
+                asset.started = time.monotonic()
+                if asset.size == 0:
+                    continue
+                submit(Part(asset, 0, min(self.part_size, asset.size), probe=True))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    part = owners.pop(future)
+                    for follow_up in future.result():
+                        submit(follow_up)
+                    remaining[part.asset.name] -= 1
+                    if remaining[part.asset.name] == 0:
+                        client.record_call(
+                            "release asset download",
+                            "GET",
+                            200,
+                            part.asset.started,
+                            part.asset.size,
+                        )
+
+
+class DownloadPlan:
+    """Fetch each release asset at most once per run.
+
+    Assets land in ``directory/<sha256>/<name>`` (``asset-<id>`` when GitHub
+    has no digest yet) and are made read-only, so phases share them instead of
+    downloading again. Files the run uploads itself are adopted the same way,
+    which lets the audit treat ``directory`` as a local artifact directory
+    and fetch only what no earlier phase needed.
+    """
+
+    def __init__(
+        self,
+        *,
+        repo: str,
+        tag: str,
+        directory: Path,
+        run_gh: Callable[[list[str]], object],
+    ) -> None:
+        self.repo = repo
+        self.tag = tag
+        self.directory = directory
+        # Exists from the start so it can always be handed to the audit as a
+        # local artifact directory, even when no phase fetched anything.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.run_gh = run_gh
+        self.fetched = 0
+        self.reused = 0
+
+    def path_for(self, asset: dict) -> Path:
+        digest = CACHE.digest_hex(asset)
+        key = digest if digest is not None else f"asset-{int(asset.get('id') or 0)}"
+        return self.directory / key / str(asset.get("name") or "")
+
+    def fetch(self, release: dict, names: Iterable[str]) -> dict[str, Path]:
+        """Return local paths for the named assets, downloading only new ones."""
+        wanted = set(names)
+        assets = [
+            asset
+            for asset in release.get("assets") or []
+            if isinstance(asset, dict) and asset.get("name") in wanted
+        ]
+        missing = [asset for asset in assets if not self.path_for(asset).is_file()]
+        self.reused += len(assets) - len(missing)
+        if missing:
+            self._download(release, missing)
+            self.fetched += len(missing)
+        return {str(asset["name"]): self.path_for(asset) for asset in assets}
+
+    def _download(self, release: dict, assets: list[dict]) -> None:
+        staging = self.directory / ".staging"
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir(parents=True)
+        subset = {**release, "assets": assets}
+        if GITHUB.default_client().backend == "http" and downloadable(subset):
+            download_release_assets(subset, staging)
+        else:
+            command = ["gh", "release", "download", self.tag, "--repo", self.repo]
+            for asset in assets:
+                command.extend(["--pattern", str(asset["name"])])
+            command.extend(["--dir", str(staging), "--clobber"])
+            self.run_gh(command)
+        for asset in assets:
+            source = staging / str(asset["name"])
+            if not source.is_file():
+                fail(f"release asset was not downloaded: {asset['name']}")
+            self._keep(source, self.path_for(asset))
+        shutil.rmtree(staging)
+
+    def adopt(self, path: Path, asset_name: str | None = None) -> None:
+        """Record a file this run uploaded so later phases need not fetch it."""
+        digest = CACHE.file_sha256(path)
+        target = self.directory / digest / (asset_name or path.name)
+        if not target.is_file():
+            temporary = target.with_name(f".{target.name}.tmp")
+            temporary.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, temporary)
+            self._keep(temporary, target)
+
+    @staticmethod
+    def _keep(source: Path, target: Path) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        source.replace(target)
+        target.chmod(0o444)
+
+    @staticmethod
+    def link_into(paths: Iterable[Path], directory: Path) -> None:
+        """Expose shared assets under ``directory`` without copying them."""
+        directory.mkdir(parents=True, exist_ok=True)
+        for path in paths:
+            destination = directory / path.name
+            destination.unlink(missing_ok=True)
+            try:
+                os.link(path, destination)
+            except OSError:
+                shutil.copyfile(path, destination)
+
+    def summary(self) -> str:
+        return f"{self.fetched} fetched, {self.reused} reused"
+
+
+def download_release_assets(release: dict, directory: Path) -> int:
+    client = GITHUB.default_client()
+    cache = CACHE.from_environment()
+    total = Downloader(token=client.token, jobs=download_jobs(), cache=cache).download(
+        release, directory
+    )
+    if cache is not None:
+        print(f"Asset cache: {cache.summary()}", flush=True)
+    return total
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--release-json", type=Path, required=True)
+    parser.add_argument("--dir", type=Path, required=True)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    release = json.loads(args.release_json.read_text(encoding="utf-8"))
+    if not isinstance(release, dict):
+        fail("release JSON must be an object")
+    total = download_release_assets(release, args.dir)
+    print(f"Downloaded {len(release.get('assets', []))} assets ({total} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,297 @@
+"""Keep a local SQLite index of a repository's releases and their assets.
+
+The index is synced incrementally: GitHub lists releases newest-created first,
+so a sync reads pages until one comes back with nothing new or changed and
+leaves the older history as it was. A full relist happens on first use and
+whenever the last one is older than ``FULL_SYNC_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+
+INDEX_ENV = "FANQIE_RELEASE_INDEX"
+SCHEMA_VERSION = "1"
+# Drafts published long after they were created sit below the pages an
+# incremental sync reads; a periodic full relist picks them up.
+FULL_SYNC_SECONDS = 24 * 60 * 60
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    repo TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (repo, key)
+);
+CREATE TABLE IF NOT EXISTS releases (
+    repo TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    tag_name TEXT NOT NULL,
+    draft INTEGER NOT NULL,
+    prerelease INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    published_at TEXT,
+    fingerprint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (repo, id)
+);
+CREATE INDEX IF NOT EXISTS releases_by_tag ON releases (repo, tag_name);
+CREATE INDEX IF NOT EXISTS releases_by_created
+    ON releases (repo, created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS assets (
+    repo TEXT NOT NULL,
+    release_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (repo, release_id, id)
+);
+CREATE INDEX IF NOT EXISTS assets_by_name ON assets (repo, name);
+"""
+
+
+def fail(message: str) -> None:
+    raise SystemExit(message)
+
+
+def load_github_client():
+    module = sys.modules.get("fanqie_github_client")
+    if module is not None:
+        return module
+    path = Path(__file__).with_name("github-client.py")
+    spec = importlib.util.spec_from_file_location("fanqie_github_client", path)
+    if spec is None or spec.loader is None:
+        fail(f"cannot load GitHub client: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+GITHUB = load_github_client()
+
+
+@dataclass(frozen=True)
+class SyncResult:
+    pages: int
+    changed: int
+    removed: int
+    full: bool
+
+
+def fingerprint(release: dict) -> str:
+    """Summarize the fields that change when a release or its assets do."""
+    assets = sorted(
+        (
+            int(asset.get("id") or 0),
+            str(asset.get("name") or ""),
+            int(asset.get("size") or 0),
+            str(asset.get("digest") or ""),
+            str(asset.get("updated_at") or ""),
+            str(asset.get("state") or ""),
+        )
+        for asset in release.get("assets") or []
+        if isinstance(asset, dict)
+    )
+    return json.dumps(
+        [
+            release.get("tag_name"),
+            release.get("name"),
+            release.get("draft"),
+            release.get("prerelease"),
+            release.get("published_at"),
+            release.get("target_commitish"),
+            release.get("body"),
+            assets,
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+class ReleaseIndex:
+    def __init__(self, path: Path, repo: str) -> None:
+        self.path = path
+        self.repo = repo
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path))
+        self.connection.executescript(SCHEMA)
+        if self.meta("schema") not in (None, SCHEMA_VERSION):
+            fail(f"unsupported release index schema in {path}")
+        self.set_meta("schema", SCHEMA_VERSION)
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> ReleaseIndex:
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
+
+    def meta(self, key: str) -> str | None:
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE repo = ? AND key = ?", (self.repo, key)
+        ).fetchone()
+        return None if row is None else str(row[0])
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (repo, key, value) VALUES (?, ?, ?)",
+            (self.repo, key, value),
+        )
+
+    def needs_full_sync(self, now: float) -> bool:
+        last = self.meta("last_full_sync")
+        try:
+            return last is None or now - float(last) >= FULL_SYNC_SECONDS
+        except ValueError:
+            return True
+
+    def upsert(self, release: dict) -> bool:
+        """Store ``release`` and report whether it differed from the index."""
+        release_id = int(release.get("id") or 0)
+        if release_id <= 0:
+            fail(f"GitHub release is missing its id: {release.get('tag_name')!r}")
+        value = fingerprint(release)
+        row = self.connection.execute(
+            "SELECT fingerprint FROM releases WHERE repo = ? AND id = ?",
+            (self.repo, release_id),
+        ).fetchone()
+        if row is not None and row[0] == value:
+            return False
+        self.connection.execute(
+            "INSERT OR REPLACE INTO releases (repo, id, tag_name, draft, prerelease,"
+            " created_at, published_at, fingerprint, payload)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.repo,
+                release_id,
+                str(release.get("tag_name") or ""),
+                int(release.get("draft") is not False),
+                int(release.get("prerelease") is True),
+                str(release.get("created_at") or ""),
+                release.get("published_at"),
+                value,
+                json.dumps(release, ensure_ascii=False, separators=(",", ":")),
+            ),
+        )
+        self.connection.execute(
+            "DELETE FROM assets WHERE repo = ? AND release_id = ?",
+            (self.repo, release_id),
+        )
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO assets (repo, release_id, id, name, size, digest,"
+            " updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    self.repo,
+                    release_id,
+                    int(asset.get("id") or 0),
+                    str(asset.get("name") or ""),
+                    int(asset.get("size") or 0),
+                    asset.get("digest"),
+                    asset.get("updated_at"),
+                )
+                for asset in release.get("assets") or []
+                if isinstance(asset, dict)
+            ],
+        )
+        return True
+
+    def remove(self, release_ids: list[int]) -> None:
+        for release_id in release_ids:
+            self.connection.execute(
+                "DELETE FROM releases WHERE repo = ? AND id = ?", (self.repo, release_id)
+            )
+            self.connection.execute(
+                "DELETE FROM assets WHERE repo = ? AND release_id = ?",
+                (self.repo, release_id),
+            )
+
+    def sync(self, *, full: bool = False, now: float | None = None) -> SyncResult:
+        now = time.time() if now is None else now
+        full = full or self.needs_full_sync(now)
+        seen: set[int] = set()
+        oldest = ""
+        pages = changed = 0
+        complete = True
+        for page in GITHUB.iter_pages(f"repos/{self.repo}/releases"):
+            pages += 1
+            page_changed = 0
+            for release in page:
+                if not isinstance(release, dict):
+                    continue
+                page_changed += int(self.upsert(release))
+                seen.add(int(release.get("id") or 0))
+                created = str(release.get("created_at") or "")
+                if created and (not oldest or created < oldest):
+                    oldest = created
+            changed += page_changed
+            if not full and page and page_changed == 0:
+                complete = False
+                break
+
+        # Releases in the listed window that GitHub no longer returns were deleted.
+        if complete:
+            rows = self.connection.execute(
+                "SELECT id FROM releases WHERE repo = ?", (self.repo,)
+            )
+        else:
+            rows = self.connection.execute(
+                "SELECT id FROM releases WHERE repo = ? AND created_at >= ?",
+                (self.repo, oldest),
+            )
+        stale = [int(row[0]) for row in rows.fetchall() if int(row[0]) not in seen]
+        self.remove(stale)
+        if complete:
+            self.set_meta("last_full_sync", repr(now))
+        self.connection.commit()
+        return SyncResult(pages=pages, changed=changed, removed=len(stale), full=complete)
+
+    def releases(self) -> Iterator[dict]:
+        """Yield indexed releases in GitHub's listing order."""
+        rows = self.connection.execute(
+            "SELECT payload FROM releases WHERE repo = ?"
+            " ORDER BY created_at DESC, id DESC",
+            (self.repo,),
+        )
+        for (payload,) in rows:
+            yield json.loads(payload)
+
+
+def index_path() -> Path | None:
+    value = os.environ.get(INDEX_ENV, "").strip()
+    return Path(value) if value else None
+
+
+def iter_releases(repo: str, *, full: bool = False) -> Iterator[dict]:
+    """Yield releases newest-first from the synced index, or page by page.
+
+    Without ``FANQIE_RELEASE_INDEX`` the listing is read straight from GitHub
+    so callers can still stop early; ``full`` forces a full relist of the index.
+    """
+    path = index_path()
+    if path is None:
+        for page in GITHUB.iter_pages(f"repos/{repo}/releases"):
+            yield from (item for item in page if isinstance(item, dict))
+        return
+    with ReleaseIndex(path, repo) as index:
+        result = index.sync(full=full)
+        print(
+            f"Release index synced: {result.pages} pages, {result.changed} changed, "
+            f"{result.removed} removed{' (full)' if result.full else ''}",
+            flush=True,
+        )
+        yield from index.releases()
@@ -7,7 +7,6 @@ import argparse
 import importlib.util
 import os
 import re
-import subprocess
 import tempfile
 from pathlib import Path
 
@@ -26,11 +25,6 @@ def load_script(name: str, module_name: str):
     return module
 
 
-def run(command: list[str]) -> None:
-    print("+", " ".join(command), flush=True)
-    subprocess.run(command, check=True)
-
-
 def previous_field(release: dict, label: str) -> str:
     body = str(release.get("body") or "")
     match = re.search(rf"^- {re.escape(label)}：`([^`]+)`\s*$", body, re.MULTILINE)
@@ -86,11 +80,14 @@ def main() -> int:
         else args.work_dir.resolve()
     )
     directory.mkdir(parents=True, exist_ok=True)
+    if directory_context is None:
+        # A temporary directory is gone by the time the call report is written.
+        finalizer.GITHUB.ensure_call_log(directory)
     release_path = directory / "release.json"
     notes_path = directory / "release-notes.md"
 
     database_id = finalizer.release_id(repo, tag)
-    release = finalizer.fetch_release(repo, database_id, release_path)
+    release = finalizer.fetch_release(repo, database_id, release_path, tag=tag)
     if release.get("draft") is True:
         fail("rewrite-release-notes only handles an already published release")
 
@@ -132,7 +129,7 @@ def main() -> int:
         )
 
     notes_path.write_text(notes, encoding="utf-8", newline="\n")
-    run(
+    finalizer.run(
         [
             "gh",
             "release",
@@ -144,7 +141,7 @@ def main() -> int:
             str(notes_path),
         ]
     )
-    updated = finalizer.fetch_release(repo, database_id, release_path)
+    updated = finalizer.fetch_release(repo, database_id, release_path, tag=tag)
     if str(updated.get("body") or "").rstrip() != notes.rstrip():
         fail("GitHub Release body did not match regenerated notes")
     print(
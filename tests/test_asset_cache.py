@@ -0,0 +1,69 @@
+import hashlib
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPT = ROOT / "scripts" / "asset-cache.py"
+SPEC = importlib.util.spec_from_file_location("fanqie_asset_cache", SCRIPT)
+MODULE = importlib.util.module_from_spec(SPEC)
+assert SPEC.loader is not None
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class AssetCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.cache = MODULE.AssetCache(self.directory / "cache", max_bytes=1024)
+
+    def source(self, name: str, data: bytes) -> Path:
+        path = self.directory / name
+        path.write_bytes(data)
+        return path
+
+    def test_stored_assets_are_served_after_a_hash_recheck(self):
+        data = b"installer" * 10
+        digest = sha256(data)
+        self.assertTrue(self.cache.store(digest, self.source("setup.exe", data)))
+        destination = self.directory / "out" / "setup.exe"
+        self.assertTrue(self.cache.materialize(digest, destination))
+        self.assertEqual(destination.read_bytes(), data)
+
+        # A blob that no longer matches its key is dropped, not served.
+        blob = self.cache.path_for(digest)
+        os.unlink(destination)
+        blob.write_bytes(b"tampered")
+        self.assertIsNone(self.cache.lookup(digest))
+        self.assertFalse(blob.exists())
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_wrong_digests_are_never_stored(self):
+        self.assertFalse(self.cache.store("0" * 64, self.source("a.bin", b"data")))
+        writer = self.cache.writer("0" * 64)
+        writer.feed(b"data")
+        self.assertFalse(writer.finish())
+        self.assertEqual(list((self.cache.root / "sha256").glob("*/*")), [])
+
+    def test_least_recently_used_blobs_are_evicted_first(self):
+        blobs = [bytes([index]) * 400 for index in range(3)]
+        digests = [sha256(data) for data in blobs]
+        for index, (digest, data) in enumerate(zip(digests[:2], blobs[:2])):
+            self.cache.store(digest, self.source(f"{index}.bin", data))
+            os.utime(self.cache.path_for(digest), (index, index))
+        self.assertIsNotNone(self.cache.lookup(digests[0]))
+        self.cache.store(digests[2], self.source("2.bin", blobs[2]))
+        stored = {path.name for path in (self.cache.root / "sha256").glob("*/*")}
+        self.assertEqual(stored, {digests[0], digests[2]})
+
+
+if __name__ == "__main__":
+    unittest.main()
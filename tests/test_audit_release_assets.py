@@ -1,9 +1,19 @@
+import hashlib
 import importlib.util
+import io
 import json
+import os
+import struct
+import sys
+import tarfile
 import tempfile
+import threading
+import time
 import unittest
 import zipfile
+import zlib
 from pathlib import Path
+from unittest.mock import patch
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -15,6 +25,8 @@ def load_module():
     if spec is None or spec.loader is None:
         raise RuntimeError("cannot load release asset auditor")
     module = importlib.util.module_from_spec(spec)
+    # Registered so that audit worker processes can import it by name.
+    sys.modules[spec.name] = module
     spec.loader.exec_module(module)
     return module
 
@@ -22,6 +34,80 @@ def load_module():
 AUDIT = load_module()
 
 
+def deb_package(members):
+    """Build a Debian package whose data.tar.gz holds ``members``."""
+
+    def tarball(entries):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as output:
+            for name, target in entries.items():
+                info = tarfile.TarInfo(name)
+                if target is not None:
+                    info.type, info.linkname = tarfile.SYMTYPE, target
+                output.addfile(info, io.BytesIO())
+        return buffer.getvalue()
+
+    payload = b"!<arch>\n"
+    for name, body in (
+        ("debian-binary", b"2.0\n"),
+        ("control.tar.gz", tarball({"./control": None})),
+        ("data.tar.gz", tarball(members)),
+    ):
+        header = f"{name:<16}{0:<12}{0:<6}{0:<6}{100644:<8}{len(body):<10}`\n"
+        payload += header.encode() + body + b"\n" * (len(body) % 2)
+    return payload
+
+
+def appimage(tree, compression=1):
+    """Build an ELF stub followed by a squashfs image of ``tree``.
+
+    ``tree`` maps names to nested dicts for directories and None for files.
+    Only what the auditor reads is written: the superblock, one plain inode
+    block with the directory inodes and one zlib directory block.
+    """
+    inodes = bytearray()
+    listings = bytearray()
+
+    def directory(entries):
+        children = []
+        for name, child in sorted(entries.items()):
+            offset = directory(child) if isinstance(child, dict) else 0
+            kind = 1 if isinstance(child, dict) else 2
+            entry = struct.pack("<HhHH", offset, 0, kind, len(name) - 1)
+            children.append(entry + name.encode())
+        listing = b""
+        if children:
+            listing = struct.pack("<IIi", len(children) - 1, 0, 1) + b"".join(children)
+        listing_offset = len(listings)
+        listings.extend(listing)
+        inode_offset = len(inodes)
+        size = len(listing) + 3
+        inodes.extend(struct.pack("<HHHHII", 1, 0o755, 0, 0, 0, 1))
+        inodes.extend(struct.pack("<IIHHI", 0, 2, size, listing_offset, 0))
+        return inode_offset
+
+    root = directory(tree)
+    inode_block = struct.pack("<H", len(inodes) | 0x8000) + inodes
+    packed = zlib.compress(bytes(listings))
+    directory_block = struct.pack("<H", len(packed)) + packed
+    inode_table = 96 + 4096
+    directory_table = inode_table + len(inode_block)
+    id_table = directory_table + len(directory_block)
+    absent = 0xFFFFFFFFFFFFFFFF
+    superblock = struct.pack(
+        "<4sIIIIHHHHHHQQQQQQQQ",
+        b"hsqs", 1, 0, 131072, 0, compression, 17, 0, 1, 4, 0,
+        root, id_table + 8, id_table, absent, inode_table, directory_table,
+        absent, absent,
+    )
+    elf = bytearray(64)
+    elf[:6] = b"\x7fELF\x02\x01"
+    struct.pack_into("<Q", elf, 0x28, 64)
+    struct.pack_into("<HH", elf, 0x3A, 64, 1)
+    image = superblock + os.urandom(4096) + inode_block + directory_block + bytes(8)
+    return bytes(elf) + bytes(64) + image
+
+
 class ReleaseAssetAuditTest(unittest.TestCase):
     def test_current_package_and_signature_names_are_allowlisted(self):
         names = (
@@ -125,6 +211,469 @@ class ReleaseAssetAuditTest(unittest.TestCase):
                 with self.assertRaises(SystemExit):
                     AUDIT.scan_raw_markers(path)
 
+    def test_downloaded_assets_are_hashed_against_github_digests(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            payloads = {
+                "FanqieNovelDownloader-tauri-windows-x64-portable.exe": b"portable",
+                "SIGNING.txt": b"signing notes",
+            }
+            for name, payload in payloads.items():
+                (root / name).write_bytes(payload)
+            digests = {
+                name: hashlib.sha256(payload).hexdigest()
+                for name, payload in payloads.items()
+            }
+            count = AUDIT.audit_downloaded_assets(root, set(payloads), digests)
+            self.assertEqual(count, 2)
+            digests["SIGNING.txt"] = hashlib.sha256(b"other").hexdigest()
+            with self.assertRaises(SystemExit):
+                AUDIT.audit_downloaded_assets(root, set(payloads), digests)
+
+    def test_parallel_audit_reports_the_first_failure_in_name_order(self):
+        names = sorted(AUDIT.CONTROL_ASSETS)
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            for name in names:
+                (root / name).write_bytes(name.encode())
+            digests = {name: hashlib.sha256(name.encode()).hexdigest() for name in names}
+            self.assertEqual(
+                AUDIT.audit_downloaded_assets(root, set(names), digests, jobs=3),
+                len(names),
+            )
+            for name in (names[5], names[2]):
+                digests[name] = hashlib.sha256(b"other").hexdigest()
+            for jobs in (1, 4):
+                with self.subTest(jobs=jobs), self.assertRaises(SystemExit) as caught:
+                    AUDIT.audit_downloaded_assets(root, set(names), digests, jobs=jobs)
+                self.assertTrue(str(caught.exception).endswith(names[2]))
+
+    def test_first_failure_cancels_outstanding_audits(self):
+        audited = []
+
+        def audit(path, name, digest=None, **options):
+            audited.append(name)
+            if name == "a":
+                AUDIT.fail("rejected a")
+            time.sleep(0.05)
+
+        files = [(Path(name), name, None) for name in "abcdefghij"]
+        with patch.object(AUDIT, "audit_asset_file", audit):
+            with self.assertRaisesRegex(SystemExit, "rejected a"):
+                AUDIT.audit_files(files, jobs=2)
+        self.assertLess(len(audited), len(files))
+
+    def test_parallel_deep_audits_share_the_deep_scan_threads(self):
+        threads = []
+
+        def audit(path, name, digest=None, **options):
+            threads.append(options.get("deep_threads"))
+            return True
+
+        files = [(Path(name), name, None) for name in "abcd"]
+        with (
+            patch.object(AUDIT, "audit_asset_file", audit),
+            patch.object(AUDIT, "DEEP_SCAN_THREADS", 8),
+        ):
+            AUDIT.audit_files(files, jobs=2, deep=True)
+            self.assertEqual(threads, [4] * 4)
+            threads.clear()
+            AUDIT.audit_files(files * 4, jobs=16, deep=True)
+            self.assertEqual(threads, [1] * 16)
+
+    def test_audit_ledger_skips_passed_assets_until_the_rules_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            directory = Path(directory)
+            root = directory / "assets"
+            root.mkdir()
+            name = "FanqieNovelDownloader-tauri-windows-x64-portable.exe"
+            (root / name).write_bytes(b"portable")
+            digests = {name: hashlib.sha256(b"portable").hexdigest()}
+            ledger_path = directory / "audit-ledger.json"
+
+            ledger = AUDIT.AuditLedger(ledger_path)
+            AUDIT.audit_downloaded_assets(root, {name}, digests, ledger)
+            ledger.save()
+
+            ledger = AUDIT.AuditLedger(ledger_path)
+            with patch.object(AUDIT, "audit_asset_file") as audit:
+                AUDIT.audit_downloaded_assets(root, {name}, digests, ledger)
+            audit.assert_not_called()
+            self.assertEqual(ledger.skipped, 1)
+
+            with patch.object(AUDIT, "MAX_ARCHIVE_MEMBERS", 10):
+                ledger = AUDIT.AuditLedger(ledger_path)
+            self.assertFalse(ledger.passed(name, digests[name]))
+
+    def test_deep_scan_finds_markers_inside_compressed_members(self):
+        secret = b"config PRIVATE_SOURCE_TOKEN=" + os.urandom(32).hex().encode()
+        zipped = io.BytesIO()
+        with zipfile.ZipFile(zipped, "w", zipfile.ZIP_DEFLATED) as output:
+            for index in range(8):
+                data = os.urandom(64 * 1024).hex()
+                output.writestr(f"assets/chunk-{index}.js", data)
+            output.writestr("assets/config.js", secret * 3)
+        tarred = io.BytesIO()
+        with tarfile.open(fileobj=tarred, mode="w:gz") as output:
+            info = tarfile.TarInfo("Fanqie.app/Contents/Resources/config.js")
+            info.size = len(secret * 3)
+            output.addfile(info, io.BytesIO(secret * 3))
+        assets = {
+            "FanqieNovelDownloader-2026.8.11-android.aab": zipped.getvalue(),
+            "FanqieNovelDownloader-tauri-darwin-aarch64.app.tar.gz": tarred.getvalue(),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            for name, payload in assets.items():
+                with self.subTest(name=name):
+                    path = Path(directory) / name
+                    path.write_bytes(payload)
+                    AUDIT.audit_asset_file(path, name)
+                    with patch("sys.stdout", io.StringIO()):
+                        with self.assertRaisesRegex(SystemExit, "config.js"):
+                            AUDIT.audit_asset_file(path, name, deep=True)
+
+    def test_deep_ledger_does_not_skip_assets_passed_without_deep_scan(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "audit-ledger.json"
+            ledger = AUDIT.AuditLedger(path)
+            ledger.record("app.zip", "a" * 64)
+            ledger.save()
+            deep = AUDIT.AuditLedger(path, deep=True)
+            self.assertFalse(deep.passed("app.zip", "a" * 64))
+            deep.record("app.zip", "a" * 64)
+            self.assertTrue(deep.passed("app.zip", "a" * 64))
+            deep.save()
+            self.assertTrue(AUDIT.AuditLedger(path).passed("app.zip", "a" * 64))
+
+    def test_zip_member_names_come_from_the_central_directory_alone(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as output:
+            output.writestr("lib/arm64-v8a/libapp.so", os.urandom(256 * 1024))
+            output.writestr("assets/privé.txt", b"x")
+        payload = buffer.getvalue()
+
+        # Rewrite the end record as ZIP64 to exercise the locator path.
+        end = payload.rindex(b"PK\x05\x06")
+        _, _, _, _, entries, size, offset, _ = struct.unpack(
+            "<4sHHHHIIH", payload[end : end + 22]
+        )
+        body = payload[:end]
+        record = struct.pack(
+            "<4sQHHIIQQQQ", b"PK\x06\x06", 44, 45, 45, 0, 0, entries, entries, size, offset
+        )
+        locator = struct.pack("<4sIQI", b"PK\x06\x07", 0, len(body), 1)
+        unknown = (0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+        zip64 = body + record + locator + struct.pack("<4sHHHHIIH", b"PK\x05\x06", *unknown)
+        self.assertEqual(len(zipfile.ZipFile(io.BytesIO(zip64)).namelist()), 2)
+
+        for archive in (payload, zip64):
+            reads = []
+
+            def read(start, end, archive=archive):
+                reads.append(end - start)
+                return archive[start:end]
+
+            names = AUDIT.zip_member_names(read, len(archive), "app.apk")
+            self.assertEqual(names, ["lib/arm64-v8a/libapp.so", "assets/privé.txt"])
+            self.assertLess(sum(reads), 70 * 1024)
+
+        with self.assertRaises(SystemExit):
+            AUDIT.zip_member_names(lambda start, end: b"\0" * (end - start), 4096, "x.zip")
+
+    def test_marker_matcher_finds_every_marker_across_any_chunk_boundary(self):
+        grouped = [
+            marker for _, members in AUDIT.RAW_MATCHER.groups for marker, _ in members
+        ]
+        self.assertEqual(sorted(grouped), sorted(AUDIT.RAW_SECRET_MARKERS))
+        token = b"github_pat_" + b"A" * 30
+        for needle in (*AUDIT.RAW_SECRET_MARKERS, token):
+            payload = b"x" * 50 + needle + b"y" * 50
+            for split in range(40, 50 + len(needle) + 10, 3):
+                with self.subTest(needle=needle, split=split):
+                    scanner = AUDIT.RawMarkerScanner("asset.exe")
+                    with self.assertRaises(SystemExit):
+                        scanner.feed(payload[:split])
+                        scanner.feed(payload[split:])
+
+        # Many near misses of a shared anchor must not hide a later marker.
+        dense = b"PRIVATE " * 100 + b"BEGIN OPENSSH PRIVATE KEY"
+        self.assertEqual(AUDIT.RAW_MATCHER.search(dense), b"BEGIN OPENSSH PRIVATE KEY")
+        self.assertIsNone(AUDIT.RAW_MATCHER.search(b"PRIVATE " * 100 + b"private-sr"))
+
+    def test_mapped_scan_spans_window_boundaries_and_hashes_every_byte(self):
+        window = AUDIT.mmap.PAGESIZE
+        needle = b"BEGIN OPENSSH PRIVATE KEY"
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "FanqieNovelDownloader-tauri-windows-x64.exe"
+            clean = os.urandom(3 * window + 17).replace(b"BEGIN", b"begin")
+            path.write_bytes(clean)
+            with patch.object(AUDIT, "MAP_WINDOW", window):
+                digest = AUDIT.scan_raw_markers(
+                    path, digest=hashlib.sha256(clean).hexdigest()
+                )
+                self.assertEqual(digest, hashlib.sha256(clean).hexdigest())
+                for offset in (window - 10, 2 * window - len(needle), 3 * window):
+                    with self.subTest(offset=offset):
+                        payload = bytearray(clean)
+                        payload[offset : offset + len(needle)] = needle
+                        path.write_bytes(payload)
+                        with self.assertRaises(SystemExit):
+                            AUDIT.scan_raw_markers(path)
+
+    def stream(self, name, payload, spool_dir, *, digest=None, chunk=7):
+        asset = {"name": name, "size": len(payload)}
+        if digest is not None:
+            asset["digest"] = digest
+        sink = AUDIT.StreamingAssetAudit(asset, spool_dir)
+        for offset in range(0, len(payload), chunk):
+            sink.feed(payload[offset : offset + chunk])
+        sink.finish()
+
+    def test_streaming_audit_finds_markers_split_across_chunks(self):
+        payload = b"x" * 10 + b"compiled path private-src/src-tauri" + b"y" * 10
+        with tempfile.TemporaryDirectory() as directory, self.assertRaises(SystemExit):
+            self.stream(
+                "FanqieNovelDownloader-tauri-windows-x64-setup.exe",
+                payload,
+                Path(directory),
+                chunk=16,
+            )
+
+    def test_streaming_audit_checks_tar_members_and_digest(self):
+        def archive(member):
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode="w:gz") as output:
+                data = b"binary"
+                info = tarfile.TarInfo(member)
+                info.size = len(data)
+                output.addfile(info, io.BytesIO(data))
+            return buffer.getvalue()
+
+        name = "FanqieNovelDownloader-tauri-darwin-aarch64.app.tar.gz"
+        clean = archive("Fanqie.app/Contents/MacOS/fanqie-desktop")
+        with tempfile.TemporaryDirectory() as directory:
+            spool = Path(directory)
+            self.stream(
+                name,
+                clean,
+                spool,
+                digest="sha256:" + hashlib.sha256(clean).hexdigest(),
+            )
+            with self.assertRaises(SystemExit):
+                self.stream(name, clean, spool, digest="sha256:" + "0" * 64)
+            with self.assertRaises(SystemExit):
+                self.stream(name, archive("Fanqie.app/Contents/Resources/state.rs"), spool)
+            self.assertEqual(list(spool.iterdir()), [])
+
+    def test_tar_members_are_checked_as_they_are_read(self):
+        def archive(bad):
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode="w:gz") as output:
+                for index in range(200):
+                    member = "src/main.rs" if index == bad else f"Fanqie.app/{index}.bin"
+                    data = os.urandom(4096)
+                    info = tarfile.TarInfo(member)
+                    info.size = len(data)
+                    output.addfile(info, io.BytesIO(data))
+            return buffer.getvalue()
+
+        payload = archive(bad=1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "FanqieNovelDownloader-tauri-linux.AppImage.tar.gz"
+            # Truncated: reaching the end would report a TAR error instead.
+            path.write_bytes(payload[: len(payload) // 2])
+            with self.assertRaisesRegex(SystemExit, "src/main.rs"):
+                AUDIT.scan_archive(path)
+            path.write_bytes(archive(bad=None))
+            with patch.object(AUDIT, "MAX_ARCHIVE_MEMBERS", 150):
+                with self.assertRaisesRegex(SystemExit, "too many members"):
+                    AUDIT.scan_archive(path)
+
+    def test_debian_package_paths_come_from_its_data_tarball(self):
+        name = "FanqieNovelDownloader-tauri-linux-amd64.deb"
+        clean = deb_package(
+            {"./usr/bin/fanqie-desktop": None, "./usr/bin/fanqie": "/usr/lib/fanqie/run"}
+        )
+        leaked = deb_package({"./usr/lib/fanqie/assets/index.js.map": None})
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / name
+            path.write_bytes(clean)
+            AUDIT.scan_archive(path)
+            self.stream(name, clean, Path(directory), chunk=100)
+            path.write_bytes(leaked)
+            with self.assertRaisesRegex(SystemExit, "index.js.map"):
+                AUDIT.scan_archive(path)
+            with self.assertRaisesRegex(SystemExit, "index.js.map"):
+                self.stream(name, leaked, Path(directory), chunk=100)
+            path.write_bytes(clean[:-40])
+            with self.assertRaisesRegex(SystemExit, "cannot audit Debian package"):
+                AUDIT.scan_archive(path)
+
+    def test_appimage_paths_come_from_its_squashfs_tables(self):
+        name = "FanqieNovelDownloader-tauri-linux-amd64.AppImage"
+        clean = appimage(
+            {"AppRun": None, "usr": {"bin": {"fanqie-desktop": None}, "share": {}}}
+        )
+        leaked = appimage({"AppRun": None, "usr": {"src": {"main.rs": None}}})
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / name
+            path.write_bytes(clean)
+            AUDIT.scan_archive(path)
+            self.stream(name, clean, Path(directory), chunk=1000)
+            path.write_bytes(leaked)
+            with self.assertRaisesRegex(SystemExit, "usr/src/main.rs"):
+                AUDIT.scan_archive(path)
+            with self.assertRaisesRegex(SystemExit, "usr/src/main.rs"):
+                self.stream(name, leaked, Path(directory), chunk=1000)
+            path.write_bytes(appimage({"usr": {"src": {"main.rs": None}}}, compression=3))
+            with patch("sys.stdout", io.StringIO()) as output:
+                self.assertFalse(AUDIT.scan_archive(path))
+            self.assertIn("::warning::member listing skipped", output.getvalue())
+            self.assertIn("lzo compression is not supported", output.getvalue())
+            with self.assertRaisesRegex(SystemExit, "cannot list the members"):
+                AUDIT.scan_archive(path, strict=True)
+
+            # Unlisted assets pass with a warning but stay out of the ledger.
+            payload = path.read_bytes()
+            ledger = AUDIT.AuditLedger(Path(directory) / "ledger.json")
+            sink = AUDIT.StreamingAssetAudit(
+                {
+                    "name": name,
+                    "digest": "sha256:" + hashlib.sha256(payload).hexdigest(),
+                    "size": len(payload),
+                },
+                Path(directory),
+                ledger,
+            )
+            sink.feed(payload)
+            with patch("sys.stdout", io.StringIO()):
+                sink.finish()
+            self.assertEqual(ledger.entries, {})
+
+    def test_streaming_audit_spools_zip_assets_and_removes_them(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as output:
+            output.writestr("Fanqie.app/Contents/Resources/app.js.map", "{}")
+        with tempfile.TemporaryDirectory() as directory:
+            spool = Path(directory)
+            with self.assertRaises(SystemExit):
+                self.stream(
+                    "FanqieNovelDownloader-tauri-darwin-aarch64.zip",
+                    buffer.getvalue(),
+                    spool,
+                )
+            self.assertEqual(list(spool.iterdir()), [])
+
+    def test_local_artifacts_matching_github_digests_are_audited_in_place(self):
+        with tempfile.TemporaryDirectory() as directory:
+            directory = Path(directory)
+            local = directory / "dist" / "android"
+            local.mkdir(parents=True)
+            apk = "FanqieNovelDownloader-2026.8.11-android-arm64-v8a.apk"
+            exe = "FanqieNovelDownloader-tauri-windows-x64-setup.exe"
+            with zipfile.ZipFile(local / apk, "w") as output:
+                output.writestr("classes.dex", b"dex")
+            (local / exe).write_bytes(b"stale local build")
+            release = {
+                "assets": [
+                    {
+                        "name": apk,
+                        "size": (local / apk).stat().st_size,
+                        "digest": "sha256:"
+                        + hashlib.sha256((local / apk).read_bytes()).hexdigest(),
+                    },
+                    {
+                        "name": exe,
+                        "size": len(b"stale local build"),
+                        "digest": "sha256:" + hashlib.sha256(b"published").hexdigest(),
+                    },
+                ]
+            }
+            matched = AUDIT.audit_local_assets(release, [directory / "dist"])
+            self.assertEqual(matched, {apk})
+
+            with zipfile.ZipFile(local / apk, "w") as output:
+                output.writestr("private-src/src/main.rs", b"fn main() {}")
+            release["assets"][0]["size"] = (local / apk).stat().st_size
+            release["assets"][0]["digest"] = (
+                "sha256:" + hashlib.sha256((local / apk).read_bytes()).hexdigest()
+            )
+            with self.assertRaises(SystemExit):
+                AUDIT.audit_local_assets(release, [directory / "dist"])
+
+    def test_aborted_streams_release_the_lister_spool_and_budget(self):
+        budget = AUDIT.DiskBudget(1000)
+        with tempfile.TemporaryDirectory() as directory:
+            spool = Path(directory)
+            tarball = AUDIT.StreamingAssetAudit(
+                {"name": "FanqieNovelDownloader-tauri-darwin-aarch64.app.tar.gz"},
+                spool,
+            )
+            tarball.feed(b"\x1f\x8b partial")
+            tarball.abort()
+            self.assertFalse(tarball.archive.thread.is_alive())
+            apk = AUDIT.StreamingAssetAudit(
+                {
+                    "name": "FanqieNovelDownloader-2026.8.11-android-x86_64.apk",
+                    "size": 600,
+                },
+                spool,
+                budget=budget,
+            )
+            apk.feed(b"PK partial")
+            self.assertEqual(budget.used, 600)
+            apk.abort()
+            self.assertEqual(list(spool.iterdir()), [])
+            self.assertEqual(budget.used, 0)
+            # A failing finish() is followed by abort(); the spool counts once.
+            broken = AUDIT.StreamingAssetAudit(
+                {
+                    "name": "FanqieNovelDownloader-2026.8.11-android-arm64-v8a.apk",
+                    "size": 90,
+                },
+                spool,
+                budget=budget,
+            )
+            broken.feed(b"not a zip")
+            with self.assertRaises(SystemExit):
+                broken.finish()
+            broken.abort()
+            self.assertEqual(list(spool.iterdir()), [])
+        self.assertEqual(budget.used, 0)
+
+    def test_disk_budget_admits_spooled_assets_one_at_a_time(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as output:
+            output.writestr("classes.dex", b"dex" * 100)
+        payload = buffer.getvalue()
+        budget = AUDIT.DiskBudget(len(payload) + 10)
+        name = "FanqieNovelDownloader-2026.8.11-android-arm64-v8a.apk"
+        with tempfile.TemporaryDirectory() as directory:
+            first = AUDIT.StreamingAssetAudit(
+                {"name": name, "size": len(payload)}, Path(directory), budget=budget
+            )
+            first.feed(payload)
+            admitted = threading.Event()
+
+            def second():
+                AUDIT.StreamingAssetAudit(
+                    {"name": name.replace("arm64-v8a", "x86_64"), "size": len(payload)},
+                    Path(directory),
+                    budget=budget,
+                )
+                admitted.set()
+
+            thread = threading.Thread(target=second)
+            thread.start()
+            self.assertFalse(admitted.wait(0.2))
+            first.finish()
+            self.assertTrue(admitted.wait(5))
+            thread.join()
+        self.assertEqual(budget.peak, len(payload))
+        with self.assertRaises(SystemExit):
+            AUDIT.DiskBudget(10).acquire(name, 11)
+        self.assertEqual(AUDIT.parse_size("2G"), 2 * 1024**3)
+
 
 if __name__ == "__main__":
     unittest.main()
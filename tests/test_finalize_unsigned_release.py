@@ -1,5 +1,6 @@
-import importlib.util
 import hashlib
+import importlib.util
+import io
 import json
 import tempfile
 import unittest
@@ -94,6 +95,79 @@ class FinalizeUnsignedReleaseTest(unittest.TestCase):
         self.assertEqual(len(assets), 18)
         self.assertEqual(len(installers), 18)
 
+    def test_release_without_updater_metadata_audits_with_an_unused_plan(self):
+        with tempfile.TemporaryDirectory() as directory:
+            work_dir = Path(directory)
+            release = work_dir / "release.json"
+            release.write_text(json.dumps(self.fixture()), encoding="utf-8")
+            plan = MODULE.DOWNLOADER.DownloadPlan(
+                repo="o/r", tag="v1", directory=work_dir / "assets", run_gh=MODULE.run
+            )
+            commands = []
+            with (
+                patch.object(MODULE.GITHUB.default_client(), "backend", "gh"),
+                patch.dict(MODULE.os.environ, {"FANQIE_AUDIT_DISK_BUDGET": ""}),
+                patch.object(MODULE.COMMON, "run", side_effect=commands.append),
+            ):
+                MODULE.COMMON.audit_release_assets(
+                    repo="o/r",
+                    tag="v1",
+                    release=release,
+                    work_dir=work_dir,
+                    local_dirs=[plan.directory],
+                )
+        self.assertEqual(commands[0][:4], ["gh", "release", "download", "v1"])
+        self.assertIn("--root", commands[1])
+
+    def test_matching_build_outputs_are_linked_into_the_audit(self):
+        name = "FanqieNovelDownloader-tauri-windows-x64-setup.exe"
+        payload = b"installer"
+        with tempfile.TemporaryDirectory() as directory:
+            work_dir = Path(directory)
+            build = work_dir / "build"
+            build.mkdir()
+            (build / name).write_bytes(payload)
+            release = work_dir / "release.json"
+            asset = {
+                "name": name,
+                "size": len(payload),
+                "digest": "sha256:" + hashlib.sha256(payload).hexdigest(),
+            }
+            release.write_text(json.dumps({"assets": [asset]}), encoding="utf-8")
+            with (
+                patch.object(MODULE.GITHUB.default_client(), "backend", "gh"),
+                patch.dict(MODULE.os.environ, {"FANQIE_AUDIT_DISK_BUDGET": ""}),
+                patch.object(MODULE.COMMON, "run") as run,
+            ):
+                MODULE.COMMON.audit_release_assets(
+                    repo="o/r",
+                    tag="v1",
+                    release=release,
+                    work_dir=work_dir,
+                    local_dirs=[build],
+                )
+            linked = work_dir / "asset-audit" / name
+            self.assertTrue(linked.samefile(build / name))
+        self.assertEqual(run.call_count, 1)
+        self.assertIn("--root", run.call_args.args[0])
+
+    def test_disk_budget_without_streamable_assets_is_reported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            work_dir = Path(directory)
+            release = work_dir / "release.json"
+            release.write_text(json.dumps(self.fixture()), encoding="utf-8")
+            with (
+                patch.object(MODULE.GITHUB.default_client(), "backend", "gh"),
+                patch.dict(MODULE.os.environ, {"FANQIE_AUDIT_DISK_BUDGET": "4G"}),
+                patch.object(MODULE.COMMON, "run") as run,
+                patch("sys.stderr", io.StringIO()) as stderr,
+            ):
+                MODULE.COMMON.audit_release_assets(
+                    repo="o/r", tag="v1", release=release, work_dir=work_dir
+                )
+        self.assertIn("FANQIE_AUDIT_DISK_BUDGET=4G is not enforced", stderr.getvalue())
+        self.assertIn("--root", run.call_args_list[-1].args[0])
+
     def test_updater_metadata_is_rejected(self):
         release = self.fixture()
         release["assets"].append(
@@ -437,7 +511,7 @@ class FinalizeUnsignedReleaseTest(unittest.TestCase):
                 "latest_tag",
                 side_effect=["v2098.1.1", "unsigned-v2099.1.1-r1"],
             ) as latest_tag,
-            patch.object(MODULE.time, "sleep") as sleep,
+            patch.object(MODULE.GITHUB.time, "sleep") as sleep,
         ):
             observed = MODULE.wait_for_latest_tag(
                 "POf-L/Fanqie-novel-Downloader",
@@ -449,6 +523,59 @@ class FinalizeUnsignedReleaseTest(unittest.TestCase):
         self.assertEqual(latest_tag.call_count, 2)
         sleep.assert_called_once_with(0.01)
 
+    def test_graphql_snapshot_supplies_the_stable_alias_once(self):
+        draft = self.fixture()
+        draft.update({"id": 123, "tag_name": "unsigned-v2099.1.1-r1", "draft": True})
+        stable = {
+            "draft": False,
+            "prerelease": True,
+            "body": "- 稳定源 Release：`v2099.1.0`",
+            "assets": [{"name": "latest.json"}],
+        }
+        with tempfile.TemporaryDirectory() as directory, (
+            patch.object(MODULE.GITHUB, "graphql_enabled", return_value=True)
+        ), patch.object(
+            MODULE.GITHUB,
+            "fetch_release_graphql",
+            return_value=(json.loads(json.dumps(draft)), {"stable": stable}),
+        ), patch.object(MODULE.COMMON, "gh_json") as rest, patch.object(
+            MODULE.GITHUB, "try_gh_json", return_value=None
+        ) as optional:
+            release = MODULE.fetch_release(
+                "o/r",
+                123,
+                Path(directory) / "release.json",
+                tag="unsigned-v2099.1.1-r1",
+                aliases=("stable",),
+            )
+            self.assertEqual(len(release["assets"]), 18)
+            self.assertEqual(MODULE.stable_source_tag("o/r"), "v2099.1.0")
+            self.assertEqual(MODULE.stable_source_tag("o/r"), "")
+        rest.assert_not_called()
+        optional.assert_called_once()
+
+    def test_digest_wait_repolls_only_pending_assets(self):
+        assets = [
+            {"id": index, "name": f"asset-{index}.zip", "digest": "sha256:" + "0" * 64}
+            for index in range(1, 41)
+        ]
+        assets[7]["digest"] = None
+        ready = dict(assets[7], digest="sha256:" + "8" * 64)
+        responses = [{"id": 123, "tag_name": "unsigned-v2099.1.1-r1"}, [assets]]
+        with tempfile.TemporaryDirectory() as directory, patch.object(
+            MODULE.COMMON, "gh_json", side_effect=responses
+        ) as rest, patch.object(
+            MODULE.GITHUB, "try_gh_json", side_effect=[dict(assets[7]), ready]
+        ) as asset_reads, patch.object(MODULE.GITHUB.time, "sleep"):
+            release = MODULE.fetch_release("o/r", 123, Path(directory) / "release.json")
+        self.assertEqual(rest.call_count, 2)
+        self.assertEqual(asset_reads.call_count, 2)
+        self.assertEqual(
+            asset_reads.call_args.args[0], ["api", "repos/o/r/releases/assets/8"]
+        )
+        self.assertEqual(len(release["assets"]), 40)
+        self.assertEqual(release["assets"][7]["digest"], "sha256:" + "8" * 64)
+
     def test_manifest_asset_digest_must_match_uploaded_content(self):
         with tempfile.TemporaryDirectory() as directory:
             path = Path(directory) / MODULE.MANIFEST_NAME
@@ -0,0 +1,400 @@
+import importlib.util
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPT = ROOT / "scripts" / "github-client.py"
+SPEC = importlib.util.spec_from_file_location("fanqie_github_client", SCRIPT)
+MODULE = importlib.util.module_from_spec(SPEC)
+assert SPEC.loader is not None
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_args):
+        return
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self):
+        server = self.server
+        server.peers.add(self.client_address)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        server.requests.append(
+            (self.command, self.path, self.headers.get("Authorization"), body)
+        )
+        if self.path == "/repos/o/r/releases?per_page=1":
+            base = f"http://127.0.0.1:{server.server_port}"
+            self.send_json(
+                200,
+                [{"id": 2, "tag_name": "v2"}],
+                {"Link": f'<{base}/repos/o/r/releases?per_page=1&page=2>; rel="next"'},
+            )
+        elif self.path == "/repos/o/r/releases?per_page=1&page=2":
+            self.send_json(200, [{"id": 1, "tag_name": "v1"}])
+        elif self.path == "/repos/o/r/releases/9":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self.send_json(200, {"id": 9, "assets": []}, {"ETag": '"v1"'})
+        elif self.path == "/repos/o/r/releases/5":
+            server.limited += 1
+            if server.limited == 1:
+                self.send_json(429, {"message": "secondary rate limit"}, {"Retry-After": "3"})
+            else:
+                self.send_json(
+                    200,
+                    {"id": 5},
+                    {
+                        "X-RateLimit-Limit": "5000",
+                        "X-RateLimit-Remaining": "4990",
+                        "X-RateLimit-Reset": "4102444800",
+                        "X-RateLimit-Used": "10",
+                        "X-RateLimit-Resource": "core",
+                    },
+                )
+        elif self.path == "/repos/o/r/releases/7":
+            self.send_json(200, {"id": 7, **json.loads(body or b"{}")})
+        else:
+            self.send_json(404, {"message": "Not Found"})
+
+    do_GET = handle_request
+    do_PATCH = handle_request
+
+
+class GitHubClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        self.server.peers = set()
+        self.server.requests = []
+        self.server.limited = 0
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.client = MODULE.GitHubClient(
+            backend="http",
+            api_url=f"http://127.0.0.1:{self.server.server_port}",
+            token="test-token",
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_api_arguments_translate_only_supported_gh_flags(self):
+        call = MODULE.parse_api_arguments(
+            ["api", "--method", "PATCH", "repos/o/r/releases/1", "--input", "-"]
+        )
+        self.assertEqual(call.method, "PATCH")
+        self.assertTrue(call.has_input)
+        self.assertIsNone(MODULE.parse_api_arguments(["api", "-H", "X: y", "x"]))
+        self.assertIsNone(
+            MODULE.parse_api_arguments(["release", "view", "v1", "--json", "id"])
+        )
+
+    def test_paginated_reads_reuse_one_kept_alive_connection(self):
+        pages = self.client.gh_json(
+            ["api", "--paginate", "--slurp", "repos/o/r/releases?per_page=1"]
+        )
+        self.assertEqual(pages, [[{"id": 2, "tag_name": "v2"}], [{"id": 1, "tag_name": "v1"}]])
+        self.client.gh_json(
+            ["api", "--paginate", "--slurp", "repos/o/r/releases?per_page=1"],
+            fresh=True,
+        )
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(len(self.server.peers), 1)
+        self.assertEqual(self.server.requests[0][2], "Bearer test-token")
+
+    def test_writes_send_the_gh_input_payload(self):
+        payload = self.client.gh_json(
+            ["api", "--method", "PATCH", "repos/o/r/releases/7", "--input", "-"],
+            input_text=json.dumps({"draft": False}),
+        )
+        self.assertEqual(payload, {"id": 7, "draft": False})
+        self.assertEqual(self.server.requests[0][0], "PATCH")
+
+    def test_missing_optional_reads_return_none_and_required_reads_fail(self):
+        self.assertIsNone(self.client.try_gh_json(["api", "repos/o/r/releases/latest"]))
+        with self.assertRaisesRegex(SystemExit, "HTTP 404"):
+            self.client.gh_json(["api", "repos/o/r/releases/latest"])
+
+    def test_repeat_polls_revalidate_cached_etags(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.client.cache_dir = Path(directory)
+            first = self.client.gh_json(["api", "repos/o/r/releases/9"])
+            second = self.client.gh_json(["api", "repos/o/r/releases/9"], fresh=True)
+            fresh = MODULE.GitHubClient(
+                backend="http",
+                api_url=self.client.api_url,
+                cache_dir=Path(directory),
+            )
+            third = fresh.gh_json(["api", "repos/o/r/releases/9"])
+            fresh.close()
+        self.assertEqual(first, {"id": 9, "assets": []})
+        self.assertEqual(second, first)
+        self.assertEqual(third, first)
+        self.assertEqual((self.client.cache_hits, self.client.cache_misses), (1, 1))
+        self.assertEqual(fresh.cache_hits, 1)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_graphql_release_keeps_the_rest_release_json_shape(self):
+        def node(tag, assets, has_next=False):
+            return {
+                "databaseId": 11,
+                "id": "RE_node",
+                "tagName": tag,
+                "name": tag,
+                "description": "notes",
+                "isDraft": True,
+                "isPrerelease": False,
+                "url": f"https://github.com/o/r/releases/tag/{tag}",
+                "releaseAssets": {
+                    "pageInfo": {"hasNextPage": has_next, "endCursor": "c1"},
+                    "nodes": [
+                        {
+                            "databaseId": 100 + index,
+                            "id": f"RA_{name}",
+                            "name": name,
+                            "size": 3,
+                            "digest": "sha256:" + "0" * 64,
+                            "downloadUrl": f"https://github.com/o/r/releases/download/{tag}/{name}",
+                        }
+                        for index, name in enumerate(assets)
+                    ],
+                },
+            }
+
+        responses = [
+            {
+                "data": {
+                    "repository": {
+                        "target": node("v1", ["a.exe"], has_next=True),
+                        "alias0": node("stable", ["latest.json"]),
+                        "alias1": None,
+                    }
+                }
+            },
+            {"data": {"repository": {"target": node("v1", ["b.exe"])}}},
+        ]
+        calls = []
+
+        def fake_gh_json(arguments, *, input_text=None, fresh=False):
+            calls.append(json.loads(input_text))
+            return responses[len(calls) - 1]
+
+        with patch.object(MODULE, "gh_json", side_effect=fake_gh_json):
+            release, aliases = MODULE.fetch_release_graphql(
+                "o/r", "v1", aliases=("stable", "unsigned")
+            )
+        self.assertEqual(len(calls), 2)
+        self.assertIn("alias1: release(tagName: $alias1)", calls[0]["query"])
+        self.assertEqual(calls[1]["variables"]["after"], "c1")
+        self.assertEqual(release["id"], 11)
+        self.assertEqual(release["tag_name"], "v1")
+        self.assertIs(release["draft"], True)
+        self.assertEqual([asset["name"] for asset in release["assets"]], ["a.exe", "b.exe"])
+        self.assertEqual(
+            release["assets"][0]["browser_download_url"],
+            "https://github.com/o/r/releases/download/v1/a.exe",
+        )
+        self.assertEqual(release["assets"][0]["id"], 100)
+        self.assertEqual(
+            release["assets"][0]["url"],
+            MODULE.default_client().api_url + "repos/o/r/releases/assets/100",
+        )
+        self.assertEqual(aliases["stable"]["assets"][0]["name"], "latest.json")
+        self.assertIsNone(aliases["unsigned"])
+
+    def test_reads_are_memoized_until_a_write(self):
+        arguments = ["api", "repos/o/r/releases/7"]
+        self.assertEqual(self.client.gh_json(arguments), {"id": 7})
+        self.assertEqual(self.client.gh_json(arguments), {"id": 7})
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.client.read_hits, 1)
+        self.client.gh_json(arguments)["id"] = 8
+        self.assertEqual(self.client.gh_json(arguments), {"id": 7})
+        self.client.gh_json(
+            ["api", "--method", "PATCH", "repos/o/r/releases/7", "--input", "-"],
+            input_text="{}",
+        )
+        self.client.gh_json(arguments)
+        self.assertEqual(len(self.server.requests), 3)
+        with patch.object(MODULE, "run_command", return_value="") as run:
+            self.client.run(["gh", "release", "download", "v1", "--pattern", "*.sig"])
+            self.client.gh_json(arguments)
+            self.client.run(["gh", "release", "upload", "v1", "latest.json"])
+            self.client.gh_json(arguments)
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_graphql_queries_are_reads_and_mutations_are_writes(self):
+        query = json.dumps({"query": "query { viewer { login } }"})
+        mutation = json.dumps({"query": "mutation { x }"})
+        arguments = ["api", "--method", "POST", "graphql", "--input", "-"]
+        self.assertIsNotNone(MODULE.read_key(arguments, query))
+        self.assertIsNone(MODULE.read_key(arguments, mutation))
+        self.assertTrue(
+            MODULE.is_read_only_command(
+                [MODULE.sys.executable, "scripts/audit-release-assets.py"]
+            )
+        )
+        self.assertFalse(
+            MODULE.is_read_only_command(
+                [MODULE.sys.executable, "scripts/publish-stable-channel.py"]
+            )
+        )
+
+    def test_list_pages_stop_when_the_consumer_stops(self):
+        pages = [[{"id": 3}, {"id": 2}], [{"id": 1}, {"id": 0}], []]
+        calls = []
+
+        def fake_gh_json(arguments, *, input_text=None, fresh=False):
+            calls.append(arguments[-1])
+            return pages[len(calls) - 1]
+
+        with patch.object(MODULE, "gh_json", side_effect=fake_gh_json):
+            first = next(MODULE.iter_pages("repos/o/r/releases", per_page=2))
+            self.assertEqual(first, [{"id": 3}, {"id": 2}])
+            self.assertEqual(calls, ["repos/o/r/releases?per_page=2&page=1"])
+            calls.clear()
+            self.assertEqual(
+                len(list(MODULE.iter_pages("repos/o/r/releases", per_page=2))), 3
+            )
+        self.assertEqual(calls[-1], "repos/o/r/releases?per_page=2&page=3")
+
+    def test_newest_release_finds_late_publications_anywhere_in_the_listing(self):
+        releases = [
+            {"id": 500 - index, "published_at": "2099-01-01T00:00:00Z"}
+            for index in range(300)
+        ]
+        releases[1]["published_at"] = None
+        releases.append({"id": 1, "published_at": "2099-06-01T00:00:00Z"})
+        seen = []
+
+        def eligible(release):
+            seen.append(release["id"])
+            return bool(release["published_at"])
+
+        self.assertIs(MODULE.newest_release(releases, eligible), releases[-1])
+        self.assertEqual(len(seen), len(releases))
+        self.assertIsNone(MODULE.newest_release(releases[1:2], eligible))
+
+    def test_waits_back_off_within_attempt_and_deadline_budgets(self):
+        policy = MODULE.WaitPolicy(
+            attempts=5, initial_delay=1, factor=2, max_delay=3, deadline=100, jitter=0
+        )
+        observed = iter(["a", "b", "c", "ready"])
+        with patch.object(MODULE.time, "sleep") as sleep:
+            result = MODULE.wait_for(
+                "poll",
+                lambda _attempt, _remaining: next(observed),
+                policy=policy,
+                ready=lambda value: value == "ready",
+            )
+        self.assertTrue(result.ready)
+        self.assertEqual(result.attempts, 4)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2, 3])
+
+        def unreachable(_attempt, _remaining):
+            raise OSError("CDN not ready")
+
+        with (
+            patch.object(MODULE.time, "sleep") as sleep,
+            patch.object(MODULE.time, "monotonic", side_effect=[0, 0, 0, 1, 1, 1]),
+        ):
+            result = MODULE.wait_for(
+                "endpoint",
+                unreachable,
+                policy=MODULE.WaitPolicy(attempts=5, initial_delay=1, deadline=2.5),
+                retry_on=(OSError,),
+            )
+        self.assertFalse(result.ready)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(str(result.error), "CDN not ready")
+        sleep.assert_called_once_with(1)
+
+    def test_secondary_limits_are_waited_out_and_budgets_recorded(self):
+        with patch.object(MODULE.time, "sleep") as sleep:
+            payload = self.client.gh_json(["api", "repos/o/r/releases/5"])
+        self.assertEqual(payload, {"id": 5})
+        sleep.assert_called_once_with(3.0)
+        self.assertEqual(
+            self.client.governor.summary(), "core 1 used, 4990/5000 left"
+        )
+
+    def test_low_budgets_are_paced_and_exhausted_ones_fail_fast(self):
+        governor = MODULE.RateGovernor()
+        governor.budgets["core"] = MODULE.RateBudget(5000, 100, 1300, 4900)
+        with (
+            patch.object(MODULE.time, "time", return_value=1000),
+            patch.object(MODULE.time, "sleep") as sleep,
+        ):
+            governor.before("core")
+            sleep.assert_called_once_with(3)
+            governor.budgets["core"] = MODULE.RateBudget(5000, 0, 1000 + 3600, 5000)
+            with self.assertRaisesRegex(SystemExit, "rate limit is exhausted"):
+                governor.before("core")
+
+    def test_calls_are_accounted_per_endpoint_template(self):
+        self.client.gh_json(["api", "repos/o/r/releases/7"])
+        self.client.try_gh_json(["api", "repos/o/r/releases/tags/v1"])
+        with tempfile.TemporaryDirectory() as directory:
+            def download(command, **_kwargs):
+                Path(directory, "latest.json").write_text("{}", encoding="utf-8")
+                return ""
+
+            with patch.object(MODULE, "run_command", side_effect=download):
+                self.client.run(
+                    ["gh", "release", "download", "v1", "--dir", directory]
+                )
+        self.assertEqual(
+            [
+                (call.endpoint, call.method, call.status, call.bytes)
+                for call in self.client.calls
+            ],
+            [
+                ("repos/{owner}/{repo}/releases/{id}", "GET", 200, 9),
+                ("repos/{owner}/{repo}/releases/tags/{tag}", "GET", 404, 24),
+                ("release download", "GH", 0, 2),
+            ],
+        )
+        summary = MODULE.summarize_calls(self.client.calls)
+        self.assertEqual(sum(entry["failed"] for entry in summary), 1)
+        self.assertIn(
+            "| `release download` | GH | 1 | 0 |", MODULE.calls_markdown(summary)
+        )
+
+    def test_gh_backend_is_the_default_and_non_api_commands_use_the_cli(self):
+        with patch.dict(MODULE.os.environ, {}, clear=True):
+            self.assertEqual(MODULE.GitHubClient.from_environment().backend, "gh")
+        with patch.object(MODULE, "run_command", return_value='{"databaseId": 5}') as run:
+            payload = self.client.gh_json(["release", "view", "v1", "--json", "databaseId"])
+        self.assertEqual(payload, {"databaseId": 5})
+        run.assert_called_once()
+        self.assertEqual(self.server.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -77,6 +77,33 @@ class PublishStableChannelTest(unittest.TestCase):
         with self.assertRaisesRegex(SystemExit, "not a published signed release"):
             MODULE.select_signed_release(releases, "unsigned-v2099.1.2-r3")
 
+    def test_stale_index_picks_are_reread_before_publishing(self):
+        newer = self.signed_release("v2099.1.2")
+        older = self.signed_release("v2099.1.1")
+        stale = {**newer, "published_at": "2099-03-01T00:00:00Z"}
+        current = {"v2099.1.2": {**newer, "draft": True}, "v2099.1.1": older}
+        listings = []
+
+        def fake_iter_releases(repo, *, full=False):
+            listings.append(full)
+            return iter([older] if full else [stale, older])
+
+        def fake_release_by_tag(repo, tag, *, fresh=False):
+            self.assertTrue(fresh)
+            return current.get(tag)
+
+        with (
+            patch.object(MODULE, "iter_releases", side_effect=fake_iter_releases),
+            patch.object(MODULE, "release_by_tag", side_effect=fake_release_by_tag),
+        ):
+            self.assertIs(MODULE.find_signed_release("o/r"), older)
+            self.assertEqual(listings, [False, True])
+            listings.clear()
+            self.assertIs(MODULE.find_signed_release("o/r", "v2099.1.1"), older)
+            self.assertEqual(listings, [])
+            with self.assertRaisesRegex(SystemExit, "not a published signed release"):
+                MODULE.find_signed_release("o/r", "v2099.1.2")
+
     def test_metadata_validation_preserves_signed_source_urls(self):
         release = self.signed_release()
         metadata = self.metadata()
@@ -237,7 +264,7 @@ class PublishStableChannelTest(unittest.TestCase):
                 "urlopen",
                 side_effect=[OSError("CDN not ready"), Response(expected)],
             ) as urlopen,
-            patch.object(MODULE.time, "sleep") as sleep,
+            patch.object(MODULE.GITHUB.time, "sleep") as sleep,
         ):
             downloaded = MODULE.download_public_metadata(
                 url="https://example.invalid/latest.json",
@@ -44,6 +44,16 @@ class PublishUnsignedChannelTest(unittest.TestCase):
         selected = MODULE.select_source([newer_invalid, signed, prerelease, valid])
         self.assertEqual(selected["tag_name"], valid["tag_name"])
 
+    def test_requested_source_is_read_from_github_not_the_index(self):
+        published = self.source()
+        with (
+            patch.object(MODULE, "iter_releases") as iter_releases,
+            patch.object(MODULE, "release_by_tag", return_value=published) as by_tag,
+        ):
+            self.assertIs(MODULE.find_source("o/r", published["tag_name"]), published)
+        iter_releases.assert_not_called()
+        by_tag.assert_called_once_with("o/r", published["tag_name"], fresh=True)
+
     def test_alias_is_prerelease_and_never_competes_for_latest(self):
         captured = {}
 
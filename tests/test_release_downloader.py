@@ -0,0 +1,349 @@
+import hashlib
+import importlib.util
+import io
+import re
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPT = ROOT / "scripts" / "release-downloader.py"
+SPEC = importlib.util.spec_from_file_location("fanqie_release_downloader", SCRIPT)
+MODULE = importlib.util.module_from_spec(SPEC)
+assert SPEC.loader is not None
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+BLOBS = {
+    "app-setup.exe": bytes(range(256)) * 40,
+    "latest.json": b'{"version":"1"}',
+    "empty.txt": b"",
+}
+
+
+class Storage(BaseHTTPRequestHandler):
+    """Signed-storage stand-in: serves byte ranges and drops one of them."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_args):
+        return
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(
+            (self.path, self.headers.get("Range"), self.headers.get("Authorization"))
+        )
+        name = self.path.rsplit("/", 1)[-1]
+        body = BLOBS[name]
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range") or "")
+        if server.ignore_ranges or match is None:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        start, end = int(match.group(1)), int(match.group(2)) + 1
+        chunk = body[start:end]
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(body)}")
+        self.send_header("Content-Length", str(len(chunk)))
+        self.end_headers()
+        if name == "app-setup.exe" and start == 4096 and not server.dropped:
+            server.dropped = True
+            self.wfile.write(chunk[:100])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(chunk)
+
+
+class Api(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_args):
+        return
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("Authorization")))
+        name = self.path.rsplit("/", 1)[-1]
+        self.send_response(302)
+        self.send_header(
+            "Location", f"http://localhost:{self.server.storage_port}/blobs/{name}"
+        )
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def start(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class ReleaseDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.storage = start(Storage)
+        self.storage.ignore_ranges = False
+        self.storage.dropped = False
+        self.api = start(Api)
+        self.api.storage_port = self.storage.server_port
+        self.release = {
+            "assets": [
+                {
+                    "name": name,
+                    "size": len(body),
+                    "url": (
+                        f"http://127.0.0.1:{self.api.server_port}"
+                        f"/repos/o/r/releases/assets/{name}"
+                    ),
+                }
+                for name, body in BLOBS.items()
+            ]
+        }
+
+    def tearDown(self):
+        for server in (self.storage, self.api):
+            server.shutdown()
+            server.server_close()
+
+    def download(self):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        downloader = MODULE.Downloader(token="secret", jobs=3, part_size=4096)
+        with patch.object(MODULE.time, "sleep"):
+            total = downloader.download(self.release, directory)
+        self.assertEqual(total, sum(len(body) for body in BLOBS.values()))
+        self.assertEqual(sorted(path.name for path in directory.iterdir()), sorted(BLOBS))
+        for name, body in BLOBS.items():
+            self.assertEqual((directory / name).read_bytes(), body, name)
+        return directory
+
+    def test_large_assets_are_split_into_resumable_ranges(self):
+        self.download()
+        ranges = [
+            item[1]
+            for item in self.storage.requests
+            if item[0].endswith("app-setup.exe")
+        ]
+        self.assertIn("bytes=0-4095", ranges)
+        self.assertIn("bytes=4096-8191", ranges)
+        self.assertIn("bytes=4196-8191", ranges)
+        self.assertTrue(self.storage.dropped)
+        self.assertTrue(all(item[1] == "Bearer secret" for item in self.api.requests))
+        self.assertTrue(all(item[2] is None for item in self.storage.requests))
+
+    def test_servers_without_range_support_stream_whole_files(self):
+        self.storage.ignore_ranges = True
+        self.download()
+        ranges = [
+            item[1]
+            for item in self.storage.requests
+            if item[0].endswith("app-setup.exe")
+        ]
+        self.assertEqual(ranges, ["bytes=0-4095"])
+
+    def test_streaming_feeds_each_asset_to_its_sink_in_order(self):
+        received = {}
+
+        class Collect:
+            def __init__(self, asset):
+                self.name = asset["name"]
+                self.chunks = []
+
+            def feed(self, chunk):
+                self.chunks.append(chunk)
+
+            def finish(self):
+                received[self.name] = b"".join(self.chunks)
+
+        self.storage.ignore_ranges = True
+        downloader = MODULE.Downloader(token="secret", jobs=2)
+        with patch.object(MODULE.time, "sleep"):
+            downloader.stream(self.release, Collect)
+        self.assertEqual(received, BLOBS)
+        self.assertTrue(all(item[2] is None for item in self.storage.requests))
+
+    def test_cached_assets_are_not_downloaded_again(self):
+        for asset in self.release["assets"]:
+            body = BLOBS[asset["name"]]
+            asset["digest"] = "sha256:" + hashlib.sha256(body).hexdigest()
+        cache_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        cache = MODULE.CACHE.AssetCache(cache_dir)
+        for _ in range(2):
+            directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+            downloader = MODULE.Downloader(
+                token="secret", jobs=3, part_size=4096, cache=cache
+            )
+            with patch.object(MODULE.time, "sleep"):
+                downloader.download(self.release, directory)
+            for name, body in BLOBS.items():
+                self.assertEqual((directory / name).read_bytes(), body, name)
+        requests = len(self.storage.requests)
+        self.assertEqual((cache.hits, cache.stored), (3, 3))
+
+        received = {}
+
+        class Collect:
+            def __init__(self, asset):
+                self.name = asset["name"]
+                self.chunks = []
+
+            def feed(self, chunk):
+                self.chunks.append(chunk)
+
+            def finish(self):
+                received[self.name] = b"".join(self.chunks)
+
+        MODULE.Downloader(token="secret", cache=cache).stream(self.release, Collect)
+        self.assertEqual(received, BLOBS)
+        self.assertEqual(len(self.storage.requests), requests)
+
+    def test_streaming_without_store_leaves_the_cache_untouched(self):
+        for asset in self.release["assets"]:
+            body = BLOBS[asset["name"]]
+            asset["digest"] = "sha256:" + hashlib.sha256(body).hexdigest()
+        cache_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        cache = MODULE.CACHE.AssetCache(cache_dir)
+
+        class Discard:
+            def __init__(self, asset):
+                pass
+
+            def feed(self, chunk):
+                pass
+
+            def finish(self):
+                pass
+
+        MODULE.Downloader(token="secret", cache=cache, store=False).stream(
+            self.release, Discard
+        )
+        self.assertEqual(cache.stored, 0)
+        self.assertEqual(list(cache_dir.rglob("*")), [])
+
+    def test_resumed_streams_reject_misplaced_ranges_and_abort_the_sink(self):
+        body = BLOBS["app-setup.exe"]
+
+        class Response:
+            def __init__(self, data, content_range):
+                self.status = 206
+                self.will_close = True
+                self.data = io.BytesIO(data)
+                self.content_range = content_range
+
+            def getheader(self, name):
+                return self.content_range if name == "Content-Range" else None
+
+            def read(self, size):
+                return self.data.read(size)
+
+            def close(self):
+                pass
+
+        def open_range(source, start, end, *, api_netloc):
+            if start == 0:
+                return Response(body[:100], f"bytes 0-{end - 1}/{end}"), source
+            # Right length, wrong place: the server restarted at byte zero.
+            return Response(body[: end - start], f"bytes 0-{end - 1}/{end}"), source
+
+        events = []
+
+        class Record:
+            def __init__(self, asset):
+                pass
+
+            def feed(self, chunk):
+                pass
+
+            def finish(self):
+                events.append("finish")
+
+            def abort(self):
+                events.append("abort")
+
+        release = {"assets": self.release["assets"][:1]}
+        downloader = MODULE.Downloader(token="secret")
+        with (
+            patch.object(downloader, "_open", side_effect=open_range),
+            patch.object(MODULE.time, "sleep"),
+            self.assertRaisesRegex(SystemExit, "unexpected Content-Range"),
+        ):
+            downloader.stream(release, Record)
+        self.assertEqual(events, ["abort"])
+
+    def test_read_range_returns_exact_bytes_and_rejects_whole_bodies(self):
+        url = self.release["assets"][0]["url"]
+        downloader = MODULE.Downloader(token="secret")
+        self.addCleanup(downloader.close)
+        body = BLOBS["app-setup.exe"]
+        self.assertEqual(downloader.read_range(url, 9000, 9100), body[9000:9100])
+        self.assertEqual(downloader.read_range(url, 0, 16), body[:16])
+        self.storage.ignore_ranges = True
+        # Each retry must start on a fresh connection, not behind the
+        # unread whole body of the previous attempt.
+        with (
+            patch.object(MODULE.time, "sleep"),
+            self.assertRaisesRegex(SystemExit, "server ignored Range"),
+        ):
+            downloader.read_range(url, 0, 16)
+
+    def test_release_json_without_rest_urls_is_not_downloadable(self):
+        self.assertTrue(MODULE.downloadable(self.release))
+        del self.release["assets"][0]["url"]
+        self.assertFalse(MODULE.downloadable(self.release))
+
+
+class DownloadPlanTest(unittest.TestCase):
+    def test_each_asset_is_fetched_once_and_uploads_are_adopted(self):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        bodies = {"latest.json": b"{}", "app.exe.sig": b"sig", "app.exe": b"exe"}
+        release = {
+            "assets": [
+                {
+                    "id": index,
+                    "name": name,
+                    "digest": "sha256:" + hashlib.sha256(body).hexdigest(),
+                }
+                for index, (name, body) in enumerate(bodies.items(), start=1)
+            ]
+        }
+        requested = []
+
+        def run_gh(command):
+            target = Path(command[command.index("--dir") + 1])
+            patterns = [
+                command[index + 1]
+                for index, value in enumerate(command)
+                if value == "--pattern"
+            ]
+            requested.append(patterns)
+            for name in patterns:
+                (target / name).write_bytes(bodies[name])
+
+        plan = MODULE.DownloadPlan(
+            repo="o/r", tag="v1", directory=directory / "assets", run_gh=run_gh
+        )
+        with patch.object(MODULE.GITHUB.default_client(), "backend", "gh"):
+            first = plan.fetch(release, ["latest.json", "app.exe.sig"])
+            again = plan.fetch(release, ["latest.json", "app.exe.sig", "app.exe"])
+        self.assertEqual(first["latest.json"].read_bytes(), b"{}")
+        self.assertEqual(again["latest.json"], first["latest.json"])
+        self.assertEqual(requested, [["latest.json", "app.exe.sig"], ["app.exe"]])
+        self.assertEqual(plan.summary(), "3 fetched, 2 reused")
+
+        produced = directory / "SHA256SUMS-release.txt"
+        produced.write_bytes(b"sums")
+        plan.adopt(produced)
+        adopted = plan.directory / hashlib.sha256(b"sums").hexdigest() / produced.name
+        self.assertEqual(adopted.read_bytes(), b"sums")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import importlib.util
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPT = ROOT / "scripts" / "release-index.py"
+SPEC = importlib.util.spec_from_file_location("fanqie_release_index", SCRIPT)
+MODULE = importlib.util.module_from_spec(SPEC)
+assert SPEC.loader is not None
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+
+def release(release_id, *, draft=False, assets=("latest.json",)):
+    return {
+        "id": release_id,
+        "tag_name": f"v{release_id}",
+        "draft": draft,
+        "prerelease": False,
+        "created_at": f"2099-01-{release_id:02d}T00:00:00Z",
+        "published_at": None if draft else f"2099-02-{release_id:02d}T00:00:00Z",
+        "assets": [
+            {"id": release_id * 10 + offset, "name": name, "size": 1}
+            for offset, name in enumerate(assets)
+        ],
+    }
+
+
+class ReleaseIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = MODULE.ReleaseIndex(
+            Path(self.directory.name) / "releases.sqlite3", "o/r"
+        )
+        self.pages = []
+        self.requested = []
+
+        def fake_iter_pages(path, **_kwargs):
+            for number, page in enumerate(self.pages, start=1):
+                self.requested.append(number)
+                yield page
+
+        patcher = patch.object(MODULE.GITHUB, "iter_pages", side_effect=fake_iter_pages)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def test_incremental_sync_stops_at_the_first_unchanged_page(self):
+        self.pages = [[release(6), release(5)], [release(4), release(3)], [release(2)]]
+        result = self.index.sync(now=1000.0)
+        self.assertEqual((result.pages, result.changed, result.full), (3, 5, True))
+
+        self.requested.clear()
+        self.pages = [
+            [release(7), release(6, assets=("latest.json", "app.exe"))],
+            [release(4), release(3)],
+            [release(2)],
+        ]
+        result = self.index.sync(now=2000.0)
+        self.assertEqual(self.requested, [1, 2])
+        self.assertEqual((result.changed, result.removed, result.full), (2, 1, False))
+        self.assertEqual(
+            [item["id"] for item in self.index.releases()], [7, 6, 4, 3, 2]
+        )
+        self.assertEqual(
+            [asset["name"] for asset in next(self.index.releases(), {}).get("assets")],
+            ["latest.json"],
+        )
+
+    def test_old_or_missing_full_syncs_relist_everything(self):
+        self.pages = [[release(3)], [release(2, draft=True)]]
+        self.index.sync(now=1000.0)
+        self.requested.clear()
+        self.pages = [[release(3)], [release(2)]]
+        result = self.index.sync(now=1000.0 + MODULE.FULL_SYNC_SECONDS)
+        self.assertEqual(self.requested, [1, 2])
+        self.assertTrue(result.full)
+        self.assertIs(list(self.index.releases())[1]["draft"], False)
+
+    def test_without_an_index_releases_stream_from_github(self):
+        self.pages = [[release(2)], [release(1)]]
+        with patch.dict(MODULE.os.environ, {MODULE.INDEX_ENV: ""}):
+            first = next(MODULE.iter_releases("o/r"))
+        self.assertEqual(first["id"], 2)
+        self.assertEqual(self.requested, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
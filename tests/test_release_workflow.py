@@ -18,6 +18,7 @@ MAINTENANCE_WORKFLOW = (
 )
 FINALIZER = ROOT / "scripts" / "finalize-release.py"
 UNSIGNED_FINALIZER = ROOT / "scripts" / "finalize-unsigned-release.py"
+FINALIZE_COMMON = ROOT / "scripts" / "finalize-common.py"
 UNSIGNED_APPEND_FINALIZER = ROOT / "scripts" / "append-unsigned-finalizer.py"
 STABLE_PUBLISHER = ROOT / "scripts" / "publish-stable-channel.py"
 ASSET_AUDITOR = ROOT / "scripts" / "audit-release-assets.py"
@@ -36,6 +37,7 @@ class ReleaseWorkflowTest(unittest.TestCase):
         )
         cls.finalizer = FINALIZER.read_text(encoding="utf-8")
         cls.unsigned_finalizer = UNSIGNED_FINALIZER.read_text(encoding="utf-8")
+        cls.finalize_common = FINALIZE_COMMON.read_text(encoding="utf-8")
         cls.unsigned_append_finalizer = UNSIGNED_APPEND_FINALIZER.read_text(
             encoding="utf-8"
         )
@@ -260,8 +262,8 @@ class ReleaseWorkflowTest(unittest.TestCase):
             "if stable_after != stable_before:",
             unsigned,
         )
-        self.assertIn('"databaseId,tagName"', unsigned)
-        self.assertIn('f"repos/{repo}/releases/{database_id}"', unsigned)
+        self.assertIn("COMMON.release_id(", unsigned)
+        self.assertIn("COMMON.fetch_release(", unsigned)
         self.assertIn('releases/tags/{alias_tag}', unsigned)
 
     def test_unsigned_draft_notes_warn_before_assets_finish(self):
@@ -447,8 +449,9 @@ class ReleaseWorkflowTest(unittest.TestCase):
         self.assertIn("--signatures-dir", self.finalizer)
         self.assertIn("--signatures-dir", self.unsigned_finalizer)
         self.assertIn("--signatures-dir repair-check/signatures", self.maintenance_workflow)
-        self.assertIn("audit-release-assets.py", self.finalizer)
-        self.assertIn("audit-release-assets.py", self.unsigned_finalizer)
+        self.assertIn("audit-release-assets.py", self.finalize_common)
+        self.assertIn("COMMON.audit_release_assets(", self.finalizer)
+        self.assertIn("COMMON.audit_release_assets(", self.unsigned_finalizer)
         self.assertIn("private-src", self.asset_auditor)
         self.assertIn('".map",', self.asset_auditor)
         self.assertIn('".pdb",', self.asset_auditor)
@@ -510,11 +513,13 @@ class ReleaseWorkflowTest(unittest.TestCase):
         self.assertNotIn("PRIVATE_SOURCE_REPOSITORY", workflow)
 
     def test_finalizer_fetches_drafts_by_database_id(self):
-        self.assertIn('"databaseId,tagName"', self.finalizer)
-        self.assertIn('f"repos/{repo}/releases/{database_id}"', self.finalizer)
-        self.assertIn('"--paginate"', self.finalizer)
-        self.assertIn('"--slurp"', self.finalizer)
+        self.assertIn("COMMON.release_id(", self.finalizer)
+        self.assertIn('"databaseId,tagName"', self.finalize_common)
+        self.assertIn('f"repos/{repo}/releases/{database_id}"', self.finalize_common)
+        self.assertIn('"--paginate"', self.finalize_common)
+        self.assertIn('"--slurp"', self.finalize_common)
         self.assertNotIn("releases/tags/", self.finalizer)
+        self.assertNotIn("releases/tags/", self.finalize_common)
 
     def test_wrapper_has_automatic_tooling_validation(self):
         self.assertIn("name: CI / 仓库校验", self.ci_workflow)